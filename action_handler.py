@@ -1,19 +1,63 @@
+from collections import Counter
 from datetime import datetime
 import json
 import os
+import threading
+from moderation_queue import ModerationQueue
+from offender_tracker import OffenderTracker
+
+# Decisions that change the review on the e-commerce platform, and the platform action for each
+PLATFORM_ACTIONS = {'REMOVE': 'remove', 'FLAG_FOR_REVIEW': 'flag', 'PUBLISH': 'publish'}
 
 class ReviewActionHandler:
     """Handle actions based on fake review predictions"""
     
-    def __init__(self, action_log_dir='actions'):
+    def __init__(self, action_log_dir='actions', dispatcher=None, offenders=None, moderation_queue=None):
         os.makedirs(action_log_dir, exist_ok=True)
-        self.action_log = f"{action_log_dir}/actions_{datetime.now().strftime('%Y%m%d')}.json"
-        self.blocked_users = set()
-        self.flagged_reviews = []
+        # One JSON action per line: logging appends instead of rewriting the whole day's log
+        self.action_log = f"{action_log_dir}/actions_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        # Logs written before the switch to JSON Lines hold one JSON array per day
+        self.legacy_action_log = self.action_log[:-1]
+        # Repeat offenders are blocked automatically; blocks persist in an append-only store
+        self.offenders = offenders or OffenderTracker(store_path=f"{action_log_dir}/blocked_users.jsonl",
+                                                      counters_path=f"{action_log_dir}/offender_counters.db")
+        # Flagged reviews wait for moderators in a persistent priority queue shared by all workers
+        self.moderation_queue = moderation_queue or ModerationQueue(f"{action_log_dir}/moderation_queue.db")
+        # platform_client.ActionDispatcher; without one, platform calls stay local stubs
+        self.dispatcher = dispatcher
+        self._log_lock = threading.Lock()
     
-    def decide_action(self, review_id, prediction, confidence, user_id=None):
-        """Decide what action to take based on prediction"""
-        
+    @property
+    def blocked_users(self):
+        return set(self.offenders.blocked)
+    
+    def is_user_blocked(self, user_id):
+        """Block record for a user, or None"""
+        return self.offenders.is_blocked(user_id)
+    
+    def track_offender(self, user_id, prediction, decision=None):
+        """Count a FAKE prediction (and removal) against a user, blocking at the tracker's thresholds"""
+        reason = self.offenders.record(user_id, fake=prediction == 'FAKE', removal=decision == 'REMOVE')
+        if reason:
+            self.block_user(user_id, f"Repeat offender: {reason}")
+    
+    @staticmethod
+    def _decide(prediction, confidence):
+        """(decision, reason) for a prediction, or (None, None) if no action is needed"""
+        if prediction == 'FAKE':
+            if confidence >= 0.9:
+                return 'REMOVE', 'High confidence fake review'
+            elif confidence >= 0.7:
+                return 'FLAG_FOR_REVIEW', 'Likely fake, needs manual review'
+            elif confidence >= 0.5:
+                return 'MONITOR', 'Suspicious, monitor user activity'
+            return None, None
+        # REAL
+        if confidence >= 0.8:
+            return 'PUBLISH', 'Genuine review'
+        return 'MANUAL_REVIEW', 'Uncertain, needs human verification'
+    
+    def _build_action(self, review_id, prediction, confidence, user_id, fake_probability=None):
         action = {
             'review_id': review_id,
             'timestamp': datetime.now().isoformat(),
@@ -21,44 +65,95 @@ class ReviewActionHandler:
             'confidence': confidence,
             'user_id': user_id
         }
+        if fake_probability is not None:
+            action['fake_probability'] = fake_probability
+        decision, reason = self._decide(prediction, confidence)
+        if decision:
+            action['decision'] = decision
+            action['reason'] = reason
+        return action
+    
+    def decide_action(self, review_id, prediction, confidence, user_id=None, fake_probability=None):
+        """Decide what action to take based on prediction"""
+        action = self._build_action(review_id, prediction, confidence, user_id, fake_probability)
         
-        if prediction == 'FAKE':
-            if confidence >= 0.9:
-                action['decision'] = 'REMOVE'
-                action['reason'] = 'High confidence fake review'
-                self._remove_review(review_id)
-                
-            elif confidence >= 0.7:
-                action['decision'] = 'FLAG_FOR_REVIEW'
-                action['reason'] = 'Likely fake, needs manual review'
-                self._flag_review(review_id)
-                
-            elif confidence >= 0.5:
-                action['decision'] = 'MONITOR'
-                action['reason'] = 'Suspicious, monitor user activity'
-                self._monitor_user(user_id)
-                
-        else:  # REAL
-            if confidence >= 0.8:
-                action['decision'] = 'PUBLISH'
-                action['reason'] = 'Genuine review'
-                self._publish_review(review_id)
-            else:
-                action['decision'] = 'MANUAL_REVIEW'
-                action['reason'] = 'Uncertain, needs human verification'
+        decision = action.get('decision')
+        if decision == 'REMOVE':
+            self._remove_review(review_id)
+        elif decision == 'FLAG_FOR_REVIEW':
+            self._flag_review(review_id, action)
+        elif decision == 'MONITOR':
+            self._monitor_user(user_id)
+        elif decision == 'PUBLISH':
+            self._publish_review(review_id)
         
         self._log_action(action)
+        self.track_offender(user_id, prediction, decision)
         return action
     
+    def decide_actions(self, results):
+        """Decide actions for a scored batch and apply them grouped by decision
+        
+        results are dicts with review_id, prediction, confidence and optionally user_id
+        and fake_probability (e.g. /predict_batch results); flagged reviews are queued by
+        fake_probability when it is given. Each platform decision is sent as one bulk call
+        through the dispatcher instead of one call per review.
+        """
+        results = list(results)
+        actions = [self._build_action(r['review_id'], r['prediction'], r['confidence'], r.get('user_id'),
+                                      r.get('fake_probability'))
+                   for r in results]
+        
+        groups = {}
+        for action in actions:
+            groups.setdefault(action.get('decision'), []).append(action)
+        
+        for decision, platform_action in PLATFORM_ACTIONS.items():
+            review_ids = [action['review_id'] for action in groups.get(decision, [])]
+            if not review_ids:
+                continue
+            if decision == 'FLAG_FOR_REVIEW':
+                self.moderation_queue.enqueue_many(
+                    self._queue_entry(action, result.get('review_text'))
+                    for action, result in zip(actions, results) if action.get('decision') == decision
+                )
+            if self.dispatcher is not None:
+                self.dispatcher.submit(platform_action, review_ids)
+            else:
+                print(f"{platform_action} {len(review_ids)} reviews")
+        for action in groups.get('MONITOR', []):
+            self._monitor_user(action['user_id'])
+        
+        self._log_actions(actions)
+        for action in actions:
+            self.track_offender(action['user_id'], action['prediction'], action.get('decision'))
+        summary = Counter(action.get('decision', 'NONE') for action in actions)
+        return {'actions': actions, 'summary': dict(summary)}
+    
+    def _platform_action(self, decision, review_id):
+        if self.dispatcher is not None:
+            self.dispatcher.submit(PLATFORM_ACTIONS[decision], [review_id])
+    
     def _remove_review(self, review_id):
         """Remove fake review from platform"""
         print(f"🗑️ Removing review {review_id}")
-        # Integration with e-commerce platform API
+        self._platform_action('REMOVE', review_id)
     
-    def _flag_review(self, review_id):
+    @staticmethod
+    def _queue_entry(action, review_text=None):
+        # Calibrated probabilities can disagree with predict(), so confidence is only a fallback
+        fake_probability = action.get('fake_probability')
+        if fake_probability is None:
+            fake_probability = action['confidence'] if action['prediction'] == 'FAKE' else 1 - action['confidence']
+        return {'review_id': action['review_id'], 'fake_probability': fake_probability,
+                'confidence': action['confidence'], 'user_id': action['user_id'], 'review_text': review_text}
+    
+    def _flag_review(self, review_id, action=None):
         """Flag review for manual moderation"""
         print(f"🚩 Flagging review {review_id} for manual review")
-        self.flagged_reviews.append(review_id)
+        action = action or {'review_id': review_id, 'prediction': 'FAKE', 'confidence': 0.5, 'user_id': None}
+        self.moderation_queue.enqueue_many([self._queue_entry(action)])
+        self._platform_action('FLAG_FOR_REVIEW', review_id)
     
     def _monitor_user(self, user_id):
         """Add user to monitoring list"""
@@ -68,10 +163,11 @@ class ReviewActionHandler:
     def _publish_review(self, review_id):
         """Publish genuine review"""
         print(f"✅ Publishing review {review_id}")
+        self._platform_action('PUBLISH', review_id)
     
-    def block_user(self, user_id, reason):
+    def block_user(self, user_id, reason, source='auto'):
         """Block repeat offender"""
-        self.blocked_users.add(user_id)
+        self.offenders.block(user_id, reason, source=source)
         print(f"🔒 Blocked user {user_id}: {reason}")
         
         block_action = {
@@ -84,37 +180,48 @@ class ReviewActionHandler:
     
     def _log_action(self, action):
         """Log action to file"""
+        self._log_actions([action])
+    
+    def _log_actions(self, actions):
+        """Append actions to the log in one write"""
         try:
-            if os.path.exists(self.action_log):
-                with open(self.action_log, 'r') as f:
-                    actions = json.load(f)
-            else:
-                actions = []
-            
-            actions.append(action)
-            
-            with open(self.action_log, 'w') as f:
-                json.dump(actions, f, indent=2)
+            lines = ''.join(json.dumps(action) + '\n' for action in actions)
+            with self._log_lock, open(self.action_log, 'a') as f:
+                f.write(lines)
         except Exception as e:
             print(f"Error logging action: {e}")
     
-    def get_flagged_reviews(self):
-        """Get list of flagged reviews for manual review"""
-        return self.flagged_reviews
+    def _read_actions(self):
+        """Today's actions: a legacy JSON-array log first (if one exists), then the JSON Lines log"""
+        actions = []
+        if os.path.exists(self.legacy_action_log):
+            with open(self.legacy_action_log, 'r') as f:
+                actions.extend(json.load(f))
+        if os.path.exists(self.action_log):
+            with open(self.action_log, 'r') as f:
+                actions.extend(json.loads(line) for line in f if line.strip())
+        return actions
+    
+    def get_flagged_reviews(self, status='pending', limit=50, cursor=None):
+        """One page of flagged reviews, highest fake probability first, and the next page's cursor"""
+        return self.moderation_queue.page(status=status, limit=limit, cursor=cursor)
     
     def get_statistics(self):
         """Get action statistics"""
         try:
-            with open(self.action_log, 'r') as f:
-                actions = json.load(f)
+            actions = self._read_actions()
             
             stats = {
                 'total_actions': len(actions),
                 'removed': sum(1 for a in actions if a.get('decision') == 'REMOVE'),
                 'flagged': sum(1 for a in actions if a.get('decision') == 'FLAG_FOR_REVIEW'),
                 'published': sum(1 for a in actions if a.get('decision') == 'PUBLISH'),
-                'blocked_users': len(self.blocked_users)
+                'blocked_users': len(self.offenders.blocked)
             }
+            stats['offenders'] = self.offenders.get_statistics()
+            stats['moderation_queue'] = self.moderation_queue.get_statistics()
+            if self.dispatcher is not None:
+                stats['platform'] = self.dispatcher.get_statistics()
             return stats
         except:
             return None
@@ -0,0 +1,183 @@
+import threading
+import time
+from functools import wraps
+from flask import g, request, jsonify
+from config import Config
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before the work finished"""
+
+
+class Deadline:
+    """Absolute request deadline taken from the X-Request-Deadline / X-Request-Timeout-Ms headers"""
+    
+    def __init__(self, expires_at=None):
+        self.expires_at = expires_at
+    
+    @classmethod
+    def from_headers(cls, headers, default_timeout_ms=0):
+        # Absolute epoch seconds set by an upstream hop takes precedence over a relative budget
+        deadline = headers.get('X-Request-Deadline')
+        if deadline:
+            try:
+                return cls(float(deadline))
+            except ValueError:
+                pass
+        timeout_ms = headers.get('X-Request-Timeout-Ms') or default_timeout_ms
+        try:
+            timeout_ms = float(timeout_ms)
+        except ValueError:
+            timeout_ms = 0
+        return cls(time.time() + timeout_ms / 1000 if timeout_ms > 0 else None)
+    
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+    
+    def expired(self):
+        return self.expires_at is not None and time.time() >= self.expires_at
+    
+    def check(self, stage):
+        """Abandon the request if nobody is waiting for the answer any more"""
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+
+def queue_wait(headers, now=None):
+    """Seconds the request waited before reaching the app, from the proxy's X-Request-Start header
+    
+    Accepts "t=<epoch>" or a bare epoch in seconds, milliseconds or microseconds (nginx:
+    proxy_set_header X-Request-Start "t=${msec}";). None if the header is missing or invalid.
+    """
+    value = headers.get('X-Request-Start', '').strip()
+    if value.startswith('t='):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    return max((now or time.time()) - started, 0.0)
+
+
+class AdmissionController:
+    """Bounded in-flight work measured in reviews, with load shedding
+    
+    Requests reserve one unit per review. When the budget is exhausted a request waits
+    at most max_wait seconds (and never past its deadline) for capacity before it is
+    shed with a 503, so spikes are rejected early instead of queueing until upstream
+    timeouts fire. The budget only fills when a worker runs several requests at once
+    (threaded workers). Requests that already waited longer than max_queue_wait in the
+    socket backlog, before any thread took them, are shed as well.
+    """
+    
+    def __init__(self, max_inflight_reviews=400, max_wait=0.1, retry_after=1, max_queue_wait=None):
+        self.max_inflight_reviews = max_inflight_reviews
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.max_queue_wait = max_queue_wait
+        self.inflight_reviews = 0
+        self.inflight_requests = 0
+        self.waiting_requests = 0
+        self.counts = {'admitted': 0, 'shed': 0, 'shed_queue_wait': 0, 'expired_in_queue': 0, 'cancelled': 0,
+                       'peak_inflight_reviews': 0}
+        self._available = threading.Condition()
+    
+    def queued_too_long(self, waited):
+        """True (and counted) if a request waited longer than max_queue_wait before reaching the app"""
+        if not self.max_queue_wait or waited is None or waited <= self.max_queue_wait:
+            return False
+        with self._available:
+            self.counts['shed_queue_wait'] += 1
+        return True
+    
+    def acquire(self, cost, deadline):
+        """Reserve capacity for cost reviews; returns False if the request should be shed"""
+        cost = min(cost, self.max_inflight_reviews)
+        wait_until = time.time() + self.max_wait
+        if deadline.expires_at is not None:
+            wait_until = min(wait_until, deadline.expires_at)
+        
+        with self._available:
+            self.waiting_requests += 1
+            try:
+                while self.inflight_reviews + cost > self.max_inflight_reviews:
+                    remaining = wait_until - time.time()
+                    if remaining <= 0:
+                        if deadline.expired():
+                            self.counts['expired_in_queue'] += 1
+                        else:
+                            self.counts['shed'] += 1
+                        return False
+                    self._available.wait(remaining)
+            finally:
+                self.waiting_requests -= 1
+            
+            self.inflight_reviews += cost
+            self.inflight_requests += 1
+            self.counts['admitted'] += 1
+            self.counts['peak_inflight_reviews'] = max(self.counts['peak_inflight_reviews'], self.inflight_reviews)
+        return True
+    
+    def release(self, cost):
+        cost = min(cost, self.max_inflight_reviews)
+        with self._available:
+            self.inflight_reviews -= cost
+            self.inflight_requests -= 1
+            self._available.notify_all()
+    
+    def record_cancelled(self):
+        with self._available:
+            self.counts['cancelled'] += 1
+    
+    def get_statistics(self):
+        with self._available:
+            return dict(self.counts,
+                        inflight_reviews=self.inflight_reviews,
+                        inflight_requests=self.inflight_requests,
+                        queued_requests=self.waiting_requests,
+                        max_inflight_reviews=self.max_inflight_reviews)
+
+
+def _overloaded(controller):
+    response = jsonify({'error': 'Server overloaded, retry later'})
+    response.headers['Retry-After'] = str(controller.retry_after)
+    return response, 503
+
+
+def admission_control(controller, cost=lambda data: 1):
+    """Admit the request against controller's review budget and attach its deadline to flask.g
+    
+    The deadline is checked on admission and by the view at g.deadline.check() calls
+    between stages (e.g. before preprocessing and before scoring); a stage that has
+    started runs to completion even if the deadline passes meanwhile.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            deadline = Deadline.from_headers(request.headers, Config.DEFAULT_REQUEST_TIMEOUT_MS)
+            if deadline.expired():
+                controller.record_cancelled()
+                return jsonify({'error': 'Request deadline already passed'}), 504
+            if controller.queued_too_long(queue_wait(request.headers)):
+                return _overloaded(controller)
+            
+            request_cost = max(int(cost(request.get_json(silent=True) or {})), 1)
+            if not controller.acquire(request_cost, deadline):
+                return _overloaded(controller)
+            
+            g.deadline = deadline
+            try:
+                return f(*args, **kwargs)
+            except DeadlineExceeded as e:
+                controller.record_cancelled()
+                return jsonify({'error': str(e)}), 504
+            finally:
+                controller.release(request_cost)
+        return wrapped
+    return decorator
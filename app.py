@@ -1,14 +1,28 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 import joblib
-import pandas as pd
+import numpy as np
 import os
 import sys
+import threading
+import time
 from logger import PredictionLogger
 from monitoring import ModelMonitor
 from validation import InputValidator, rate_limit
 from action_handler import ReviewActionHandler
 from continuous_learning import ContinuousLearning
+from config import Config
+from cascade import CascadeClassifier
+from behavioral_features import BehavioralFeatureExtractor, SharedBehavioralStore
+from admission import AdmissionController, admission_control
+from shadow import ShadowEvaluator
+from model_registry import ModelRegistry, UnknownTenant
+from offender_tracker import OffenderTracker
+from releases import read_manifest, served_path
+from moderation_queue import ModerationQueue
+from platform_client import ActionDispatcher, HTTPPlatformBackend, StubPlatformBackend
+from serialization import encode_response, wants_binary
+from near_duplicate import RecentDuplicateWindow
 
 app = Flask(__name__)
 CORS(app)
@@ -16,23 +30,180 @@ CORS(app)
 # Initialize components
 logger = PredictionLogger()
 monitor = ModelMonitor()
-action_handler = ReviewActionHandler()
+if Config.PLATFORM_BACKEND == 'http':
+    platform_backend = HTTPPlatformBackend(Config.PLATFORM_API_URL, Config.PLATFORM_API_KEY,
+                                           pool_size=Config.PLATFORM_POOL_SIZE, timeout=Config.PLATFORM_TIMEOUT,
+                                           max_batch_size=Config.PLATFORM_BATCH_SIZE)
+else:
+    platform_backend = StubPlatformBackend(max_batch_size=Config.PLATFORM_BATCH_SIZE)
+offenders = OffenderTracker(
+    store_path=Config.OFFENDER_STORE_PATH,
+    counters_path=Config.OFFENDER_DB_PATH,
+    half_life_hours=Config.OFFENDER_HALF_LIFE_HOURS,
+    fake_threshold=Config.OFFENDER_FAKE_THRESHOLD,
+    removal_threshold=Config.OFFENDER_REMOVAL_THRESHOLD,
+    max_users=Config.OFFENDER_MAX_USERS
+)
+action_dispatcher = ActionDispatcher(
+    platform_backend,
+    workers=Config.ACTION_WORKERS,
+    max_retries=Config.PLATFORM_MAX_RETRIES,
+    rate_limit=Config.PLATFORM_RATE_LIMIT
+)
+action_handler = ReviewActionHandler(
+    dispatcher=action_dispatcher,
+    offenders=offenders,
+    moderation_queue=ModerationQueue(Config.MODERATION_DB_PATH, lease_seconds=Config.MODERATION_LEASE_SECONDS)
+)
 learning = ContinuousLearning()
+admission = AdmissionController(
+    max_inflight_reviews=Config.ADMISSION_MAX_INFLIGHT_REVIEWS,
+    max_wait=Config.ADMISSION_MAX_WAIT_MS / 1000,
+    retry_after=Config.ADMISSION_RETRY_AFTER,
+    max_queue_wait=Config.ADMISSION_MAX_QUEUE_MS / 1000
+)
 
 # Load trained model and preprocessor
-MODEL_PATH = 'models/svm.pkl'
-PREPROCESSOR_PATH = 'models/preprocessor.pkl'
+MODEL_PATH = Config.MODEL_PATH
+PREPROCESSOR_PATH = Config.PREPROCESSOR_PATH
+
+def load_default_model():
+    """(model, preprocessor) for the default tenant, wrapped in the cascade if enabled
+    
+    Artifacts come from the published release named by the manifest, if there is one.
+    """
+    manifest = read_manifest(Config.RELEASE_MANIFEST_PATH)
+    model = joblib.load(served_path(MODEL_PATH, manifest))
+    preprocessor = joblib.load(served_path(PREPROCESSOR_PATH, manifest))
+    if Config.CASCADE_ENABLED:
+        fast_model = joblib.load(served_path(Config.FAST_MODEL_PATH, manifest))
+        model = CascadeClassifier(fast_model, model, Config.CASCADE_LOWER, Config.CASCADE_UPPER)
+    return model, preprocessor
 
 try:
-    model = joblib.load(MODEL_PATH)
-    preprocessor = joblib.load(PREPROCESSOR_PATH)
+    model, preprocessor = load_default_model()
     print("Model and preprocessor loaded successfully")
+    if Config.CASCADE_ENABLED:
+        print(f"Cascade enabled: {Config.FAST_MODEL_PATH} escalates "
+              f"{Config.CASCADE_LOWER}-{Config.CASCADE_UPPER} to {MODEL_PATH}")
 except Exception as e:
     print(f"Error loading model: {e}")
     print("Please train the model first: python main.py")
     model = None
     preprocessor = None
 
+# The retrain scheduler publishes a new default model by rewriting the release manifest;
+# each worker swaps it in on a request after the manifest changes
+_release = {'mtime': os.path.getmtime(Config.RELEASE_MANIFEST_PATH) if os.path.exists(Config.RELEASE_MANIFEST_PATH) else None,
+            'checked': time.monotonic()}
+_release_lock = threading.Lock()
+
+def reload_if_published():
+    """Reload the default model if a new release was published since it was loaded"""
+    global model, preprocessor
+    if time.monotonic() - _release['checked'] < Config.MODEL_RELOAD_INTERVAL:
+        return
+    with _release_lock:
+        _release['checked'] = time.monotonic()
+        try:
+            mtime = os.path.getmtime(Config.RELEASE_MANIFEST_PATH)
+        except OSError:
+            return
+        if mtime == _release['mtime']:
+            return
+        try:
+            model, preprocessor = load_default_model()
+            print(f"Reloaded published model from {Config.RELEASE_MANIFEST_PATH}")
+        except Exception as e:
+            print(f"Error reloading published model: {e}")
+        _release['mtime'] = mtime
+
+# Near-duplicate index is optional: older model directories do not have one. The
+# training-time index is read-only here; reviews seen while serving go to a bounded
+# window shared by all workers
+try:
+    near_duplicate_index = joblib.load(Config.NEAR_DUP_INDEX_PATH)
+    near_duplicates = RecentDuplicateWindow(near_duplicate_index, db_path=Config.NEAR_DUP_RECENT_DB_PATH,
+                                            capacity=Config.NEAR_DUP_RECENT_CAPACITY)
+    print(f"Near-duplicate index loaded ({len(near_duplicate_index)} reviews)")
+except Exception:
+    near_duplicate_index = None
+    near_duplicates = None
+
+# Behavioral history is shared by all workers in SQLite; the first start seeds it from the
+# store saved by training
+behavioral_store = SharedBehavioralStore(Config.BEHAVIOR_DB_PATH, history_size=Config.BEHAVIOR_HISTORY_SIZE,
+                                         max_users=Config.BEHAVIOR_MAX_USERS,
+                                         max_products=Config.BEHAVIOR_MAX_PRODUCTS)
+if not behavioral_store.seeded:
+    try:
+        users = behavioral_store.seed(joblib.load(Config.BEHAVIOR_STORE_PATH))
+        print(f"Seeded behavioral history of {users} users from {Config.BEHAVIOR_STORE_PATH}")
+    except Exception as e:
+        print(f"Behavioral history starts empty: {e}")
+behavioral_extractor = BehavioralFeatureExtractor(store=behavioral_store)
+
+def shutdown_worker():
+    """Flush and stop this process's per-worker state; called when a server worker exits"""
+    # Queued platform actions live only in this process's memory
+    if not action_dispatcher.flush(timeout=Config.ACTION_FLUSH_TIMEOUT):
+        print(f"Exiting with {action_dispatcher.get_statistics()['queue_depth']} platform action batches "
+              f"still queued after {Config.ACTION_FLUSH_TIMEOUT}s")
+    if shadow is not None:
+        shadow.close()
+
+# Candidate model scored on a sample of live traffic in the background
+shadow = None
+if Config.SHADOW_MODEL_PATH:
+    try:
+        # Loaded in the scoring processes, not here
+        shadow = ShadowEvaluator(
+            Config.SHADOW_MODEL_PATH,
+            Config.SHADOW_PREPROCESSOR_PATH,
+            sample_rate=Config.SHADOW_SAMPLE_RATE,
+            max_queue=Config.SHADOW_QUEUE_SIZE,
+            workers=Config.SHADOW_WORKERS
+        )
+        print(f"Shadow evaluation enabled for {Config.SHADOW_MODEL_PATH} ({Config.SHADOW_SAMPLE_RATE:.0%} of traffic)")
+    except Exception as e:
+        print(f"Error loading shadow model: {e}")
+
+# Tenant-specific artifact sets, loaded on first use; requests without a tenant use the default model
+tenant_registry = ModelRegistry(
+    tenants_dir=Config.TENANTS_DIR,
+    memory_budget_mb=Config.TENANT_CACHE_BUDGET_MB,
+    cascade=Config.CASCADE_ENABLED,
+    cascade_lower=Config.CASCADE_LOWER,
+    cascade_upper=Config.CASCADE_UPPER
+)
+
+def resolve_tenant(data):
+    """Tenant id from the X-Tenant-ID header or the request body, None for the default tenant"""
+    tenant_id = request.headers.get('X-Tenant-ID') or data.get('tenant_id')
+    return str(tenant_id) if tenant_id else None
+
+def load_artifacts(tenant_id):
+    """(model, preprocessor) serving a tenant"""
+    if tenant_id is None:
+        reload_if_published()
+        return model, preprocessor
+    artifacts = tenant_registry.get(tenant_id)
+    return artifacts['model'], artifacts['preprocessor']
+
+def score(model, X):
+    """Predictions, probabilities and the cascade stage that decided each row"""
+    if isinstance(model, CascadeClassifier):
+        return model.predict_with_stage(X)
+    return model.predict(X), model.predict_proba(X), [CascadeClassifier.FULL] * X.shape[0]
+
+def tenant_error(tenant_id, error):
+    if isinstance(error, UnknownTenant):
+        return jsonify({'error': f'Unknown tenant: {tenant_id}'}), 404
+    print(f"Error loading tenant {tenant_id}: {error}")
+    return jsonify({'error': f'Could not load model for tenant: {tenant_id}'}), 500
+
+METADATA_FIELDS = ('user_id', 'product_id', 'rating', 'timestamp', 'account_created', 'verified_purchase')
+
 @app.route('/')
 def home():
     return jsonify({
@@ -41,7 +212,8 @@ def home():
         'endpoints': {
             '/predict': 'POST - Predict single review',
             '/predict_batch': 'POST - Predict multiple reviews',
-            '/health': 'GET - Health check'
+            '/health': 'GET - Health check',
+            '/tenant_stats': 'GET - Per-tenant model cache statistics'
         }
     })
 
@@ -55,33 +227,76 @@ def health():
 
 @app.route('/predict', methods=['POST'])
 @rate_limit(max_requests=100)
+@admission_control(admission)
 def predict():
-    if model is None or preprocessor is None:
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    # Reviews from blocked users are rejected before any scoring work
+    blocked = action_handler.is_user_blocked(data.get('user_id'))
+    if blocked:
+        return jsonify({'error': 'User is blocked', 'user_id': blocked['user_id'],
+                        'reason': blocked['reason'], 'blocked_at': blocked['timestamp']}), 403
+    
+    tenant_id = resolve_tenant(data)
+    try:
+        tenant_model, tenant_preprocessor = load_artifacts(tenant_id)
+    except Exception as e:
+        return tenant_error(tenant_id, e)
+    if tenant_model is None or tenant_preprocessor is None:
         return jsonify({'error': 'Model not loaded. Train model first: python main.py'}), 500
     
-    data = request.json
     review_text = data.get('review_text', '')
     
     # Validate input
     valid, msg = InputValidator.validate_review_text(review_text)
+    if not valid:
+        return jsonify({'error': msg}), 400
+    valid, msg = InputValidator.validate_metadata(data)
     if not valid:
         return jsonify({'error': msg}), 400
     
+    # Behavioral signals from the running per-user/per-product history
+    metadata = {field: data.get(field) for field in METADATA_FIELDS}
+    behavioral = behavioral_extractor.extract_for_review(**metadata)
+    
     # Preprocess
-    df = pd.DataFrame({'review_text': [review_text]})
-    X, _ = preprocessor.prepare_data(df, fit=False)
+    g.deadline.check('preprocessing')
+    start = time.perf_counter()
+    X = tenant_preprocessor.prepare_texts([review_text], behavioral_features=[behavioral])
     
     # Predict
-    prediction = model.predict(X)[0]
-    probability = model.predict_proba(X)[0]
+    g.deadline.check('scoring')
+    predictions, probabilities, stages = score(tenant_model, X)
+    # The shadow candidate is compared against the default model only
+    if shadow is not None and tenant_id is None:
+        shadow.submit([review_text], predictions, probabilities[:, 1], time.perf_counter() - start,
+                      behavioral_features=[behavioral])
+    prediction = predictions[0]
+    probability = probabilities[0]
     
     result = {
         'review_text': review_text,
         'prediction': 'FAKE' if prediction == 1 else 'REAL',
         'confidence': float(max(probability)),
         'fake_probability': float(probability[1]),
-        'real_probability': float(probability[0])
+        'real_probability': float(probability[0]),
+        'stage': stages[0],
+        'behavioral_features': behavioral
     }
+    if tenant_id is not None:
+        result['tenant_id'] = tenant_id
+    
+    if near_duplicates is not None:
+        signature = near_duplicates.signature(review_text)
+        match = near_duplicates.query(signature)
+        result['near_duplicate'] = match
+        # Grow known campaigns with new matches and newly detected fakes
+        if match['is_near_duplicate'] or result['prediction'] == 'FAKE':
+            near_duplicates.add(signature, match)
+    
+    action_handler.track_offender(metadata['user_id'], result['prediction'])
     
     # Log prediction
     logger.log_prediction(review_text, result['prediction'], result['confidence'])
@@ -89,54 +304,133 @@ def predict():
     
     return jsonify(result)
 
+def _batch_cost(data):
+    reviews = data.get('reviews') if isinstance(data, dict) else None
+    return len(reviews) if isinstance(reviews, list) else 1
+
 @app.route('/predict_batch', methods=['POST'])
 @rate_limit(max_requests=50)
+@admission_control(admission, cost=_batch_cost)
 def predict_batch():
-    if model is None or preprocessor is None:
+    data = request.json
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    tenant_id = resolve_tenant(data)
+    try:
+        tenant_model, tenant_preprocessor = load_artifacts(tenant_id)
+    except Exception as e:
+        return tenant_error(tenant_id, e)
+    if tenant_model is None or tenant_preprocessor is None:
         return jsonify({'error': 'Model not loaded. Train model first: python main.py'}), 500
     
-    data = request.json
     reviews = data.get('reviews', [])
     
     # Validate input
     valid, msg = InputValidator.validate_batch(reviews)
     if not valid:
         return jsonify({'error': msg}), 400
+    review_ids = data.get('review_ids')
+    if data.get('apply_actions') or review_ids is not None:
+        if not isinstance(review_ids, list) or len(review_ids) != len(reviews):
+            return jsonify({'error': 'review_ids must have one id per review (required with apply_actions)'}), 400
+    user_ids = data.get('user_ids')
+    if user_ids is not None and (not isinstance(user_ids, list) or len(user_ids) != len(reviews)):
+        return jsonify({'error': 'user_ids must have one id per review'}), 400
+    metadata = data.get('metadata')
+    if metadata is not None:
+        if not isinstance(metadata, list) or len(metadata) != len(reviews) \
+                or not all(isinstance(item, dict) for item in metadata):
+            return jsonify({'error': 'metadata must have one object per review'}), 400
+        for item in metadata:
+            valid, msg = InputValidator.validate_metadata(item)
+            if not valid:
+                return jsonify({'error': msg}), 400
+    
+    # Behavioral signals come from the same running history as /predict; reviews without
+    # metadata get the values of a first review by an unknown user
+    rows = []
+    for i, item in enumerate(metadata or [{}] * len(reviews)):
+        fields = {field: item.get(field) for field in METADATA_FIELDS}
+        if fields['user_id'] is None and user_ids:
+            fields['user_id'] = user_ids[i]
+        rows.append(fields)
+    behavioral = [behavioral_extractor.extract_for_review(**fields) for fields in rows]
+    
+    g.deadline.check('preprocessing')
+    start = time.perf_counter()
+    X = tenant_preprocessor.prepare_texts(reviews, behavioral_features=behavioral)
+    g.deadline.check('scoring')
     
-    df = pd.DataFrame({'review_text': reviews})
-    X, _ = preprocessor.prepare_data(df, fit=False)
-    
-    predictions = model.predict(X)
-    probabilities = model.predict_proba(X)
-    
-    results = []
-    fake_count = 0
-    for i, review in enumerate(reviews):
-        pred = 'FAKE' if predictions[i] == 1 else 'REAL'
-        if pred == 'FAKE':
-            fake_count += 1
-        results.append({
-            'review_text': review,
-            'prediction': pred,
-            'confidence': float(max(probabilities[i])),
-            'fake_probability': float(probabilities[i][1])
-        })
+    predictions, probabilities, stages = score(tenant_model, X)
+    if shadow is not None and tenant_id is None:
+        shadow.submit(reviews, predictions, probabilities[:, 1], time.perf_counter() - start,
+                      behavioral_features=behavioral)
+    
+    # Columns are converted with tolist() once instead of indexing the arrays row by row
+    is_fake = np.asarray(predictions) == 1
+    labels = np.where(is_fake, 'FAKE', 'REAL')
+    fake_count = int(is_fake.sum())
+    columns = {
+        'prediction': labels.tolist(),
+        'confidence': probabilities.max(axis=1).tolist(),
+        'fake_probability': probabilities[:, 1].tolist(),
+        'stage': list(stages)
+    }
     
     # Log batch
     logger.log_batch(len(reviews), fake_count, len(reviews) - fake_count)
     
-    return jsonify({'results': results, 'total': len(results), 'fake_count': fake_count})
-
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Optionally moderate the batch on the platform: one bulk call per decision, applied in the background
+    decisions = None
+    if data.get('apply_actions'):
+        actions = action_handler.decide_actions(
+            {'review_id': review_id, 'user_id': user_id, 'review_text': review,
+             'prediction': prediction, 'confidence': confidence, 'fake_probability': fake_probability}
+            for review_id, user_id, review, prediction, confidence, fake_probability
+            in zip(review_ids, [fields['user_id'] for fields in rows], reviews,
+                   columns['prediction'], columns['confidence'], columns['fake_probability'])
+        )
+        decisions = [action.get('decision') for action in actions['actions']]
+    
+    # Compact mode: ids and fake probabilities as columns, no per-review objects or echoed texts
+    compact = data.get('response_format') == 'compact' or wants_binary(request)
+    if compact:
+        response = {'total': len(reviews), 'fake_count': fake_count,
+                    'prediction': is_fake.astype(int).tolist(),
+                    'fake_probability': np.round(probabilities[:, 1], 6).tolist()}
+        arrays = {'prediction': is_fake.astype(np.int8),
+                  'fake_probability': probabilities[:, 1].astype(np.float32)}
+        if review_ids is not None:
+            response['review_ids'] = arrays['review_ids'] = [str(review_id) for review_id in review_ids]
+        if decisions is not None:
+            response['decision'] = arrays['decision'] = [str(decision) for decision in decisions]
+    else:
+        results = [{'review_text': review, 'prediction': prediction, 'confidence': confidence,
+                    'fake_probability': fake_probability, 'stage': stage}
+                   for review, prediction, confidence, fake_probability, stage
+                   in zip(reviews, columns['prediction'], columns['confidence'],
+                          columns['fake_probability'], columns['stage'])]
+        if decisions is not None:
+            for result, decision in zip(results, decisions):
+                result['decision'] = decision
+        response = {'results': results, 'total': len(results), 'fake_count': fake_count}
+        arrays = None
+    
+    if decisions is not None:
+        response['actions'] = actions['summary']
+    if tenant_id is not None:
+        response['tenant_id'] = tenant_id
+    return encode_response(request, response, arrays, gzip_min_bytes=Config.RESPONSE_GZIP_MIN_BYTES,
+                           gzip_level=Config.RESPONSE_GZIP_LEVEL)
 
 @app.route('/stats')
 def stats():
-    """Get prediction statistics"""
-    stats = monitor.get_statistics()
-    if stats:
-        return jsonify(stats)
-    return jsonify({'message': 'No predictions yet'})
+    """Get prediction statistics (aggregated across server workers) and this worker's admission state"""
+    stats = monitor.get_aggregate_statistics()
+    if not stats:
+        stats = {'message': 'No predictions yet'}
+    stats['admission'] = admission.get_statistics()
+    return jsonify(stats)
 
 @app.route('/drift')
 def drift():
@@ -172,6 +466,18 @@ def learning_stats():
         return jsonify(stats)
     return jsonify({'message': 'No learning data available'})
 
+@app.route('/shadow_stats')
+def shadow_stats():
+    """Get candidate-vs-production comparison from shadow evaluation, across server workers"""
+    if shadow is None:
+        return jsonify({'message': 'Shadow evaluation disabled (set SHADOW_MODEL_PATH)'})
+    return jsonify(shadow.get_aggregate_statistics())
+
+@app.route('/tenant_stats')
+def tenant_stats():
+    """Get per-tenant model cache hit/miss, load latency and memory use for this worker"""
+    return jsonify(tenant_registry.get_statistics())
+
 @app.route('/action_stats')
 def action_stats():
     """Get action statistics"""
@@ -180,8 +486,70 @@ def action_stats():
         return jsonify(stats)
     return jsonify({'message': 'No actions recorded'})
 
+@app.route('/unblock_user', methods=['POST'])
+def unblock_user():
+    """Lift a repeat-offender block"""
+    data = request.json or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    if not offenders.unblock(user_id, data.get('reason', 'Unblocked by moderator')):
+        return jsonify({'error': f'User {user_id} is not blocked'}), 404
+    return jsonify({'unblocked': True, 'user_id': str(user_id)})
+
 @app.route('/flagged_reviews')
 def flagged_reviews():
-    """Get list of flagged reviews"""
-    flagged = action_handler.get_flagged_reviews()
-    return jsonify({'flagged_reviews': flagged, 'count': len(flagged)})
+    """Get a page of flagged reviews, highest fake probability first (?status=&limit=&cursor=)"""
+    status = request.args.get('status', 'pending')
+    if status not in ('pending', 'claimed', 'resolved'):
+        return jsonify({'error': 'status must be pending, claimed or resolved'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        flagged, next_cursor = action_handler.get_flagged_reviews(status, limit, request.args.get('cursor'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid limit or cursor'}), 400
+    return jsonify({'flagged_reviews': flagged, 'count': len(flagged), 'next_cursor': next_cursor})
+
+@app.route('/flagged_reviews/claim', methods=['POST'])
+def claim_flagged_reviews():
+    """Claim the highest-priority pending reviews for a moderator under a lease"""
+    data = request.json or {}
+    moderator = data.get('moderator')
+    if not moderator:
+        return jsonify({'error': 'moderator is required'}), 400
+    try:
+        limit = min(max(int(data.get('limit', 10)), 1), 100)
+        lease_seconds = data.get('lease_seconds')
+        if lease_seconds is not None:
+            lease_seconds = float(lease_seconds)
+            if not lease_seconds > 0:
+                raise ValueError(lease_seconds)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limit must be an integer and lease_seconds a positive number'}), 400
+    claimed = action_handler.moderation_queue.claim(moderator, limit, lease_seconds)
+    return jsonify({'claimed': claimed, 'count': len(claimed)})
+
+@app.route('/flagged_reviews/<review_id>/ack', methods=['POST'])
+def ack_flagged_review(review_id):
+    """Resolve a claimed review (e.g. resolution REMOVED or APPROVED)"""
+    data = request.json or {}
+    if not data.get('moderator') or not data.get('resolution'):
+        return jsonify({'error': 'moderator and resolution are required'}), 400
+    if not action_handler.moderation_queue.ack(review_id, data['moderator'], data['resolution']):
+        return jsonify({'error': 'Review is not claimed by this moderator or its lease expired'}), 409
+    return jsonify({'resolved': True, 'review_id': review_id})
+
+@app.route('/flagged_reviews/<review_id>/release', methods=['POST'])
+def release_flagged_review(review_id):
+    """Hand a claimed review back to the queue"""
+    data = request.json or {}
+    if not action_handler.moderation_queue.release(review_id, data.get('moderator')):
+        return jsonify({'error': 'Review is not claimed by this moderator'}), 409
+    return jsonify({'released': True, 'review_id': review_id})
+
+if __name__ == '__main__':
+    # Development server only; production runs the pre-fork server: gunicorn -c gunicorn.conf.py app:app
+    try:
+        app.run(debug=Config.DEBUG, host=Config.API_HOST, port=Config.API_PORT)
+    finally:
+        shutdown_worker()
@@ -1,64 +1,492 @@
-import pandas as pd
-from datetime import datetime
+import math
+import numpy as np
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 
-class BehavioralFeatureExtractor:
-    """Extract behavioral features from review metadata"""
+# pandas is only needed for the DataFrame (training) paths and is imported there, keeping
+# it off the API's import path
+
+
+def _to_epoch(timestamp):
+    """Convert a timestamp (datetime, ISO string or epoch seconds) to epoch seconds"""
+    if timestamp is None or (isinstance(timestamp, float) and timestamp != timestamp):
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.fromisoformat(str(timestamp))
+    # Naive timestamps are treated as UTC, matching pandas in update_from_frame
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
+
+
+def _to_rating(rating):
+    """A rating as a float, or None when it is missing or not a finite number (e.g. NaN)"""
+    try:
+        rating = float(rating)
+    except (TypeError, ValueError):
+        return None
+    return rating if math.isfinite(rating) else None
+
+
+def _to_flag(value):
+    """0/1 for a yes/no value given as a bool, number or string ('true', 'yes', '1'); missing is 0"""
+    if isinstance(value, str):
+        return int(value.strip().lower() in ('true', 't', 'yes', 'y', '1'))
+    if value is None or (isinstance(value, float) and value != value):
+        return 0
+    return int(bool(value))
+
+
+def _values(series):
+    """Column values as a list, with missing values (NaN, NaT) as None"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _frame_epochs(df, now):
+    """Review timestamps of a frame as epoch seconds; missing or unparseable ones are now"""
+    import pandas as pd
+    
+    if 'timestamp' not in df.columns:
+        return np.full(len(df), now)
+    timestamps = pd.to_datetime(df['timestamp'], errors='coerce')
+    return (timestamps - pd.Timestamp(0)).dt.total_seconds().fillna(now).to_numpy()
+
+
+class _UserStats:
+    __slots__ = ('count', 'rated', 'rating_mean', 'timestamps')
+    
+    def __init__(self, history_size):
+        self.count = 0
+        self.rated = 0
+        self.rating_mean = 0.0
+        self.timestamps = deque(maxlen=history_size)
+    
+    def add(self, rating, ts):
+        self.count += 1
+        if rating is not None:
+            self.rated += 1
+            self.rating_mean += (rating - self.rating_mean) / self.rated
+        self.timestamps.append(ts)
+
+
+class _ProductStats:
+    __slots__ = ('count', 'rating_mean')
     
     def __init__(self):
-        self.user_history = {}
+        self.count = 0
+        self.rating_mean = 0.0
     
-    def extract_review_frequency(self, df):
-        """Calculate reviews per user"""
-        if 'user_id' in df.columns:
-            df['review_frequency'] = df.groupby('user_id')['user_id'].transform('count')
-        else:
-            df['review_frequency'] = 1
-        return df
+    def add(self, rating):
+        self.count += 1
+        self.rating_mean += (rating - self.rating_mean) / self.count
+
+
+def _review_features(user, product, rating, ts, burst_window):
+    """Features of a review given its user's and product's stats so far (None if unseen)"""
+    features = {'review_frequency': 1, 'rating_deviation': 0.0, 'burst_activity': 0}
+    if user is not None:
+        features['review_frequency'] = user.count + 1
+        if any(0 <= ts - previous < burst_window for previous in user.timestamps):
+            features['burst_activity'] = 1
+    if product is not None and rating is not None:
+        # Product mean including this review, matching the batch extractor
+        mean = (product.rating_mean * product.count + rating) / (product.count + 1)
+        features['rating_deviation'] = abs(rating - mean)
+    return features
+
+
+class BehavioralFeatureStore:
+    """Running per-user and per-product aggregates for request-time behavioral features
     
-    def extract_rating_deviation(self, df):
-        """Calculate how much user's rating deviates from product average"""
-        if 'rating' in df.columns and 'product_id' in df.columns:
-            product_avg = df.groupby('product_id')['rating'].transform('mean')
-            df['rating_deviation'] = abs(df['rating'] - product_avg)
-        else:
-            df['rating_deviation'] = 0
-        return df
+    Keeps a review count, an online rating mean and the last few review timestamps per
+    user, and a count and rating mean per product. Recording and querying a review are
+    O(1), so the API can compute the same signals as BehavioralFeatureExtractor without
+    scanning review history. Users and products are kept in LRU order and the least
+    recently reviewed are evicted beyond max_users / max_products.
+    """
+    
+    def __init__(self, history_size=5, burst_window=3600, max_users=1000000, max_products=500000):
+        self.history_size = history_size
+        self.burst_window = burst_window
+        self.max_users = max_users
+        self.max_products = max_products
+        self.users = OrderedDict()
+        self.products = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        # Stores pickled before the LRU caps have plain dicts and no limits
+        state.setdefault('max_users', None)
+        state.setdefault('max_products', None)
+        state['users'] = OrderedDict(state['users'])
+        state['products'] = OrderedDict(state['products'])
+        # ... and users without a separate count of rated reviews
+        if state['users'] and not hasattr(next(iter(state['users'].values())), 'rated'):
+            for user in state['users'].values():
+                user.rated = user.count
+        # ... and stores pickled while tracking per-worker changes
+        state.pop('_changes', None)
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
     
-    def detect_burst_activity(self, df):
-        """Detect if user posted multiple reviews in short time"""
-        if 'user_id' in df.columns and 'timestamp' in df.columns:
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-            df = df.sort_values(['user_id', 'timestamp'])
-            df['time_diff'] = df.groupby('user_id')['timestamp'].diff().dt.total_seconds()
-            df['burst_activity'] = (df['time_diff'] < 3600).astype(int)  # < 1 hour
+    @staticmethod
+    def _lookup(entries, key, factory, limit):
+        """Entry for a key, created if missing, as the most recently used; evicts beyond limit"""
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = factory()
+            if limit and len(entries) > limit:
+                entries.popitem(last=False)
         else:
-            df['burst_activity'] = 0
-        return df
+            entries.move_to_end(key)
+        return entry
+    
+    def _features(self, user_id, product_id, rating, ts):
+        user = self.users.get(user_id) if user_id is not None else None
+        product = self.products.get(product_id) if product_id is not None else None
+        return _review_features(user, product, rating, ts, self.burst_window)
+    
+    def _record(self, user_id, product_id, rating, ts):
+        if user_id is not None:
+            self._lookup(self.users, user_id, lambda: _UserStats(self.history_size), self.max_users).add(rating, ts)
+        if product_id is not None and rating is not None:
+            self._lookup(self.products, product_id, _ProductStats, self.max_products).add(rating)
+    
+    def query(self, user_id=None, product_id=None, rating=None, timestamp=None):
+        """Behavioral features for an incoming review without recording it"""
+        ts = _to_epoch(timestamp)
+        with self._lock:
+            return self._features(user_id, product_id, _to_rating(rating), ts)
     
-    def extract_account_age(self, df):
-        """Calculate account age in days"""
+    def update(self, user_id=None, product_id=None, rating=None, timestamp=None):
+        """Record a review in the running aggregates"""
+        ts = _to_epoch(timestamp)
+        with self._lock:
+            self._record(user_id, product_id, _to_rating(rating), ts)
+    
+    def observe(self, user_id=None, product_id=None, rating=None, timestamp=None):
+        """Query features for a review and record it in one step"""
+        ts = _to_epoch(timestamp)
+        rating = _to_rating(rating)
+        with self._lock:
+            features = self._features(user_id, product_id, rating, ts)
+            self._record(user_id, product_id, rating, ts)
+        return features
+    
+    def update_from_frame(self, df):
+        """Warm the store from historical reviews (user_id, product_id, rating, timestamp columns)"""
+        epochs = _frame_epochs(df, time.time())
+        
+        missing = [None] * len(df)
+        users, products, ratings = (_values(df[name]) if name in df.columns else missing
+                                    for name in ('user_id', 'product_id', 'rating'))
+        
+        # Replay in time order so the last-N timestamps are the most recent ones
+        with self._lock:
+            for i in np.argsort(epochs, kind='stable').tolist():
+                self._record(users[i], products[i], _to_rating(ratings[i]), epochs[i])
+        return self
+    
+    def get_statistics(self):
+        return {'users': len(self.users), 'products': len(self.products)}
+
+
+_SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS behavior_users (
+    user_id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    rated INTEGER NOT NULL,
+    rating_mean REAL NOT NULL,
+    timestamps TEXT NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_behavior_users_seen ON behavior_users (last_seen);
+CREATE TABLE IF NOT EXISTS behavior_products (
+    product_id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    rating_mean REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_behavior_products_seen ON behavior_products (last_seen);
+"""
+
+
+class SharedBehavioralStore:
+    """BehavioralFeatureStore kept in SQLite (WAL mode), shared by all server workers
+    
+    Same features and update rules as the in-memory store, but every worker reads and
+    records the same per-user and per-product rows, so review frequency and bursts are
+    not split across workers and a recycled worker starts from the current history.
+    Recording a review is one write transaction on its user's and product's rows; beyond
+    max_users / max_products the least recently active are pruned every prune_every
+    reviews. Ids are stored as text, so 42 and '42' are the same user.
+    """
+    
+    def __init__(self, db_path='models/behavioral_store.db', history_size=5, burst_window=3600,
+                 max_users=1000000, max_products=500000, prune_every=1000):
+        self.db_path = db_path
+        self.history_size = history_size
+        self.burst_window = burst_window
+        self.max_users = max_users
+        self.max_products = max_products
+        self.prune_every = prune_every
+        self._records = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connect().executescript(_SHARED_SCHEMA)
+    
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def _load(self, conn, user_id, product_id):
+        user = product = None
+        if user_id is not None:
+            row = conn.execute('SELECT count, rated, rating_mean, timestamps FROM behavior_users WHERE user_id = ?',
+                               (user_id,)).fetchone()
+            if row is not None:
+                user = _UserStats(self.history_size)
+                user.count, user.rated, user.rating_mean = row[:3]
+                user.timestamps.extend(float(ts) for ts in row[3].split(',') if ts)
+        if product_id is not None:
+            row = conn.execute('SELECT count, rating_mean FROM behavior_products WHERE product_id = ?',
+                               (product_id,)).fetchone()
+            if row is not None:
+                product = _ProductStats()
+                product.count, product.rating_mean = row
+        return user, product
+    
+    def _save(self, conn, user_id, product_id, user, product, now):
+        if user is not None:
+            conn.execute('INSERT OR REPLACE INTO behavior_users (user_id, count, rated, rating_mean, timestamps, '
+                         'last_seen) VALUES (?, ?, ?, ?, ?, ?)',
+                         (user_id, user.count, user.rated, user.rating_mean,
+                          ','.join(repr(ts) for ts in user.timestamps), now))
+        if product is not None:
+            conn.execute('INSERT OR REPLACE INTO behavior_products (product_id, count, rating_mean, last_seen) '
+                         'VALUES (?, ?, ?, ?)', (product_id, product.count, product.rating_mean, now))
+    
+    def _review(self, user_id, product_id, rating, timestamp, record):
+        ts = _to_epoch(timestamp)
+        rating = _to_rating(rating)
+        user_id = None if user_id is None else str(user_id)
+        product_id = None if product_id is None else str(product_id)
+        conn = self._connect()
+        if not record:
+            user, product = self._load(conn, user_id, product_id)
+            return _review_features(user, product, rating, ts, self.burst_window)
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            user, product = self._load(conn, user_id, product_id)
+            features = _review_features(user, product, rating, ts, self.burst_window)
+            if user_id is not None:
+                user = user or _UserStats(self.history_size)
+                user.add(rating, ts)
+            if product_id is not None and rating is not None:
+                product = product or _ProductStats()
+                product.add(rating)
+            else:
+                product = None
+            self._save(conn, user_id, product_id, user, product, time.time())
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        
+        with self._lock:
+            self._records += 1
+            prune = self._records % self.prune_every == 0
+        if prune:
+            self.prune()
+        return features
+    
+    def query(self, user_id=None, product_id=None, rating=None, timestamp=None):
+        """Behavioral features for an incoming review without recording it"""
+        return self._review(user_id, product_id, rating, timestamp, record=False)
+    
+    def update(self, user_id=None, product_id=None, rating=None, timestamp=None):
+        """Record a review in the shared aggregates"""
+        self._review(user_id, product_id, rating, timestamp, record=True)
+    
+    def observe(self, user_id=None, product_id=None, rating=None, timestamp=None):
+        """Query features for a review and record it in one transaction"""
+        return self._review(user_id, product_id, rating, timestamp, record=True)
+    
+    def prune(self):
+        """Drop the least recently active users and products beyond the caps; returns how many were removed"""
+        conn = self._connect()
+        removed = 0
+        for table, key, limit in (('behavior_users', 'user_id', self.max_users),
+                                  ('behavior_products', 'product_id', self.max_products)):
+            if limit:
+                removed += conn.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table} "
+                                        f"ORDER BY last_seen DESC LIMIT -1 OFFSET ?)", (limit,)).rowcount
+        return removed
+    
+    @property
+    def seeded(self):
+        return self._connect().execute('PRAGMA user_version').fetchone()[0] > 0
+    
+    def seed(self, store):
+        """Add an in-memory store's history (e.g. the one saved by training) once; returns users added
+        
+        Only the first call on a database imports anything, so every worker can call this
+        at startup; delete the database to seed it again from a newer store.
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] > 0:
+                conn.execute('ROLLBACK')
+                return 0
+            # The store's LRU position becomes last_seen, so seeded entries are pruned oldest first
+            # and before anything recorded live (last_seen is then the epoch time)
+            conn.executemany('INSERT OR REPLACE INTO behavior_users (user_id, count, rated, rating_mean, '
+                             'timestamps, last_seen) VALUES (?, ?, ?, ?, ?, ?)',
+                             [(str(user_id), user.count, user.rated, user.rating_mean,
+                               ','.join(repr(float(ts)) for ts in user.timestamps), position)
+                              for position, (user_id, user) in enumerate(store.users.items())])
+            conn.executemany('INSERT OR REPLACE INTO behavior_products (product_id, count, rating_mean, last_seen) '
+                             'VALUES (?, ?, ?, ?)', [(str(product_id), product.count, product.rating_mean, position)
+                                                     for position, (product_id, product)
+                                                     in enumerate(store.products.items())])
+            conn.execute('PRAGMA user_version = 1')
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(store.users)
+    
+    def get_statistics(self):
+        conn = self._connect()
+        return {'users': conn.execute('SELECT COUNT(*) FROM behavior_users').fetchone()[0],
+                'products': conn.execute('SELECT COUNT(*) FROM behavior_products').fetchone()[0]}
+
+
+class BehavioralFeatureExtractor:
+    """Extract behavioral features from review metadata
+    
+    Training and serving compute the same features: a frame of reviews is treated as a
+    history in timestamp order, so every review only sees the reviews before it, exactly
+    like a review arriving at the API through extract_for_review.
+    """
+    
+    def __init__(self, store=None):
+        self.user_history = store if store is not None else BehavioralFeatureStore()
+    
+    def extract_all_behavioral_features(self, df):
+        """Add the behavioral columns to a frame, treating the frame as the whole review history
+        
+        Vectorized (groupby cumulative counts, sums and diffs in timestamp order); gives
+        the same values as replaying the reviews through extract_for_review on an empty
+        store, without the per-row Python loop. The running store is not read or updated.
+        """
+        import pandas as pd
+        
+        n_rows = len(df)
+        epochs = _frame_epochs(df, time.time())
+        order = np.argsort(epochs, kind='stable')
+        ordered_epochs = pd.Series(epochs[order])
+        
+        def ordered(name):
+            if name not in df.columns:
+                return pd.Series(np.nan, index=range(n_rows), dtype=object)
+            return df[name].iloc[order].reset_index(drop=True)
+        
+        def scatter(values):
+            # Values computed in timestamp order, back in the frame's row order
+            column = np.empty(n_rows, dtype=values.dtype)
+            column[order] = values
+            return column
+        
+        # Reviews by the same user so far, and whether the previous one was within the burst window
+        users = ordered('user_id')
+        has_user = users.notna().to_numpy()
+        frequency = np.ones(n_rows, dtype=np.int64)
+        burst = np.zeros(n_rows, dtype=np.int64)
+        if has_user.any():
+            by_user = users[has_user]
+            frequency[has_user] = by_user.groupby(by_user, sort=False).cumcount().to_numpy() + 1
+            if self.user_history.history_size:
+                since_previous = ordered_epochs[has_user].groupby(by_user, sort=False).diff()
+                burst[has_user] = (since_previous < self.user_history.burst_window).to_numpy()
+        
+        # Deviation from the product's mean rating over its rated reviews so far, this one included
+        ratings = pd.to_numeric(ordered('rating'), errors='coerce').astype(float)
+        ratings[~np.isfinite(ratings)] = np.nan
+        products = ordered('product_id')
+        rated = (ratings.notna() & products.notna()).to_numpy()
+        deviation = np.zeros(n_rows)
+        if rated.any():
+            by_product = ratings[rated].groupby(products[rated], sort=False)
+            count = by_product.cumcount().to_numpy() + 1
+            mean = by_product.cumsum().to_numpy() / count
+            deviation[rated] = np.where(count > 1, np.abs(ratings[rated].to_numpy() - mean), 0.0)
+        
+        df['review_frequency'] = scatter(frequency)
+        df['rating_deviation'] = scatter(deviation)
+        df['burst_activity'] = scatter(burst)
+        
+        # Account age at the review's timestamp; unparseable dates count as unknown
         if 'account_created' in df.columns:
-            df['account_created'] = pd.to_datetime(df['account_created'], errors='coerce')
-            df['account_age_days'] = (datetime.now() - df['account_created']).dt.days
-            df['new_account'] = (df['account_age_days'] < 30).astype(int)
+            created = pd.to_datetime(df['account_created'], errors='coerce')
+            age = (epochs - (created - pd.Timestamp(0)).dt.total_seconds().to_numpy()) / 86400
+            known = ~np.isnan(age)
+            df['account_age_days'] = np.where(known, np.trunc(np.nan_to_num(age)), 365).astype(np.int64)
+            df['new_account'] = (known & (np.nan_to_num(age) < 30)).astype(np.int64)
         else:
             df['account_age_days'] = 365
             df['new_account'] = 0
-        return df
-    
-    def extract_verified_purchase(self, df):
-        """Check if purchase is verified"""
+        
         if 'verified_purchase' in df.columns:
-            df['is_verified'] = df['verified_purchase'].astype(int)
+            # Parsed once per distinct value; missing values (code -1) are not verified
+            codes, uniques = pd.factorize(df['verified_purchase'])
+            flags = np.array([_to_flag(value) for value in uniques] + [0], dtype=np.int64)
+            df['is_verified'] = flags[codes]
         else:
             df['is_verified'] = 0
         return df
     
-    def extract_all_behavioral_features(self, df):
-        """Extract all behavioral features"""
-        df = self.extract_review_frequency(df)
-        df = self.extract_rating_deviation(df)
-        df = self.detect_burst_activity(df)
-        df = self.extract_account_age(df)
-        df = self.extract_verified_purchase(df)
-        return df
+    def extract_for_review(self, user_id=None, product_id=None, rating=None, timestamp=None,
+                           account_created=None, verified_purchase=None, record=True):
+        """Behavioral features for a single review from the running user history
+        
+        The review is recorded in the history unless record is False. Account age is
+        measured at the review's timestamp (now, if it has none).
+        """
+        if record:
+            features = self.user_history.observe(user_id, product_id, rating, timestamp)
+        else:
+            features = self.user_history.query(user_id, product_id, rating, timestamp)
+        
+        if account_created is not None:
+            age = (_to_epoch(timestamp) - _to_epoch(account_created)) / 86400
+            features['account_age_days'] = int(age)
+            features['new_account'] = int(age < 30)
+        else:
+            features['account_age_days'] = 365
+            features['new_account'] = 0
+        
+        features['is_verified'] = _to_flag(verified_purchase)
+        return features
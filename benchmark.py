@@ -0,0 +1,430 @@
+"""Offline benchmarks for the training and serving pipeline.
+
+Usage: python benchmark.py <benchmark> [sample_size]
+"""
+import sys
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.sparse import hstack
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import train_test_split
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import SVC
+from config import Config
+from label_generator import SyntheticLabelGenerator
+from data_preprocessing import DataPreprocessor
+
+warnings.filterwarnings('ignore')
+
+
+def load_labeled_sample(sample_size):
+    """Load the dataset and label a sample the same way main.py does"""
+    df = pd.read_csv(Config.DATASET_PATH)
+    return SyntheticLabelGenerator().generate_labels(df, sample_size=sample_size)
+
+
+def _timed_peak(func, *args):
+    """Run func and return (result, seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def _matrix_mb(X):
+    return (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6
+
+
+def bench_feature_assembly(sample_size=20000):
+    """hstack of unscaled float64 features vs. one-allocation scaled float32 CSR"""
+    df = load_labeled_sample(sample_size)
+    y = df['label'].to_numpy()
+    
+    current = DataPreprocessor()
+    df = current.extract_features(df)
+    
+    def legacy_transform():
+        tfidf = TfidfVectorizer(max_features=3000, ngram_range=(1, 3), min_df=2)
+        return hstack([tfidf.fit_transform(df['cleaned_text']), df[current.feature_columns].values]).tocsr()
+    
+    X_legacy, t_legacy, peak_legacy = _timed_peak(legacy_transform)
+    X_current, t_current, peak_current = _timed_peak(current.transform_features, df)
+    
+    print(f"\nTF-IDF fit + assembly on {X_current.shape[0]} x {X_current.shape[1]}")
+    print(f"{'':<12}{'seconds':>10}{'peak MB':>10}{'matrix MB':>11}")
+    print(f"{'hstack':<12}{t_legacy:>10.3f}{peak_legacy:>10.1f}{_matrix_mb(X_legacy):>11.1f}")
+    print(f"{'assembler':<12}{t_current:>10.3f}{peak_current:>10.1f}{_matrix_mb(X_current):>11.1f}")
+    
+    print(f"\n{'model':<24}{'variant':<12}{'accuracy':>10}{'iterations':>12}{'fit s':>8}")
+    for variant, X in (('hstack', X_legacy), ('assembler', X_current)):
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        for name, model in (('Logistic Regression', LogisticRegression(max_iter=1000, solver='liblinear')),
+                            ('SVM', SVC(kernel='rbf', C=Config.SVM_C, gamma='scale', max_iter=100000))):
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            elapsed = time.perf_counter() - start
+            iterations = int(np.max(getattr(model, 'n_iter_', [0])))
+            print(f"{name:<24}{variant:<12}{model.score(X_test, y_test):>10.4f}{iterations:>12}{elapsed:>8.2f}")
+
+
+def bench_clean_text(sample_size=20000):
+    """Original per-token PorterStemmer clean_text vs. memoized batch cleaning"""
+    import re
+    df = pd.read_csv(Config.DATASET_PATH, nrows=sample_size)
+    texts = df['review_text'].tolist()
+    preprocessor = DataPreprocessor()
+    stemmer, stop_words = preprocessor.stemmer, preprocessor.stop_words
+    
+    def legacy_clean_text(text):
+        text = re.sub(r'[^a-z\s]', '', str(text).lower())
+        return ' '.join(stemmer.stem(word) for word in text.split() if word not in stop_words)
+    
+    start = time.perf_counter()
+    expected = [legacy_clean_text(text) for text in texts]
+    t_legacy = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    cold = preprocessor.clean_texts(texts)
+    t_cold = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    preprocessor.clean_texts(texts)
+    t_warm = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for text in texts:
+        preprocessor.clean_text(text)
+    t_single = time.perf_counter() - start
+    
+    assert cold == expected, "memoized cleaning changed the output"
+    print(f"\n{len(texts)} reviews, stem table: {len(preprocessor.stem_cache)} words")
+    print(f"{'variant':<28}{'seconds':>10}{'reviews/s':>12}")
+    for name, elapsed in (('original clean_text', t_legacy), ('clean_texts (cold table)', t_cold),
+                          ('clean_texts (warm table)', t_warm), ('clean_text per review', t_single)):
+        print(f"{name:<28}{elapsed:>10.3f}{len(texts) / elapsed:>12.0f}")
+
+
+def bench_cascade(sample_size=20000):
+    """Throughput and accuracy of the full SVM vs. the LR -> SVM cascade at several bands"""
+    from cascade import CascadeClassifier
+    from model_training import ModelTrainer
+    
+    df = load_labeled_sample(sample_size)
+    X, df = DataPreprocessor().prepare_data(df, fit=True)
+    X_train, X_test, y_train, y_test = train_test_split(X, df['label'].to_numpy(), test_size=0.2, random_state=42)
+    trainer = ModelTrainer()
+    fast_model = trainer.models['Logistic Regression'].fit(X_train, y_train)
+    full_model = trainer.models['SVM'].fit(X_train, y_train)
+    
+    def run(scorer):
+        start = time.perf_counter()
+        predictions = scorer(X_test)
+        return predictions, time.perf_counter() - start
+    
+    full_predictions, t_full = run(lambda X: (full_model.predict(X), full_model.predict_proba(X)))
+    full_accuracy = (full_predictions[0] == y_test).mean()
+    
+    print(f"\n{X_test.shape[0]} test reviews")
+    print(f"{'variant':<22}{'reviews/s':>11}{'speedup':>9}{'escalated':>11}{'accuracy':>10}{'agreement':>11}")
+    print(f"{'SVM only':<22}{X_test.shape[0] / t_full:>11.0f}{1.0:>9.2f}{1.0:>11.1%}{full_accuracy:>10.4f}{1.0:>11.1%}")
+    for lower, upper in ((0.1, 0.95), (0.2, 0.9), (0.3, 0.8), (0.4, 0.6)):
+        cascade = CascadeClassifier(fast_model, full_model, lower, upper)
+        (predictions, _, stages), elapsed = run(cascade.predict_with_stage)
+        print(f"{f'cascade {lower}-{upper}':<22}{X_test.shape[0] / elapsed:>11.0f}{t_full / elapsed:>9.2f}"
+              f"{(stages == CascadeClassifier.FULL).mean():>11.1%}{(predictions == y_test).mean():>10.4f}"
+              f"{(predictions == full_predictions[0]).mean():>11.1%}")
+
+
+def bench_vocabulary(sample_size=50000, chunk_size=5000, max_candidates=60000):
+    """Exact TF-IDF vocabulary fit vs. chunked count-and-prune: peak memory and overlap"""
+    from vocabulary import VocabularyBuilder
+    
+    texts = pd.read_csv(Config.DATASET_PATH, nrows=sample_size)['review_text']
+    preprocessor = DataPreprocessor()
+    cleaned = preprocessor.clean_texts(texts)
+    tfidf = preprocessor.tfidf
+    
+    def exact():
+        return TfidfVectorizer(max_features=tfidf.max_features, ngram_range=tfidf.ngram_range,
+                               min_df=tfidf.min_df).fit(cleaned).vocabulary_
+    
+    def streamed():
+        builder = VocabularyBuilder(tfidf.build_analyzer(), max_features=tfidf.max_features,
+                                    min_df=tfidf.min_df, max_candidates=max_candidates)
+        for start in range(0, len(cleaned), chunk_size):
+            builder.partial_fit(cleaned[start:start + chunk_size])
+        return builder
+    
+    exact_vocabulary, t_exact, peak_exact = _timed_peak(exact)
+    builder, t_streamed, peak_streamed = _timed_peak(streamed)
+    streamed_vocabulary = builder.vocabulary()
+    
+    overlap = len(set(exact_vocabulary) & set(streamed_vocabulary)) / max(len(exact_vocabulary), 1)
+    print(f"\n{len(cleaned)} reviews, {len(exact_vocabulary)} features, chunks of {chunk_size}, "
+          f"{max_candidates} candidates")
+    print(f"{'variant':<22}{'seconds':>10}{'peak MB':>10}")
+    print(f"{'exact (sklearn)':<22}{t_exact:>10.2f}{peak_exact:>10.1f}")
+    print(f"{'count-and-prune':<22}{t_streamed:>10.2f}{peak_streamed:>10.1f}")
+    print(f"vocabulary overlap: {overlap:.2%} ({builder.n_prunes} prunes, "
+          f"peak {builder.peak_candidates} candidates, max pruned count {builder.max_pruned_count})")
+    
+    # The streamed vocabulary drops into the existing vectorizer unchanged
+    X = TfidfVectorizer(ngram_range=tfidf.ngram_range, vocabulary=streamed_vocabulary).fit_transform(cleaned)
+    print(f"TfidfVectorizer(vocabulary=...) matrix: {X.shape[0]} x {X.shape[1]}")
+
+
+def bench_actions(n_reviews=2000, latency_ms=20, batch_size=100):
+    """One platform call per review on the request path vs. grouped bulk calls from the dispatcher"""
+    import contextlib
+    import io
+    import tempfile
+    from action_handler import ReviewActionHandler, PLATFORM_ACTIONS
+    from platform_client import ActionDispatcher, StubPlatformBackend, idempotency_key
+    
+    rng = np.random.RandomState(42)
+    fake_probability = rng.beta(0.5, 2.0, size=n_reviews)
+    results = [{'review_id': f"r{i}", 'prediction': 'FAKE' if p >= 0.5 else 'REAL',
+                'confidence': float(max(p, 1 - p)), 'user_id': f"u{i % 300}"}
+               for i, p in enumerate(fake_probability)]
+    batches = [results[start:start + batch_size] for start in range(0, n_reviews, batch_size)]
+    log_dir = tempfile.mkdtemp()
+    
+    # Baseline: decide_action per review, with the platform call made inline by the hook
+    backend = StubPlatformBackend(latency=latency_ms / 1000)
+    handler = ReviewActionHandler(action_log_dir=f"{log_dir}/single")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for r in results:
+            action = handler.decide_action(r['review_id'], r['prediction'], r['confidence'], r['user_id'])
+            platform_action = PLATFORM_ACTIONS.get(action.get('decision'))
+            if platform_action:
+                backend.apply(platform_action, [r['review_id']], idempotency_key(platform_action, [r['review_id']]))
+    t_single = time.perf_counter() - start
+    single_calls = backend.calls
+    
+    # Batched: decide_actions per scored batch; bulk calls applied by the dispatcher's workers
+    backend = StubPlatformBackend(latency=latency_ms / 1000, failure_rate=0.05)
+    dispatcher = ActionDispatcher(backend, workers=4, backoff=0.01)
+    handler = ReviewActionHandler(action_log_dir=f"{log_dir}/batched", dispatcher=dispatcher)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for batch in batches:
+            handler.decide_actions(batch)
+        t_request_path = time.perf_counter() - start
+        dispatcher.flush()
+    t_batched = time.perf_counter() - start
+    stats = dispatcher.get_statistics()
+    
+    print(f"\n{n_reviews} reviews in batches of {batch_size}, {latency_ms} ms per platform call")
+    print(f"{'variant':<26}{'seconds':>10}{'reviews/s':>12}{'platform calls':>16}")
+    print(f"{'one at a time':<26}{t_single:>10.2f}{n_reviews / t_single:>12.0f}{single_calls:>16}")
+    print(f"{'batched (request path)':<26}{t_request_path:>10.2f}{n_reviews / t_request_path:>12.0f}{'':>16}")
+    print(f"{'batched (until applied)':<26}{t_batched:>10.2f}{n_reviews / t_batched:>12.0f}{backend.calls:>16}")
+    print(f"batched: {stats['applied_reviews']} reviews applied, {stats['retries']} retries after simulated "
+          f"5% failures, {stats['failed_batches']} failed batches")
+    assert len(backend.applied) == stats['submitted_reviews'], "a retried batch was lost or applied twice"
+
+
+def bench_serialization(batch_size=100, repeats=500):
+    """Building and encoding a /predict_batch response: per-row dicts + jsonify vs. columns, compact and binary"""
+    import gzip
+    from flask import Flask
+    import serialization
+    
+    texts = pd.read_csv(Config.DATASET_PATH, nrows=batch_size)['review_text'].astype(str).tolist()
+    rng = np.random.RandomState(42)
+    fake_probability = rng.beta(0.5, 2.0, size=len(texts))
+    probabilities = np.column_stack([1 - fake_probability, fake_probability])
+    predictions = (fake_probability >= 0.5).astype(int)
+    stages = ['full'] * len(texts)
+    review_ids = [f"review-{i}" for i in range(len(texts))]
+    flask_dumps = Flask('bench').json.dumps
+    
+    def per_row_jsonify():
+        results = []
+        for i, review in enumerate(texts):
+            results.append({'review_text': review, 'prediction': 'FAKE' if predictions[i] == 1 else 'REAL',
+                            'confidence': float(max(probabilities[i])),
+                            'fake_probability': float(probabilities[i][1]), 'stage': stages[i]})
+        return flask_dumps({'results': results, 'total': len(results)}).encode('utf-8')
+    
+    def full_columns():
+        labels = np.where(predictions == 1, 'FAKE', 'REAL').tolist()
+        results = [{'review_text': review, 'prediction': label, 'confidence': confidence,
+                    'fake_probability': probability, 'stage': stage}
+                   for review, label, confidence, probability, stage
+                   in zip(texts, labels, probabilities.max(axis=1).tolist(), probabilities[:, 1].tolist(), stages)]
+        return serialization.dumps({'results': results, 'total': len(results)})
+    
+    def compact_json():
+        return serialization.dumps({'total': len(texts), 'prediction': predictions.tolist(),
+                                    'fake_probability': np.round(probabilities[:, 1], 6).tolist(),
+                                    'review_ids': review_ids})
+    
+    def compact_npz():
+        return serialization.npz_bytes({'prediction': predictions.astype(np.int8),
+                                        'fake_probability': probabilities[:, 1].astype(np.float32),
+                                        'review_ids': review_ids})
+    
+    variants = [
+        ('per-row dicts + jsonify', per_row_jsonify),
+        ('full, columns', full_columns),
+        ('full, columns + gzip', lambda: gzip.compress(full_columns(), compresslevel=5)),
+        ('compact JSON', compact_json),
+        ('compact JSON + gzip', lambda: gzip.compress(compact_json(), compresslevel=5)),
+        ('compact npz', compact_npz),
+    ]
+    encoder = 'orjson' if serialization.orjson is not None else 'json (orjson not installed)'
+    print(f"\n{len(texts)}-review batch, {repeats} repeats, encoder: {encoder}")
+    print(f"{'variant':<28}{'ms/batch':>10}{'bytes':>10}")
+    for name, build in variants:
+        body = build()
+        start = time.perf_counter()
+        for _ in range(repeats):
+            build()
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"{name:<28}{elapsed * 1000:>10.3f}{len(body):>10}")
+
+
+def _parse_importtime(stderr):
+    """Parse `-X importtime` output into (depth, module, self_us, cumulative_us) in print order"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        depth = (len(parts[2]) - len(parts[2].lstrip()) - 1) // 2
+        entries.append((depth, parts[2].strip(), int(parts[0]), int(parts[1])))
+    return entries
+
+
+def bench_import_time(budget_ms=4000):
+    """Import-time budget check for the API entry point; exits non-zero when it fails"""
+    import os
+    import subprocess
+    
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    repo_modules = {name[:-3] for name in os.listdir(repo_dir) if name.endswith('.py')}
+    env = dict(os.environ, PYTHONPATH=repo_dir)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, env=env)
+    entries = _parse_importtime(result.stderr)
+    
+    # Children are printed before their parent, so the importer is the next shallower entry
+    def importer(index):
+        depth = entries[index][0]
+        for later_depth, name, _, _ in entries[index + 1:]:
+            if later_depth < depth:
+                return name
+        return None
+    
+    total_ms = sum(cumulative for depth, _, _, cumulative in entries if depth == 0) / 1000
+    print(f"\nimport app: {total_ms:.0f} ms (budget {budget_ms} ms)")
+    print(f"{'top-level import':<40}{'cumulative ms':>14}")
+    app_children = [e for e in entries if e[0] == 1]
+    for _, name, _, cumulative in sorted(app_children, key=lambda e: -e[3])[:10]:
+        print(f"{name:<40}{cumulative / 1000:>14.1f}")
+    
+    failures = []
+    if result.returncode != 0:
+        failures.append(f"import app failed:\n{result.stderr[-2000:]}")
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.0f} ms exceeds budget {budget_ms} ms")
+    for index, (_, name, _, _) in enumerate(entries):
+        if name in ('matplotlib', 'seaborn'):
+            failures.append(f"{name} imported on the serving path (by {importer(index)})")
+        if name == 'pandas':
+            parent = importer(index)
+            if parent in repo_modules:
+                failures.append(f"pandas imported on the serving path by {parent}")
+            else:
+                print(f"note: pandas imported by third-party module {parent}")
+    
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("Import-time budget check passed")
+
+
+def bench_serving(requests_per_run=400, worker_counts=(1, 2, 4), concurrency=16):
+    """Load test: /predict throughput of the pre-fork server at several worker counts"""
+    import os
+    import subprocess
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    port = 5099
+    url = f"http://127.0.0.1:{port}"
+    reviews = pd.read_csv(Config.DATASET_PATH, nrows=requests_per_run)['review_text'].astype(str).tolist()
+    
+    def wait_until_healthy(timeout=120):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if requests.get(f"{url}/health", timeout=1).ok:
+                    return
+            except requests.RequestException:
+                time.sleep(0.5)
+        raise RuntimeError("server did not become healthy")
+    
+    print(f"\n{requests_per_run} /predict requests, {concurrency} concurrent clients, {os.cpu_count()} CPUs")
+    print(f"{'workers':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for workers in worker_counts:
+        # The per-client rate limit would reject most of a single-client load test
+        env = dict(os.environ, API_WORKERS=str(workers), API_PORT=str(port), API_HOST='127.0.0.1',
+                   RATE_LIMIT_ENABLED='false')
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', os.path.join(repo_dir, 'gunicorn.conf.py'),
+                                   '--access-logfile', '/dev/null', 'app:app'],
+                                  cwd=os.getcwd(), env=dict(env, PYTHONPATH=repo_dir),
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_healthy()
+            session_local = {}
+            
+            def send(text):
+                import threading
+                session = session_local.setdefault(threading.get_ident(), requests.Session())
+                start = time.perf_counter()
+                response = session.post(f"{url}/predict", json={'review_text': text.ljust(5)[:5000]})
+                return time.perf_counter() - start, response.status_code
+            
+            with ThreadPoolExecutor(concurrency) as pool:
+                list(pool.map(send, reviews[:concurrency]))  # warm-up
+                start = time.perf_counter()
+                results = list(pool.map(send, reviews))
+                elapsed = time.perf_counter() - start
+            latencies = np.array([latency for latency, _ in results]) * 1000
+            errors = sum(1 for _, status in results if status != 200)
+            print(f"{workers:<10}{len(results) / elapsed:>10.1f}{np.percentile(latencies, 50):>10.1f}"
+                  f"{np.percentile(latencies, 95):>10.1f}{errors:>8}")
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+
+BENCHMARKS = {
+    'feature_assembly': bench_feature_assembly,
+    'clean_text': bench_clean_text,
+    'cascade': bench_cascade,
+    'vocabulary': bench_vocabulary,
+    'actions': bench_actions,
+    'serialization': bench_serialization,
+    'import_time': bench_import_time,
+    'serving': bench_serving,
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmark.py <{'|'.join(BENCHMARKS)}> [sample_size]")
+        sys.exit(1)
+    args = [int(sys.argv[2])] if len(sys.argv) > 2 else []
+    BENCHMARKS[sys.argv[1]](*args)
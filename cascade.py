@@ -0,0 +1,46 @@
+import numpy as np
+
+
+class CascadeClassifier:
+    """Cheap-first model cascade
+    
+    The fast model scores every review; only reviews whose fake probability falls inside
+    the uncertainty band (lower, upper) are escalated to the full model. Outside the band
+    the fast model's answer is already confident enough for ReviewActionHandler to act on.
+    """
+    
+    FAST = 'fast'
+    FULL = 'full'
+    
+    def __init__(self, fast_model, full_model, lower=0.2, upper=0.9):
+        if not 0 <= lower <= upper <= 1:
+            raise ValueError("Uncertainty band must satisfy 0 <= lower <= upper <= 1")
+        self.fast_model = fast_model
+        self.full_model = full_model
+        self.lower = lower
+        self.upper = upper
+    
+    def escalation_mask(self, fast_probabilities):
+        fake_probability = fast_probabilities[:, 1]
+        return (fake_probability > self.lower) & (fake_probability < self.upper)
+    
+    def predict_with_stage(self, X):
+        """Return predictions, class probabilities and the stage that decided each row"""
+        probabilities = self.fast_model.predict_proba(X)
+        predictions = probabilities.argmax(axis=1)
+        stages = np.full(X.shape[0], self.FAST, dtype=object)
+        
+        escalate = self.escalation_mask(probabilities)
+        if escalate.any():
+            rows = np.flatnonzero(escalate)
+            X_uncertain = X[rows]
+            predictions[rows] = self.full_model.predict(X_uncertain)
+            probabilities[rows] = self.full_model.predict_proba(X_uncertain)
+            stages[rows] = self.FULL
+        return predictions, probabilities, stages
+    
+    def predict(self, X):
+        return self.predict_with_stage(X)[0]
+    
+    def predict_proba(self, X):
+        return self.predict_with_stage(X)[1]
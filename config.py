@@ -1,18 +1,98 @@
 import os
 
 class Config:
+    # Data
+    DATASET_PATH = os.getenv('DATASET_PATH', 'ecommerce_product_reviews_dataset.csv')
+    
     # Model settings
     MODEL_PATH = os.getenv('MODEL_PATH', 'models/svm.pkl')
+    PREPROCESSOR_PATH = os.getenv('PREPROCESSOR_PATH', 'models/preprocessor.pkl')
     SAMPLE_SIZE = int(os.getenv('SAMPLE_SIZE', 50000))
     
     # API settings
     API_HOST = os.getenv('API_HOST', '0.0.0.0')
     API_PORT = int(os.getenv('API_PORT', 5000))
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+    API_WORKERS = int(os.getenv('API_WORKERS', os.cpu_count() or 1))
+    # Threads per worker (gthread): with a single sync thread the admission budget never fills
+    API_THREADS = int(os.getenv('API_THREADS', 4))
+    API_TIMEOUT = int(os.getenv('API_TIMEOUT', 30))
+    API_MAX_REQUESTS = int(os.getenv('API_MAX_REQUESTS', 10000))
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    # /predict_batch bodies at least this large are gzipped for clients that accept it
+    RESPONSE_GZIP_MIN_BYTES = int(os.getenv('RESPONSE_GZIP_MIN_BYTES', 1024))
+    RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', 5))
+    
+    # Multi-tenant serving: per-tenant artifact sets under TENANTS_DIR/<tenant_id>/, LRU-cached within a memory budget
+    TENANTS_DIR = os.getenv('TENANTS_DIR', 'models/tenants')
+    TENANT_CACHE_BUDGET_MB = float(os.getenv('TENANT_CACHE_BUDGET_MB', 1024))
+    
+    # E-commerce platform integration for moderation actions ('stub' keeps them local)
+    PLATFORM_BACKEND = os.getenv('PLATFORM_BACKEND', 'stub')
+    PLATFORM_API_URL = os.getenv('PLATFORM_API_URL', '')
+    PLATFORM_API_KEY = os.getenv('PLATFORM_API_KEY', '')
+    PLATFORM_POOL_SIZE = int(os.getenv('PLATFORM_POOL_SIZE', 10))
+    PLATFORM_TIMEOUT = float(os.getenv('PLATFORM_TIMEOUT', 5))
+    PLATFORM_RATE_LIMIT = float(os.getenv('PLATFORM_RATE_LIMIT', 50))
+    PLATFORM_BATCH_SIZE = int(os.getenv('PLATFORM_BATCH_SIZE', 100))
+    PLATFORM_MAX_RETRIES = int(os.getenv('PLATFORM_MAX_RETRIES', 3))
+    ACTION_WORKERS = int(os.getenv('ACTION_WORKERS', 4))
+    # Seconds an exiting server worker waits for queued platform actions (keep below API_TIMEOUT)
+    ACTION_FLUSH_TIMEOUT = float(os.getenv('ACTION_FLUSH_TIMEOUT', 10))
+    
+    # Repeat offenders: decayed per-user counters of FAKE predictions and removals, blocked at a threshold
+    OFFENDER_STORE_PATH = os.getenv('OFFENDER_STORE_PATH', 'actions/blocked_users.jsonl')
+    # Counters live in SQLite so every worker counts towards the same thresholds
+    OFFENDER_DB_PATH = os.getenv('OFFENDER_DB_PATH', 'actions/offender_counters.db')
+    OFFENDER_HALF_LIFE_HOURS = float(os.getenv('OFFENDER_HALF_LIFE_HOURS', 72))
+    OFFENDER_FAKE_THRESHOLD = float(os.getenv('OFFENDER_FAKE_THRESHOLD', 5))
+    OFFENDER_REMOVAL_THRESHOLD = float(os.getenv('OFFENDER_REMOVAL_THRESHOLD', 3))
+    OFFENDER_MAX_USERS = int(os.getenv('OFFENDER_MAX_USERS', 100000))
+    
+    # Moderation queue for flagged reviews (SQLite, shared by all workers)
+    MODERATION_DB_PATH = os.getenv('MODERATION_DB_PATH', 'actions/moderation_queue.db')
+    MODERATION_LEASE_SECONDS = int(os.getenv('MODERATION_LEASE_SECONDS', 600))
+    
+    # Background retraining (retrain_scheduler.py): trigger polling, job limits and publishing
+    RETRAIN_POLL_SECONDS = int(os.getenv('RETRAIN_POLL_SECONDS', 300))
+    RETRAIN_MIN_INTERVAL_SECONDS = int(os.getenv('RETRAIN_MIN_INTERVAL_SECONDS', 3600))
+    RETRAIN_NICE = int(os.getenv('RETRAIN_NICE', 10))
+    RETRAIN_MAX_MEMORY_MB = int(os.getenv('RETRAIN_MAX_MEMORY_MB', 4096))
+    RETRAIN_MAX_CPU_SECONDS = int(os.getenv('RETRAIN_MAX_CPU_SECONDS', 7200))
+    RETRAIN_MIN_IMPROVEMENT = float(os.getenv('RETRAIN_MIN_IMPROVEMENT', 0.0))
+    RETRAIN_BASE_SAMPLE = int(os.getenv('RETRAIN_BASE_SAMPLE', 50000))
+    RETRAIN_CANDIDATES_DIR = os.getenv('RETRAIN_CANDIDATES_DIR', 'models/candidates')
+    RELEASES_DIR = os.getenv('RELEASES_DIR', 'models/releases')
+    RELEASES_KEEP = int(os.getenv('RELEASES_KEEP', 3))
+    RELEASE_MANIFEST_PATH = os.getenv('RELEASE_MANIFEST_PATH', 'models/release.json')
+    # A rejected candidate is remembered here; retraining waits for new feedback after one
+    RETRAIN_STATE_PATH = os.getenv('RETRAIN_STATE_PATH', 'models/retrain_state.json')
+    MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', 5))
+    
+    # Admission control (per worker): in-flight budget in reviews, queue wait and default deadline.
+    # The budget defaults to half a full batch (100 reviews) per thread, so concurrent large
+    # batches are shed instead of all being accepted
+    ADMISSION_MAX_INFLIGHT_REVIEWS = int(os.getenv('ADMISSION_MAX_INFLIGHT_REVIEWS', 50 * API_THREADS))
+    ADMISSION_MAX_WAIT_MS = float(os.getenv('ADMISSION_MAX_WAIT_MS', 100))
+    # Requests that waited longer than this before a worker picked them up (X-Request-Start
+    # header set by the proxy) are shed; 0 disables the check
+    ADMISSION_MAX_QUEUE_MS = float(os.getenv('ADMISSION_MAX_QUEUE_MS', 1000))
+    ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', 1))
+    DEFAULT_REQUEST_TIMEOUT_MS = float(os.getenv('DEFAULT_REQUEST_TIMEOUT_MS', 0))
     
     # Feature extraction
     MAX_FEATURES = int(os.getenv('MAX_FEATURES', 3000))
     NGRAM_RANGE = (1, 3)
+    # Stream the whole dataset in chunks to pick the TF-IDF vocabulary with bounded memory
+    STREAM_VOCABULARY = os.getenv('STREAM_VOCABULARY', 'False').lower() == 'true'
+    VOCAB_CHUNK_SIZE = int(os.getenv('VOCAB_CHUNK_SIZE', 10000))
+    VOCAB_MAX_CANDIDATES = int(os.getenv('VOCAB_MAX_CANDIDATES', 200000))
+    
+    # Training pipeline profiling: a JSON report per run; tracemalloc and cProfile dumps are opt-in (slower)
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'logs/profiles')
+    PROFILE_TRACE_MEMORY = os.getenv('PROFILE_TRACE_MEMORY', 'False').lower() == 'true'
+    PROFILE_TOP_ALLOCATIONS = int(os.getenv('PROFILE_TOP_ALLOCATIONS', 10))
+    PROFILE_CPROFILE = os.getenv('PROFILE_CPROFILE', 'False').lower() == 'true'
     
     # Model hyperparameters
     SVM_C = float(os.getenv('SVM_C', 10))
@@ -21,3 +101,35 @@ class Config:
     
     # Label generation
     FAKE_THRESHOLD = int(os.getenv('FAKE_THRESHOLD', 3))
+    
+    # Near-duplicate detection
+    NEAR_DUP_INDEX_PATH = os.getenv('NEAR_DUP_INDEX_PATH', 'models/near_duplicate_index.pkl')
+    NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', 0.7))
+    NEAR_DUP_NUM_PERM = int(os.getenv('NEAR_DUP_NUM_PERM', 128))
+    NEAR_DUP_BANDS = int(os.getenv('NEAR_DUP_BANDS', 32))
+    # Reviews remembered while serving (SQLite, shared by all workers), newest first
+    NEAR_DUP_RECENT_DB_PATH = os.getenv('NEAR_DUP_RECENT_DB_PATH', 'models/near_duplicate_recent.db')
+    NEAR_DUP_RECENT_CAPACITY = int(os.getenv('NEAR_DUP_RECENT_CAPACITY', 100000))
+    
+    # Behavioral features
+    USE_BEHAVIORAL_FEATURES = os.getenv('USE_BEHAVIORAL_FEATURES', 'True').lower() == 'true'
+    BEHAVIOR_STORE_PATH = os.getenv('BEHAVIOR_STORE_PATH', 'models/behavioral_store.pkl')
+    # Live history shared by all API workers, seeded once from BEHAVIOR_STORE_PATH
+    BEHAVIOR_DB_PATH = os.getenv('BEHAVIOR_DB_PATH', 'models/behavioral_store.db')
+    BEHAVIOR_HISTORY_SIZE = int(os.getenv('BEHAVIOR_HISTORY_SIZE', 5))
+    # Least recently active users/products are evicted beyond these counts
+    BEHAVIOR_MAX_USERS = int(os.getenv('BEHAVIOR_MAX_USERS', 1000000))
+    BEHAVIOR_MAX_PRODUCTS = int(os.getenv('BEHAVIOR_MAX_PRODUCTS', 500000))
+    
+    # Cascade inference: the fast model decides unless its fake probability is inside the band
+    CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'False').lower() == 'true'
+    FAST_MODEL_PATH = os.getenv('FAST_MODEL_PATH', 'models/logistic_regression.pkl')
+    CASCADE_LOWER = float(os.getenv('CASCADE_LOWER', 0.2))
+    CASCADE_UPPER = float(os.getenv('CASCADE_UPPER', 0.9))
+    
+    # Shadow evaluation of a candidate model on sampled live traffic (disabled when no path)
+    SHADOW_MODEL_PATH = os.getenv('SHADOW_MODEL_PATH', '')
+    SHADOW_PREPROCESSOR_PATH = os.getenv('SHADOW_PREPROCESSOR_PATH', PREPROCESSOR_PATH)
+    SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0.1))
+    SHADOW_QUEUE_SIZE = int(os.getenv('SHADOW_QUEUE_SIZE', 1000))
+    SHADOW_WORKERS = int(os.getenv('SHADOW_WORKERS', 1))
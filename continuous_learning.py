@@ -1,7 +1,13 @@
-import pandas as pd
+import csv
+import io
 import joblib
+from contextlib import nullcontext
 from datetime import datetime
 import os
+import threading
+
+# pandas is imported inside the methods that need it so the API can import this module
+# without paying for pandas at startup
 
 class ContinuousLearning:
     """Handle continuous learning and model updates"""
@@ -11,6 +17,10 @@ class ContinuousLearning:
         self.feedback_file = f"{feedback_dir}/feedback_{datetime.now().strftime('%Y%m')}.csv"
         self.models_dir = models_dir
         self.feedback_data = []
+        # Running totals over the feedback file, advanced past rows appended since the last check
+        self._counts = {'total': 0, 'correct': 0}
+        self._counts_offset = 0
+        self._counts_lock = threading.Lock()
     
     def collect_feedback(self, review_text, predicted_label, actual_label, confidence):
         """Collect human feedback on predictions"""
@@ -24,66 +34,148 @@ class ContinuousLearning:
         }
         
         self.feedback_data.append(feedback)
-        self._save_feedback()
+        self._save_feedback(feedback)
         
         return feedback
     
-    def _save_feedback(self):
-        """Save feedback to CSV"""
-        df = pd.DataFrame(self.feedback_data)
-        
-        if os.path.exists(self.feedback_file):
-            existing = pd.read_csv(self.feedback_file)
-            df = pd.concat([existing, df], ignore_index=True)
-        
-        df.to_csv(self.feedback_file, index=False)
+    def _save_feedback(self, feedback):
+        """Append one feedback row to the CSV"""
+        # Rows are appended rather than rewriting the file, so concurrent workers do not lose each other's feedback
+        line = self._csv_line(feedback)
+        with open(self.feedback_file, 'a', newline='') as f:
+            if f.tell() == 0:
+                f.write(self._csv_line({name: name for name in feedback}))
+            f.write(line)
+    
+    @staticmethod
+    def _csv_line(row):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(row.values())
+        return buffer.getvalue()
+    
+    def _feedback_counts(self):
+        """(total, correct) feedback so far, reading only rows appended since the last call"""
+        with self._counts_lock:
+            try:
+                size = os.path.getsize(self.feedback_file)
+            except OSError:
+                size = 0
+            if size < self._counts_offset:
+                # The file was archived by a retrain and started over
+                self._counts = {'total': 0, 'correct': 0}
+                self._counts_offset = 0
+            if size > self._counts_offset:
+                with open(self.feedback_file, 'rb') as f:
+                    f.seek(self._counts_offset)
+                    data = f.read(size - self._counts_offset)
+                # Only count complete lines; a row being written is picked up next time
+                data = data[:data.rfind(b'\n') + 1]
+                self._counts_offset += len(data)
+                reader = csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+                for row in reader:
+                    if row and row[0] != 'timestamp':
+                        self._counts['total'] += 1
+                        self._counts['correct'] += row[-1] == 'True'
+            return self._counts['total'], self._counts['correct']
+    
+    def feedback_count(self):
+        """Feedback rows collected since the last retrain"""
+        return self._feedback_counts()[0]
     
     def check_retraining_needed(self, accuracy_threshold=0.85, min_samples=100):
         """Check if model needs retraining"""
         if not os.path.exists(self.feedback_file):
             return False, "No feedback data available"
         
-        df = pd.read_csv(self.feedback_file)
+        total, correct = self._feedback_counts()
         
-        if len(df) < min_samples:
-            return False, f"Insufficient feedback samples: {len(df)}/{min_samples}"
+        if total < min_samples:
+            return False, f"Insufficient feedback samples: {total}/{min_samples}"
         
-        accuracy = df['correct'].mean()
+        accuracy = correct / total
         
         if accuracy < accuracy_threshold:
             return True, f"Accuracy dropped to {accuracy:.2%}, retraining needed"
         
         return False, f"Model performing well: {accuracy:.2%}"
     
-    def retrain_model(self, preprocessor, model_trainer):
-        """Retrain model with new feedback data"""
-        print("🔄 Starting model retraining...")
+    def load_training_data(self, base_df=None):
+        """Feedback rows labeled from actual_label, appended to base_df (labeled reviews) if given
         
-        # Load feedback data
+        Without a feedback file (e.g. a forced retrain) this is base_df alone.
+        """
+        import pandas as pd
+        
+        if not os.path.exists(self.feedback_file):
+            if base_df is None:
+                raise FileNotFoundError(f"No feedback to train on: {self.feedback_file}")
+            df = base_df.copy()
+            df['label'] = df['label'].astype(int)
+            return df
         df = pd.read_csv(self.feedback_file)
         df['label'] = df['actual_label'].map({'FAKE': 1, 'REAL': 0})
+        df = df.dropna(subset=['label'])
+        if base_df is not None:
+            df = pd.concat([base_df, df[['review_text', 'label']]], ignore_index=True)
+        df['label'] = df['label'].astype(int)
+        return df
+    
+    def retrain_model(self, preprocessor, model_trainer, df=None, output_dir=None, archive=True):
+        """Retrain model with new feedback data
         
-        # Preprocess
-        X, _ = preprocessor.prepare_data(df, fit=True)
-        y = df['label']
-        
-        # Retrain
-        trained_models = model_trainer.train_all(X, y)
+        df defaults to the feedback alone; output_dir (default models_dir) receives the
+        models and preprocessor, so a candidate can be written next to the live ones.
+        """
+        import profiler
         
-        # Save updated models
-        model_trainer.save_models()
-        joblib.dump(preprocessor, f'{self.models_dir}/preprocessor.pkl')
+        print("🔄 Starting model retraining...")
+        output_dir = output_dir or self.models_dir
+        
+        # Profiled as its own run unless it is part of one already (e.g. a larger pipeline)
+        profile = profiler.from_config('retrain') if profiler.active() is None else None
+        with profile or nullcontext():
+            # Load feedback data
+            if df is None:
+                with profiler.stage('load_training_data'):
+                    df = self.load_training_data()
+            
+            # Preprocess
+            with profiler.stage('preprocess'):
+                X, _ = preprocessor.prepare_data(df, fit=True)
+            y = df['label']
+            
+            # Retrain
+            with profiler.stage('train_models'):
+                trained_models = model_trainer.train_all(X, y)
+            
+            # Save updated models
+            with profiler.stage('save_models'):
+                model_trainer.save_models(output_dir)
+                joblib.dump(preprocessor, f'{output_dir}/preprocessor.pkl')
         
         print(f"✅ Model retrained with {len(df)} samples")
+        if profile is not None:
+            print(f"Profile saved to {profile.report_path}")
         
-        # Archive old feedback
-        archive_file = self.feedback_file.replace('.csv', f'_archived_{datetime.now().strftime("%Y%m%d")}.csv')
-        os.rename(self.feedback_file, archive_file)
+        if archive:
+            self.archive_feedback()
         
         return trained_models
     
+    def archive_feedback(self):
+        """Move the current feedback file aside once it has been used for a retrain; None if there is none"""
+        if not os.path.exists(self.feedback_file):
+            return None
+        # Time of day too, so a second retrain on the same day does not overwrite the first archive
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        archive_file = self.feedback_file.replace('.csv', f'_archived_{stamp}.csv')
+        os.rename(self.feedback_file, archive_file)
+        return archive_file
+    
     def detect_new_patterns(self):
         """Detect emerging spam patterns"""
+        import pandas as pd
+        
         if not os.path.exists(self.feedback_file):
             return []
         
@@ -107,6 +199,8 @@ class ContinuousLearning:
     
     def get_learning_stats(self):
         """Get continuous learning statistics"""
+        import pandas as pd
+        
         if not os.path.exists(self.feedback_file):
             return None
         
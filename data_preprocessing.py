@@ -1,48 +1,201 @@
-import pandas as pd
+import numpy as np
 import re
-import nltk
-from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
 from textblob import TextBlob
+from behavioral_features import BehavioralFeatureExtractor
+from english_stopwords import STOP_WORDS
+from profiler import stage
+from vocabulary import VocabularyBuilder
 
-nltk.download('stopwords', quiet=True)
+_NON_ALPHA_RE = re.compile(r'[^a-z\s]')
+
+TEXT_FEATURE_COLUMNS = ['review_length', 'word_count', 'sentiment_polarity',
+                        'sentiment_subjectivity', 'avg_word_length', 'exclamation_count',
+                        'question_count', 'uppercase_ratio']
+BEHAVIORAL_FEATURE_COLUMNS = ['review_frequency', 'rating_deviation', 'burst_activity',
+                              'account_age_days', 'is_verified']
 
 class DataPreprocessor:
-    def __init__(self):
+    def __init__(self, use_behavioral=False, scale_dense=True, stem_cache_size=50000):
         self.stemmer = PorterStemmer()
-        self.stop_words = set(stopwords.words('english'))
-        self.tfidf = TfidfVectorizer(max_features=3000, ngram_range=(1, 3), min_df=2)
+        self.stop_words = set(STOP_WORDS)
+        # word -> stem ('' for stopwords); pickled with the preprocessor so inference starts warm
+        self.stem_cache = {}
+        self.stem_cache_size = stem_cache_size
+        self.tfidf = TfidfVectorizer(max_features=3000, ngram_range=(1, 3), min_df=2, dtype=np.float32)
+        self.use_behavioral = use_behavioral
+        self.scale_dense = scale_dense
+        self.dense_mean_ = None
+        self.dense_scale_ = None
+    
+    def __setstate__(self, state):
+        # Preprocessors pickled before behavioral features / dense scaling existed
+        state.setdefault('use_behavioral', False)
+        state.setdefault('scale_dense', False)
+        state.setdefault('dense_mean_', None)
+        state.setdefault('dense_scale_', None)
+        state.setdefault('stem_cache', {})
+        state.setdefault('stem_cache_size', 50000)
+        self.__dict__.update(state)
+    
+    @property
+    def feature_columns(self):
+        """Dense feature columns appended to the TF-IDF matrix, in model order"""
+        if self.use_behavioral:
+            return TEXT_FEATURE_COLUMNS + BEHAVIORAL_FEATURE_COLUMNS
+        return TEXT_FEATURE_COLUMNS
+    
+    def _normalize_word(self, word):
+        """Stem a word (or '' for a stopword), memoized in the bounded stem table"""
+        stem = self.stem_cache.get(word)
+        if stem is None:
+            stem = '' if word in self.stop_words else self.stemmer.stem(word)
+            # Vocabulary is Zipfian: the frequent words fill the table first, the long tail is stemmed on demand
+            if len(self.stem_cache) < self.stem_cache_size:
+                self.stem_cache[word] = stem
+        return stem
     
     def clean_text(self, text):
-        text = str(text).lower()
-        text = re.sub(r'[^a-z\s]', '', text)
-        tokens = text.split()
-        tokens = [self.stemmer.stem(word) for word in tokens if word not in self.stop_words]
-        return ' '.join(tokens)
+        tokens = _NON_ALPHA_RE.sub('', str(text).lower()).split()
+        return ' '.join(filter(None, map(self._normalize_word, tokens)))
+    
+    def clean_texts(self, texts):
+        """Clean a whole column of reviews in one call"""
+        cache_get = self.stem_cache.get
+        normalize = self._normalize_word
+        sub = _NON_ALPHA_RE.sub
+        cleaned = []
+        for text in texts:
+            stems = []
+            for word in sub('', str(text).lower()).split():
+                stem = cache_get(word)
+                if stem is None:
+                    stem = normalize(word)
+                if stem:
+                    stems.append(stem)
+            cleaned.append(' '.join(stems))
+        return cleaned
+    
+    def text_features(self, texts):
+        """Handcrafted text features (TEXT_FEATURE_COLUMNS order) as an (n, 8) array"""
+        rows = []
+        for text in texts:
+            text = str(text)
+            words = text.split()
+            sentiment = TextBlob(text).sentiment
+            rows.append((
+                len(text),
+                len(words),
+                sentiment.polarity,
+                sentiment.subjectivity,
+                sum(len(word) for word in words) / max(len(words), 1),
+                text.count('!'),
+                text.count('?'),
+                sum(1 for c in text if c.isupper()) / max(len(text), 1)
+            ))
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(TEXT_FEATURE_COLUMNS))
+    
+    def fit_vocabulary(self, text_chunks, max_candidates=200000):
+        """Choose the TF-IDF vocabulary from chunks of raw reviews with bounded memory
+        
+        Lets the vocabulary come from the whole dataset while idf weights and models are
+        still fitted on the training sample; later fits keep this vocabulary.
+        """
+        builder = VocabularyBuilder(self.tfidf.build_analyzer(), max_features=self.tfidf.max_features,
+                                    min_df=self.tfidf.min_df, max_candidates=max_candidates)
+        for texts in text_chunks:
+            builder.partial_fit(self.clean_texts(texts))
+        self.tfidf.set_params(vocabulary=builder.vocabulary())
+        return builder
     
     def extract_features(self, df):
-        df['cleaned_text'] = df['review_text'].apply(self.clean_text)
-        df['review_length'] = df['review_text'].apply(len)
-        df['word_count'] = df['review_text'].apply(lambda x: len(str(x).split()))
-        df['sentiment_polarity'] = df['review_text'].apply(lambda x: TextBlob(str(x)).sentiment.polarity)
-        df['sentiment_subjectivity'] = df['review_text'].apply(lambda x: TextBlob(str(x)).sentiment.subjectivity)
-        df['avg_word_length'] = df['review_text'].apply(lambda x: sum(len(word) for word in str(x).split()) / max(len(str(x).split()), 1))
-        df['exclamation_count'] = df['review_text'].apply(lambda x: str(x).count('!'))
-        df['question_count'] = df['review_text'].apply(lambda x: str(x).count('?'))
-        df['uppercase_ratio'] = df['review_text'].apply(lambda x: sum(1 for c in str(x) if c.isupper()) / max(len(str(x)), 1))
+        with stage('clean_text'):
+            df['cleaned_text'] = self.clean_texts(df['review_text'])
+        with stage('text_features'):
+            features = self.text_features(df['review_text'])
+        for i, column in enumerate(TEXT_FEATURE_COLUMNS):
+            df[column] = features[:, i]
         return df
     
-    def prepare_data(self, df, fit=True):
+    def extract_behavioral_features(self, df, behavioral_features=None):
+        """Add the behavioral block, from precomputed per-review values if given (API) or from the frame"""
+        if behavioral_features is not None:
+            for column in BEHAVIORAL_FEATURE_COLUMNS:
+                df[column] = [features[column] for features in behavioral_features]
+            return df
+        return BehavioralFeatureExtractor().extract_all_behavioral_features(df)
+    
+    def prepare_data(self, df, fit=True, behavioral_features=None):
         df = self.extract_features(df)
-        if fit:
-            tfidf_features = self.tfidf.fit_transform(df['cleaned_text'])
-        else:
-            tfidf_features = self.tfidf.transform(df['cleaned_text'])
-        
-        additional_features = df[['review_length', 'word_count', 'sentiment_polarity', 
-                                    'sentiment_subjectivity', 'avg_word_length', 'exclamation_count',
-                                    'question_count', 'uppercase_ratio']].values
-        from scipy.sparse import hstack
-        X = hstack([tfidf_features, additional_features])
+        if self.use_behavioral:
+            with stage('behavioral_features'):
+                df = self.extract_behavioral_features(df, behavioral_features)
+        X = self.transform_features(df, fit=fit)
         return X, df
+    
+    def prepare_texts(self, texts, behavioral_features=None):
+        """Serving path: model matrix for raw review texts, without building a DataFrame
+        
+        A preprocessor fitted with behavioral features needs one row of them per text,
+        from BehavioralFeatureExtractor.extract_for_review (the same code as training).
+        """
+        texts = list(texts)
+        dense = self.text_features(texts)
+        if self.use_behavioral:
+            if behavioral_features is None or len(behavioral_features) != len(texts):
+                raise ValueError("behavioral_features must have one row per text for this preprocessor")
+            behavioral = np.array([[row[c] for c in BEHAVIORAL_FEATURE_COLUMNS] for row in behavioral_features],
+                                  dtype=np.float64)
+            dense = np.hstack([dense, behavioral])
+        return self._transform(self.clean_texts(texts), dense, fit=False)
+    
+    def transform_features(self, df, fit=True):
+        """Build the model matrix from a frame that already has the extracted feature columns"""
+        return self._transform(df['cleaned_text'], df[self.feature_columns].to_numpy(dtype=np.float64), fit)
+    
+    def _transform(self, cleaned_texts, dense, fit):
+        with stage('tfidf_fit' if fit else 'tfidf_transform'):
+            if fit:
+                tfidf_features = self.tfidf.fit_transform(cleaned_texts)
+            else:
+                tfidf_features = self.tfidf.transform(cleaned_texts)
+        
+        with stage('assemble_features'):
+            if self.scale_dense:
+                if fit:
+                    self.dense_mean_ = dense.mean(axis=0)
+                    std = dense.std(axis=0)
+                    self.dense_scale_ = np.where(std > 0, std, 1.0)
+                dense = (dense - self.dense_mean_) / self.dense_scale_
+            
+            return self.assemble_features(tfidf_features, dense)
+    
+    def assemble_features(self, tfidf_features, dense):
+        """Append the dense block to the TF-IDF matrix, building the CSR arrays in one allocation
+        
+        Equivalent to hstack([tfidf_features, dense]).tocsr() without the intermediate
+        COO matrices; the output keeps the vectorizer's dtype (float32 by default).
+        """
+        tfidf_features = tfidf_features.tocsr()
+        dtype = tfidf_features.dtype
+        n_rows, n_tfidf = tfidf_features.shape
+        n_dense = dense.shape[1]
+        
+        index_dtype = np.int32 if tfidf_features.nnz + n_rows * n_dense < np.iinfo(np.int32).max else np.int64
+        indptr = tfidf_features.indptr.astype(index_dtype) + n_dense * np.arange(n_rows + 1, dtype=index_dtype)
+        nnz = int(indptr[-1])
+        data = np.empty(nnz, dtype=dtype)
+        indices = np.empty(nnz, dtype=index_dtype)
+        
+        # The dense values occupy the last n_dense slots of every row
+        dense_slots = indptr[1:, None] - n_dense + np.arange(n_dense, dtype=index_dtype)
+        is_tfidf = np.ones(nnz, dtype=bool)
+        is_tfidf[dense_slots.ravel()] = False
+        data[is_tfidf] = tfidf_features.data
+        indices[is_tfidf] = tfidf_features.indices
+        data[dense_slots] = dense
+        indices[dense_slots] = n_tfidf + np.arange(n_dense, dtype=index_dtype)
+        
+        return csr_matrix((data, indices, indptr), shape=(n_rows, n_tfidf + n_dense))
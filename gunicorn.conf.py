@@ -0,0 +1,44 @@
+"""Production pre-fork server for the prediction API.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app (model, preprocessor, indexes) is imported once in the master and the workers
+are forked from it, so they share those pages copy-on-write instead of each loading a
+private copy. Send HUP for a graceful worker restart; to pick up new model files, send
+USR2 (start a new master with fresh code and models) followed by WINCH/QUIT to the old one.
+"""
+import gc
+from config import Config
+
+bind = f"{Config.API_HOST}:{Config.API_PORT}"
+workers = Config.API_WORKERS
+# Threaded workers: several requests in flight per worker, which the admission budget bounds
+worker_class = 'gthread'
+threads = Config.API_THREADS
+preload_app = True
+timeout = Config.API_TIMEOUT
+graceful_timeout = Config.API_TIMEOUT
+# Recycle workers periodically so copy-on-write drift and leaks stay bounded
+max_requests = Config.API_MAX_REQUESTS
+max_requests_jitter = max(Config.API_MAX_REQUESTS // 10, 1)
+accesslog = '-'
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the GC's tracked generations; otherwise the
+    # first collection in each worker touches every object header and un-shares the pages
+    gc.freeze()
+    server.log.info(f"Preloaded model shared by {workers} workers")
+
+
+def post_fork(server, worker):
+    import random
+    import numpy as np
+    random.seed()
+    np.random.seed()
+
+
+def worker_exit(server, worker):
+    # Runs in the exiting worker only; the master has no per-worker state to save
+    import app
+    app.shutdown_worker()
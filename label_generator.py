@@ -1,16 +1,32 @@
 import pandas as pd
 import re
 from textblob import TextBlob
+from config import Config
+from near_duplicate import NearDuplicateIndex
+from profiler import stage
 
 class SyntheticLabelGenerator:
     def __init__(self):
         self.fake_indicators = 0
+        self.near_duplicate_index = None
     
     def detect_duplicate_reviews(self, df):
         """Mark duplicate review texts as fake"""
         df['is_duplicate'] = df.duplicated(subset=['review_text'], keep=False).astype(int)
         return df
     
+    def detect_near_duplicates(self, df):
+        """Mark lightly paraphrased copies of other reviews and assign campaign cluster ids"""
+        self.near_duplicate_index = NearDuplicateIndex(
+            num_perm=Config.NEAR_DUP_NUM_PERM,
+            bands=Config.NEAR_DUP_BANDS,
+            threshold=Config.NEAR_DUP_THRESHOLD
+        )
+        doc_ids = self.near_duplicate_index.add_many(df['review_text'])
+        df['duplicate_cluster'] = self.near_duplicate_index.cluster_ids(doc_ids)
+        df['is_near_duplicate'] = (df['duplicate_cluster'] >= 0).astype(int)
+        return df
+    
     def detect_rating_sentiment_mismatch(self, df):
         """Detect mismatch between rating and sentiment"""
         df['sentiment_score'] = df['review_text'].apply(lambda x: TextBlob(str(x)).sentiment.polarity)
@@ -64,13 +80,21 @@ class SyntheticLabelGenerator:
         df = df.sample(n=min(sample_size, len(df)), random_state=42).reset_index(drop=True)
         
         print("Applying heuristics...")
-        df = self.detect_duplicate_reviews(df)
-        df = self.detect_rating_sentiment_mismatch(df)
-        df = self.detect_suspicious_patterns(df)
-        df = self.detect_excessive_caps(df)
+        with stage('duplicates'):
+            df = self.detect_duplicate_reviews(df)
+        with stage('near_duplicates'):
+            df = self.detect_near_duplicates(df)
+        with stage('rating_sentiment_mismatch'):
+            df = self.detect_rating_sentiment_mismatch(df)
+        with stage('suspicious_patterns'):
+            df = self.detect_suspicious_patterns(df)
+        with stage('excessive_caps'):
+            df = self.detect_excessive_caps(df)
         
         # Combine indicators: if 2+ indicators, mark as fake
-        df['fake_score'] = (df['is_duplicate'] + df['rating_mismatch'] + 
+        # Exact duplicates are also near duplicates, so count the two signals once
+        duplicate_signal = df[['is_duplicate', 'is_near_duplicate']].max(axis=1)
+        df['fake_score'] = (duplicate_signal + df['rating_mismatch'] + 
                            df['suspicious_short'] + df['excessive_caps'] + 
                            df['has_generic'] + df['repetitive'])
         
@@ -83,5 +107,7 @@ class SyntheticLabelGenerator:
         print(f"\nLabel Distribution:")
         print(f"Real Reviews: {real_count} ({real_count/len(df)*100:.1f}%)")
         print(f"Fake Reviews: {fake_count} ({fake_count/len(df)*100:.1f}%)")
+        print(f"Near-duplicates: {df['is_near_duplicate'].sum()} reviews in "
+              f"{df.loc[df['duplicate_cluster'] >= 0, 'duplicate_cluster'].nunique()} clusters")
         
         return df
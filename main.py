@@ -4,28 +4,41 @@ from label_generator import SyntheticLabelGenerator
 from data_preprocessing import DataPreprocessor
 from model_training import ModelTrainer
 from model_evaluation import ModelEvaluator
+from config import Config
+from behavioral_features import BehavioralFeatureStore
+from profiler import from_config, print_report, stage
 import warnings
 warnings.filterwarnings('ignore')
 
-def main():
+def run_pipeline():
     print("="*60)
     print("FAKE PRODUCT REVIEW DETECTION SYSTEM")
     print("="*60)
     
     # Load dataset
     print("\n[1/6] Loading dataset...")
-    df = pd.read_csv('ecommerce_product_reviews_dataset.csv')
+    with stage('load_dataset'):
+        df = pd.read_csv(Config.DATASET_PATH)
     print(f"Dataset loaded: {df.shape[0]} reviews")
     
     # Generate synthetic labels
     print("\n[2/6] Generating synthetic fake/real labels...")
     label_gen = SyntheticLabelGenerator()
-    df = label_gen.generate_labels(df, sample_size=50000)
+    with stage('generate_labels'):
+        df = label_gen.generate_labels(df, sample_size=50000)
     
     # Preprocess data
     print("\n[3/6] Preprocessing data...")
-    preprocessor = DataPreprocessor()
-    X, df_processed = preprocessor.prepare_data(df, fit=True)
+    preprocessor = DataPreprocessor(use_behavioral=Config.USE_BEHAVIORAL_FEATURES)
+    with stage('preprocess'):
+        if Config.STREAM_VOCABULARY:
+            with stage('stream_vocabulary'):
+                chunks = pd.read_csv(Config.DATASET_PATH, usecols=['review_text'], chunksize=Config.VOCAB_CHUNK_SIZE)
+                builder = preprocessor.fit_vocabulary((chunk['review_text'] for chunk in chunks),
+                                                      max_candidates=Config.VOCAB_MAX_CANDIDATES)
+            print(f"Vocabulary streamed from {builder.n_documents} reviews "
+                  f"({len(preprocessor.tfidf.vocabulary)} n-grams, {builder.n_prunes} prunes)")
+        X, df_processed = preprocessor.prepare_data(df, fit=True)
     y = df_processed['label']
     print(f"Features extracted: {X.shape[1]} features")
     
@@ -36,30 +49,51 @@ def main():
     # Train models
     print("\n[4/6] Training models...")
     trainer = ModelTrainer()
-    trained_models = trainer.train_all(X_train, y_train)
+    with stage('train_models'):
+        trained_models = trainer.train_all(X_train, y_train)
     
     # Evaluate models
     print("\n[5/6] Evaluating models...")
     evaluator = ModelEvaluator()
-    for name, model in trained_models.items():
-        evaluator.evaluate_model(model, X_test, y_test, name)
+    with stage('evaluate_models'):
+        evaluator.evaluate_all(trained_models, X_test, y_test)
     
     # Compare results
     print("\n[6/6] Comparing models...")
-    df_results = evaluator.compare_models()
-    evaluator.plot_comparison(df_results)
-    
-    # Save models
-    trainer.save_models()
+    with stage('compare_models'):
+        df_results = evaluator.compare_models()
+        evaluator.plot_comparison(df_results)
     
-    # Save preprocessor
-    import joblib
-    joblib.dump(preprocessor, 'models/preprocessor.pkl')
-    print("Saved preprocessor to models/preprocessor.pkl")
+    with stage('save_artifacts'):
+        # Save models
+        trainer.save_models()
+        
+        # Save preprocessor
+        import joblib
+        joblib.dump(preprocessor, 'models/preprocessor.pkl')
+        print("Saved preprocessor to models/preprocessor.pkl")
+        
+        # Save near-duplicate index so the API can match new reviews to known campaigns
+        joblib.dump(label_gen.near_duplicate_index, Config.NEAR_DUP_INDEX_PATH)
+        print(f"Saved near-duplicate index to {Config.NEAR_DUP_INDEX_PATH}")
+        
+        # Warm the behavioral store from the training reviews for request-time features
+        store = BehavioralFeatureStore(history_size=Config.BEHAVIOR_HISTORY_SIZE, max_users=Config.BEHAVIOR_MAX_USERS,
+                                       max_products=Config.BEHAVIOR_MAX_PRODUCTS).update_from_frame(df)
+        joblib.dump(store, Config.BEHAVIOR_STORE_PATH)
+        print(f"Saved behavioral store to {Config.BEHAVIOR_STORE_PATH}")
     
     print("\n" + "="*60)
     print("PROCESS COMPLETED SUCCESSFULLY!")
     print("="*60)
 
+def main():
+    # Every stage is timed; the report is rewritten as stages finish, so a killed run keeps its completed stages
+    profile = from_config('train')
+    with profile:
+        run_pipeline()
+    print_report(profile.report())
+    print(f"Profile saved to {profile.report_path}")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,36 @@
+"""Process memory readings from /proc, shared by the tenant cache, evaluation and profiling.
+
+Kept free of heavy imports so any module can use it without pulling in models.
+"""
+import os
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes():
+    """High-water RSS since the last reset (VmHWM), or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Restart VmHWM from the current RSS (Linux); False if the kernel does not allow it"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
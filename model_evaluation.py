@@ -1,14 +1,23 @@
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, confusion_matrix
+from concurrent.futures import ThreadPoolExecutor
+import io
+import time
+import tracemalloc
+import joblib
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from memory_usage import rss_bytes
+
+SCORE_COLUMNS = ['Accuracy', 'Precision', 'Recall', 'F1-Score']
 
 class ModelEvaluator:
     def __init__(self):
         self.results = {}
     
-    def evaluate_model(self, model, X_test, y_test, model_name):
-        y_pred = model.predict(X_test)
+    def evaluate_model(self, model, X_test, y_test, model_name, y_pred=None):
+        """Score one model; pass y_pred to reuse predictions that were already computed"""
+        if y_pred is None:
+            y_pred = model.predict(X_test)
         
         metrics = {
             'Accuracy': accuracy_score(y_test, y_pred),
@@ -17,7 +26,7 @@ class ModelEvaluator:
             'F1-Score': f1_score(y_test, y_pred, average='weighted')
         }
         
-        self.results[model_name] = metrics
+        self.results.setdefault(model_name, {}).update(metrics)
         
         print(f"\n{'='*50}")
         print(f"{model_name} Results:")
@@ -28,6 +37,91 @@ class ModelEvaluator:
         
         return metrics
     
+    @staticmethod
+    def predict_chunked(model, X, chunk_size=2000):
+        """Predictions and probabilities over X in row chunks, written into one preallocated array each"""
+        n_rows = X.shape[0]
+        y_pred = None
+        y_proba = None
+        for start in range(0, n_rows, chunk_size):
+            X_chunk = X[start:start + chunk_size]
+            pred = model.predict(X_chunk)
+            proba = model.predict_proba(X_chunk)
+            if y_pred is None:
+                y_pred = np.empty(n_rows, dtype=pred.dtype)
+                y_proba = np.empty((n_rows, proba.shape[1]), dtype=proba.dtype)
+            y_pred[start:start + len(pred)] = pred
+            y_proba[start:start + len(proba)] = proba
+        return y_pred, y_proba
+    
+    @staticmethod
+    def profile_inference(model, X, latency_samples=200):
+        """Single-row latency percentiles, serialized size and loaded memory of a model"""
+        rows = np.linspace(0, X.shape[0] - 1, num=min(latency_samples, X.shape[0]), dtype=int)
+        latencies = np.empty(len(rows))
+        for i, row in enumerate(rows):
+            X_row = X[row:row + 1]
+            start = time.perf_counter()
+            model.predict_proba(X_row)
+            latencies[i] = time.perf_counter() - start
+        latencies *= 1000
+        
+        buffer = io.BytesIO()
+        joblib.dump(model, buffer)
+        file_size = buffer.tell()
+        buffer.seek(0)
+        # tracemalloc misses buffers allocated in C (e.g. tree nodes) and RSS misses reused pages; take the larger
+        rss_before = rss_bytes()
+        # Leave tracing on if a pipeline profile is already tracing
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        traced_before, _ = tracemalloc.get_traced_memory()
+        loaded = joblib.load(buffer)
+        loaded_memory = tracemalloc.get_traced_memory()[0] - traced_before
+        if not tracing:
+            tracemalloc.stop()
+        rss_after = rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            loaded_memory = max(loaded_memory, rss_after - rss_before)
+        del loaded
+        
+        return {
+            'p50 latency (ms)': float(np.percentile(latencies, 50)),
+            'p95 latency (ms)': float(np.percentile(latencies, 95)),
+            'p99 latency (ms)': float(np.percentile(latencies, 99)),
+            'File size (MB)': file_size / 1e6,
+            'Loaded memory (MB)': loaded_memory / 1e6
+        }
+    
+    def evaluate_all(self, models, X_test, y_test, chunk_size=2000, n_jobs=None, latency_samples=200):
+        """Score all models concurrently in chunks, then add metrics and inference cost per model
+        
+        Each model is scored once; its prediction and probability arrays are reused for all
+        metrics. Throughput is measured while the models run side by side, so use n_jobs=1
+        for uncontended numbers. Latency and memory are profiled one model at a time.
+        """
+        X_test = X_test.tocsr() if hasattr(X_test, 'tocsr') else X_test
+        
+        def score(model):
+            start = time.perf_counter()
+            y_pred, y_proba = self.predict_chunked(model, X_test, chunk_size)
+            return y_pred, y_proba, time.perf_counter() - start
+        
+        with ThreadPoolExecutor(max_workers=n_jobs or len(models)) as pool:
+            scored = dict(zip(models, pool.map(score, models.values())))
+        
+        predictions = {}
+        for name, model in models.items():
+            y_pred, y_proba, elapsed = scored[name]
+            self.evaluate_model(model, X_test, y_test, name, y_pred=y_pred)
+            cost = {'Throughput (rows/s)': X_test.shape[0] / elapsed}
+            cost.update(self.profile_inference(model, X_test, latency_samples))
+            self.results[name].update(cost)
+            print("Inference cost: " + ", ".join(f"{key} {value:.2f}" for key, value in cost.items()))
+            predictions[name] = (y_pred, y_proba)
+        return predictions
+    
     def compare_models(self):
         df_results = pd.DataFrame(self.results).T
         print(f"\n{'='*50}")
@@ -38,12 +132,21 @@ class ModelEvaluator:
         best_model = df_results['Accuracy'].idxmax()
         best_accuracy = df_results['Accuracy'].max()
         print(f"\nBest Model: {best_model} with Accuracy: {best_accuracy:.4f}")
+        if 'Throughput (rows/s)' in df_results:
+            fastest = df_results['Throughput (rows/s)'].idxmax()
+            print(f"Fastest Model: {fastest} at {df_results.loc[fastest, 'Throughput (rows/s)']:.0f} rows/s")
         
         return df_results
     
     def plot_comparison(self, df_results):
+        # Plotting libraries are slow to import; only load them when a plot is requested
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
         fig, ax = plt.subplots(figsize=(10, 6))
-        df_results.plot(kind='bar', ax=ax)
+        # Cost columns (rows/s, ms, MB) are on other scales than the 0-1 scores
+        df_results[[column for column in SCORE_COLUMNS if column in df_results]].plot(kind='bar', ax=ax)
         plt.title('Model Performance Comparison')
         plt.ylabel('Score')
         plt.xlabel('Models')
@@ -0,0 +1,141 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import joblib
+from cascade import CascadeClassifier
+from memory_usage import rss_bytes
+
+_TENANT_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class UnknownTenant(Exception):
+    """No artifact set exists for the requested tenant"""
+
+
+class ModelRegistry:
+    """Per-tenant model/preprocessor sets, lazily loaded into a memory-bounded LRU cache
+    
+    Each tenant has its own artifact directory (tenants_dir/<tenant_id>/ with svm.pkl,
+    preprocessor.pkl and optionally logistic_regression.pkl for the cascade). The memory
+    cost of a set is the RSS growth measured while loading it (at least its size on disk);
+    least recently used tenants are evicted once the total exceeds the budget. Concurrent
+    first requests for the same tenant share a single load.
+    """
+    
+    def __init__(self, tenants_dir='models/tenants', memory_budget_mb=1024, cascade=False,
+                 cascade_lower=0.2, cascade_upper=0.9):
+        self.tenants_dir = tenants_dir
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.cascade = cascade
+        self.cascade_lower = cascade_lower
+        self.cascade_upper = cascade_upper
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def _tenant_stats(self, tenant_id):
+        stats = self._stats.get(tenant_id)
+        if stats is None:
+            stats = self._stats[tenant_id] = {'hits': 0, 'misses': 0, 'loads': 0, 'load_errors': 0,
+                                              'coalesced_loads': 0, 'evictions': 0, 'load_ms_total': 0.0,
+                                              'last_load_ms': None}
+        return stats
+    
+    def _load(self, tenant_id):
+        tenant_dir = os.path.join(self.tenants_dir, tenant_id)
+        model_path = os.path.join(tenant_dir, 'svm.pkl')
+        preprocessor_path = os.path.join(tenant_dir, 'preprocessor.pkl')
+        fast_model_path = os.path.join(tenant_dir, 'logistic_regression.pkl')
+        if not (os.path.exists(model_path) and os.path.exists(preprocessor_path)):
+            raise UnknownTenant(tenant_id)
+        
+        paths = [model_path, preprocessor_path]
+        rss_before = rss_bytes()
+        model = joblib.load(model_path)
+        preprocessor = joblib.load(preprocessor_path)
+        if self.cascade and os.path.exists(fast_model_path):
+            model = CascadeClassifier(joblib.load(fast_model_path), model, self.cascade_lower, self.cascade_upper)
+            paths.append(fast_model_path)
+        rss_after = rss_bytes()
+        
+        cost = sum(os.path.getsize(path) for path in paths)
+        if rss_before is not None and rss_after is not None:
+            cost = max(cost, rss_after - rss_before)
+        return {'model': model, 'preprocessor': preprocessor}, cost
+    
+    def _evict(self):
+        # Always keep the most recently used set, even if it alone exceeds the budget
+        while self._memory_used > self.memory_budget and len(self._entries) > 1:
+            tenant_id, (_, cost) = self._entries.popitem(last=False)
+            self._memory_used -= cost
+            self._tenant_stats(tenant_id)['evictions'] += 1
+    
+    def get(self, tenant_id):
+        """Return {'model', 'preprocessor'} for a tenant, loading it on first use"""
+        # Unknown ids are rejected before they get a stats entry, so clients cannot grow it unboundedly
+        if not _TENANT_ID_RE.match(tenant_id or '') or not os.path.isdir(os.path.join(self.tenants_dir, tenant_id)):
+            raise UnknownTenant(tenant_id)
+        
+        with self._lock:
+            stats = self._tenant_stats(tenant_id)
+            entry = self._entries.get(tenant_id)
+            if entry is not None:
+                self._entries.move_to_end(tenant_id)
+                stats['hits'] += 1
+                return entry[0]
+            stats['misses'] += 1
+            future = self._loading.get(tenant_id)
+            owner = future is None
+            if owner:
+                future = self._loading[tenant_id] = Future()
+            else:
+                stats['coalesced_loads'] += 1
+        
+        if not owner:
+            return future.result()
+        
+        start = time.perf_counter()
+        try:
+            artifacts, cost = self._load(tenant_id)
+        except Exception as e:
+            with self._lock:
+                stats['load_errors'] += 1
+                del self._loading[tenant_id]
+            future.set_exception(e)
+            raise
+        
+        load_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            stats['loads'] += 1
+            stats['load_ms_total'] += load_ms
+            stats['last_load_ms'] = load_ms
+            self._entries[tenant_id] = (artifacts, cost)
+            self._memory_used += cost
+            self._evict()
+            del self._loading[tenant_id]
+        future.set_result(artifacts)
+        return artifacts
+    
+    def get_statistics(self):
+        with self._lock:
+            tenants = {}
+            for tenant_id, stats in self._stats.items():
+                tenant = dict(stats)
+                loads = tenant.pop('load_ms_total')
+                tenant['avg_load_ms'] = loads / stats['loads'] if stats['loads'] else None
+                lookups = stats['hits'] + stats['misses']
+                tenant['hit_rate'] = stats['hits'] / lookups if lookups else None
+                tenant['cached'] = tenant_id in self._entries
+                tenant['memory_mb'] = self._entries[tenant_id][1] / 1024 / 1024 if tenant_id in self._entries else 0
+                tenants[tenant_id] = tenant
+            return {
+                'cached_tenants': list(self._entries),
+                'memory_used_mb': self._memory_used / 1024 / 1024,
+                'memory_budget_mb': self.memory_budget / 1024 / 1024,
+                'tenants': tenants
+            }
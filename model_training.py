@@ -4,6 +4,7 @@ from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split
 import joblib
 import os
+from profiler import stage
 
 class ModelTrainer:
     def __init__(self):
@@ -17,7 +18,8 @@ class ModelTrainer:
     def train_all(self, X_train, y_train):
         for name, model in self.models.items():
             print(f"Training {name}...")
-            model.fit(X_train, y_train)
+            with stage(name):
+                model.fit(X_train, y_train)
             self.trained_models[name] = model
         return self.trained_models
     
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flagged_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    review_id TEXT NOT NULL UNIQUE,
+    user_id TEXT,
+    review_text TEXT,
+    fake_probability REAL NOT NULL,
+    confidence REAL,
+    flagged_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    claimed_by TEXT,
+    claimed_until REAL,
+    resolution TEXT,
+    resolved_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_flagged_priority ON flagged_reviews (status, fake_probability DESC, id);
+"""
+
+_COLUMNS = ('id', 'review_id', 'user_id', 'review_text', 'fake_probability', 'confidence', 'flagged_at',
+            'status', 'claimed_by', 'claimed_until', 'resolution', 'resolved_at')
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM flagged_reviews"
+
+
+class ModerationQueue:
+    """Persistent queue of flagged reviews for moderators, highest fake probability first
+    
+    Backed by SQLite in WAL mode, so it survives restarts and is shared by all server
+    workers. The (status, fake_probability DESC, id) index serves priority reads, keyset
+    pagination and claims as index seeks, so enqueue and dequeue are O(log n). Moderators
+    claim reviews under a lease; a claim that is not acked before the lease ends goes
+    back to the queue.
+    """
+    
+    def __init__(self, db_path='actions/moderation_queue.db', lease_seconds=600):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._local = threading.local()
+        # executescript manages its own transaction
+        self._connection().executescript(_SCHEMA)
+    
+    def _connection(self):
+        # sqlite3 connections must not cross threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def _connect(self):
+        return _Transaction(self._connection())
+    
+    @staticmethod
+    def _row(row):
+        return dict(zip(_COLUMNS, row))
+    
+    def enqueue(self, review_id, fake_probability, confidence=None, user_id=None, review_text=None):
+        """Add a flagged review; flagging the same review again is a no-op"""
+        return self.enqueue_many([{'review_id': review_id, 'fake_probability': fake_probability,
+                                   'confidence': confidence, 'user_id': user_id,
+                                   'review_text': review_text}])
+    
+    def enqueue_many(self, reviews):
+        """Add flagged reviews in one transaction; returns how many were new"""
+        now = time.time()
+        rows = [(str(r['review_id']), None if r.get('user_id') is None else str(r['user_id']),
+                 r.get('review_text'), float(r['fake_probability']), r.get('confidence'), now)
+                for r in reviews]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany('INSERT OR IGNORE INTO flagged_reviews (review_id, user_id, review_text, '
+                             'fake_probability, confidence, flagged_at) VALUES (?, ?, ?, ?, ?, ?)', rows)
+            return conn.total_changes - before
+    
+    @staticmethod
+    def encode_cursor(row):
+        return f"{row['fake_probability']!r}:{row['id']}"
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        probability, row_id = cursor.rsplit(':', 1)
+        return float(probability), int(row_id)
+    
+    def page(self, status='pending', limit=50, cursor=None):
+        """One page of reviews in priority order, and the cursor of the next page (None at the end)
+        
+        Keyset pagination: the cursor is the (fake_probability, id) of the last row
+        returned, so each page is an index seek regardless of how deep it is.
+        """
+        self._release_expired()
+        params = [status]
+        where = 'status = ?'
+        if cursor:
+            probability, row_id = self.decode_cursor(cursor)
+            where += ' AND (fake_probability < ? OR (fake_probability = ? AND id > ?))'
+            params += [probability, probability, row_id]
+        # A single read in WAL mode needs no transaction, so paging never waits for writers
+        rows = self._connection().execute(f"{_SELECT} WHERE {where} ORDER BY fake_probability DESC, id LIMIT ?",
+                                          params + [limit + 1]).fetchall()
+        items = [self._row(row) for row in rows[:limit]]
+        next_cursor = self.encode_cursor(items[-1]) if len(rows) > limit else None
+        return items, next_cursor
+    
+    def _release_expired(self, conn=None):
+        """Return claims whose lease has ended to the pending queue
+        
+        Without a transaction (reads), the write lock is only taken when a lease has
+        actually expired, which the status index answers from the claimed rows alone.
+        """
+        if conn is None:
+            expired = self._connection().execute("SELECT 1 FROM flagged_reviews WHERE status = 'claimed' "
+                                                 "AND claimed_until < ? LIMIT 1", (time.time(),)).fetchone()
+            if expired is None:
+                return 0
+            with self._connect() as conn:
+                return self._release_expired(conn)
+        return conn.execute("UPDATE flagged_reviews SET status = 'pending', claimed_by = NULL, claimed_until = NULL "
+                            "WHERE status = 'claimed' AND claimed_until < ?", (time.time(),)).rowcount
+    
+    def claim(self, moderator, limit=10, lease_seconds=None):
+        """Claim the highest-priority pending reviews for a moderator"""
+        until = time.time() + (lease_seconds or self.lease_seconds)
+        with self._connect() as conn:
+            self._release_expired(conn)
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM flagged_reviews WHERE status = 'pending' "
+                "ORDER BY fake_probability DESC, id LIMIT ?", (limit,))]
+            if not ids:
+                return []
+            marks = ', '.join('?' * len(ids))
+            conn.execute(f"UPDATE flagged_reviews SET status = 'claimed', claimed_by = ?, claimed_until = ? "
+                         f"WHERE id IN ({marks})", [moderator, until] + ids)
+            rows = conn.execute(f"{_SELECT} WHERE id IN ({marks}) ORDER BY fake_probability DESC, id",
+                                ids).fetchall()
+        return [self._row(row) for row in rows]
+    
+    def ack(self, review_id, moderator, resolution):
+        """Resolve a review claimed by this moderator; False if it is not (or no longer) theirs"""
+        with self._connect() as conn:
+            return conn.execute("UPDATE flagged_reviews SET status = 'resolved', resolution = ?, resolved_at = ?, "
+                                "claimed_until = NULL WHERE review_id = ? AND status = 'claimed' AND claimed_by = ? "
+                                "AND claimed_until >= ?",
+                                (resolution, time.time(), str(review_id), moderator, time.time())).rowcount == 1
+    
+    def release(self, review_id, moderator):
+        """Hand a claimed review back to the queue"""
+        with self._connect() as conn:
+            return conn.execute("UPDATE flagged_reviews SET status = 'pending', claimed_by = NULL, "
+                                "claimed_until = NULL WHERE review_id = ? AND status = 'claimed' AND claimed_by = ?",
+                                (str(review_id), moderator)).rowcount == 1
+    
+    def get_statistics(self):
+        self._release_expired()
+        counts = dict(self._connection().execute('SELECT status, COUNT(*) FROM flagged_reviews '
+                                                 'GROUP BY status').fetchall())
+        return {status: counts.get(status, 0) for status in ('pending', 'claimed', 'resolved')}
+
+
+class _Transaction:
+    """Context manager running a block in one write transaction on a shared connection"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+    
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
@@ -1,40 +1,130 @@
-import pandas as pd
-import numpy as np
 from datetime import datetime
+import atexit
+import glob
 import json
 import os
+import threading
+import time
 
 class ModelMonitor:
-    def __init__(self, monitor_dir='monitoring'):
+    """Prediction statistics kept as running counters
+    
+    Under a multi-worker server every worker process has its own counters; each one
+    periodically publishes a snapshot to a shared directory so statistics and drift can
+    be reported across all workers.
+    """
+    
+    def __init__(self, monitor_dir='monitoring', snapshot_interval=5.0):
         os.makedirs(monitor_dir, exist_ok=True)
-        self.monitor_file = f"{monitor_dir}/metrics_{datetime.now().strftime('%Y%m%d')}.json"
-        self.predictions = []
+        day = datetime.now().strftime('%Y%m%d')
+        self.monitor_file = f"{monitor_dir}/metrics_{day}.json"
+        self.worker_dir = f"{monitor_dir}/workers_{day}"
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self._reset()
+        atexit.register(self.publish_snapshot)
+    
+    def _reset(self):
+        self._pid = os.getpid()
+        self._started = time.time()
+        self._last_snapshot = 0.0
+        self.counts = {
+            'total_predictions': 0,
+            'fake_count': 0,
+            'real_count': 0,
+            'confidence_sum': 0.0,
+            'min_confidence': None,
+            'max_confidence': None,
+            'low_confidence_count': 0
+        }
     
     def track_prediction(self, confidence, prediction):
-        self.predictions.append({
-            'timestamp': datetime.now().isoformat(),
-            'confidence': confidence,
-            'prediction': prediction
-        })
+        with self._lock:
+            # A forked worker inherits the parent's counters; start its own
+            if os.getpid() != self._pid:
+                self._reset()
+            counts = self.counts
+            counts['total_predictions'] += 1
+            if prediction == 'FAKE':
+                counts['fake_count'] += 1
+            elif prediction == 'REAL':
+                counts['real_count'] += 1
+            counts['confidence_sum'] += confidence
+            if counts['min_confidence'] is None or confidence < counts['min_confidence']:
+                counts['min_confidence'] = confidence
+            if counts['max_confidence'] is None or confidence > counts['max_confidence']:
+                counts['max_confidence'] = confidence
+            if confidence < 0.7:
+                counts['low_confidence_count'] += 1
+            publish = time.time() - self._last_snapshot >= self.snapshot_interval
+        
+        if publish:
+            self.publish_snapshot()
     
-    def get_statistics(self):
-        if not self.predictions:
+    @staticmethod
+    def _summarize(counts):
+        if not counts['total_predictions']:
             return None
-        
-        df = pd.DataFrame(self.predictions)
-        stats = {
-            'total_predictions': len(df),
-            'fake_count': sum(df['prediction'] == 'FAKE'),
-            'real_count': sum(df['prediction'] == 'REAL'),
-            'avg_confidence': df['confidence'].mean(),
-            'min_confidence': df['confidence'].min(),
-            'max_confidence': df['confidence'].max(),
-            'low_confidence_count': sum(df['confidence'] < 0.7)
+        return {
+            'total_predictions': counts['total_predictions'],
+            'fake_count': counts['fake_count'],
+            'real_count': counts['real_count'],
+            'avg_confidence': counts['confidence_sum'] / counts['total_predictions'],
+            'min_confidence': counts['min_confidence'],
+            'max_confidence': counts['max_confidence'],
+            'low_confidence_count': counts['low_confidence_count']
         }
+    
+    def get_statistics(self):
+        """Statistics for predictions served by this process"""
+        with self._lock:
+            return self._summarize(self.counts)
+    
+    def publish_snapshot(self):
+        """Write this process's counters to the shared worker directory"""
+        with self._lock:
+            if os.getpid() != self._pid or not self.counts['total_predictions']:
+                return
+            snapshot = dict(self.counts, pid=self._pid, updated=time.time())
+            path = f"{self.worker_dir}/{self._pid}_{int(self._started)}.json"
+            self._last_snapshot = snapshot['updated']
+        
+        try:
+            os.makedirs(self.worker_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error publishing monitor snapshot: {e}")
+    
+    def get_aggregate_statistics(self):
+        """Statistics across all worker processes that published a snapshot today"""
+        self.publish_snapshot()
+        total = None
+        for path in glob.glob(f"{self.worker_dir}/*.json"):
+            try:
+                with open(path) as f:
+                    counts = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if total is None:
+                total = counts
+                continue
+            for key in ('total_predictions', 'fake_count', 'real_count', 'confidence_sum', 'low_confidence_count'):
+                total[key] += counts[key]
+            total['min_confidence'] = min(total['min_confidence'], counts['min_confidence'])
+            total['max_confidence'] = max(total['max_confidence'], counts['max_confidence'])
+        
+        if total is None:
+            return self.get_statistics()
+        stats = self._summarize(total)
+        if stats:
+            stats['workers'] = len(glob.glob(f"{self.worker_dir}/*.json"))
         return stats
     
     def save_metrics(self):
-        stats = self.get_statistics()
+        stats = self.get_aggregate_statistics()
         if stats:
             with open(self.monitor_file, 'w') as f:
                 json.dump(stats, f, indent=2)
@@ -43,7 +133,7 @@ class ModelMonitor:
     
     def check_drift(self, expected_fake_ratio=0.15, threshold=0.1):
         """Check if prediction distribution has drifted"""
-        stats = self.get_statistics()
+        stats = self.get_aggregate_statistics()
         if not stats or stats['total_predictions'] < 100:
             return False, "Insufficient data"
         
@@ -0,0 +1,288 @@
+import os
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class NearDuplicateIndex:
+    """MinHash + LSH index for finding lightly paraphrased (near-duplicate) reviews.
+
+    Each review is reduced to a set of word shingles, summarised by a MinHash
+    signature and bucketed by LSH bands, so adding or querying a review only
+    compares it against the few reviews sharing a band instead of the whole
+    corpus. Matches are grouped into campaign clusters with union-find.
+    """
+
+    def __init__(self, num_perm=128, bands=32, threshold=0.7, shingle_size=3,
+                 max_bucket_size=8, seed=42):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_bucket_size = max_bucket_size
+
+        # a, b and the shingle hashes stay below 2^32, so a * hash fits in uint64
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MAX_HASH), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_MAX_HASH), size=num_perm).astype(np.uint64)
+
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._size = 0
+        self._parent = []
+        self._cluster_size = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_signatures'] = self._signatures[:self._size].copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _shingles(self, text):
+        tokens = _TOKEN_RE.findall(str(text).lower())
+        if not tokens:
+            return set()
+        k = self.shingle_size
+        if len(tokens) <= k:
+            return {' '.join(tokens)}
+        return {' '.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+    def signature(self, text):
+        """MinHash signature of a review, or None if it has no tokens"""
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+        hv = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+        # Reduce the product before adding b so the sum cannot wrap around either
+        phv = (np.outer(self._a, hv) % _MERSENNE_PRIME + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return phv.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, sig):
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def _find(self, doc_id):
+        parent = self._parent
+        root = doc_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[doc_id] != root:
+            parent[doc_id], doc_id = root, parent[doc_id]
+        return root
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return ra
+        # Keep the older document as the cluster id so ids stay stable as the index grows
+        if rb < ra:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._cluster_size[ra] += self._cluster_size[rb]
+        return ra
+
+    def _best_match(self, sig, keys):
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        if not candidates:
+            return None, 0.0
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self._signatures[ids] == sig).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None, float(similarities[best])
+        return int(ids[best]), float(similarities[best])
+
+    def _append_signature(self, sig):
+        if self._size == self._signatures.shape[0]:
+            capacity = max(1024, self._signatures.shape[0] * 2)
+            grown = np.empty((capacity, self.num_perm), dtype=np.uint32)
+            grown[:self._size] = self._signatures[:self._size]
+            self._signatures = grown
+        self._signatures[self._size] = sig
+        self._size += 1
+        return self._size - 1
+
+    def add(self, text):
+        """Add a review to the index and return its document id (None if empty)"""
+        sig = self.signature(text)
+        if sig is None:
+            return None
+        keys = self.band_keys(sig)
+        with self._lock:
+            match, _ = self._best_match(sig, keys)
+            doc_id = self._append_signature(sig)
+            self._parent.append(doc_id)
+            self._cluster_size.append(1)
+            if match is not None:
+                self._union(match, doc_id)
+            for band, key in enumerate(keys):
+                bucket = self._buckets[band].setdefault(key, [])
+                if len(bucket) < self.max_bucket_size:
+                    bucket.append(doc_id)
+        return doc_id
+
+    def add_many(self, texts):
+        """Add reviews in order and return their document ids"""
+        return [self.add(text) for text in texts]
+
+    def query(self, text):
+        """Check whether a review matches a known near-duplicate campaign"""
+        return self.query_signature(self.signature(text))
+
+    def query_signature(self, sig):
+        """query() for a precomputed signature (None for an empty review)"""
+        result = {'is_near_duplicate': False, 'cluster_id': None, 'similarity': 0.0}
+        if sig is None:
+            return result
+        with self._lock:
+            match, similarity = self._best_match(sig, self.band_keys(sig))
+            result['similarity'] = similarity
+            if match is not None:
+                result['is_near_duplicate'] = True
+                result['cluster_id'] = self._find(match)
+        return result
+
+    def cluster_id(self, doc_id):
+        """Cluster id of a document, or -1 if it has no near duplicates"""
+        if doc_id is None:
+            return -1
+        root = self._find(doc_id)
+        return root if self._cluster_size[root] > 1 else -1
+
+    def cluster_ids(self, doc_ids):
+        return np.array([self.cluster_id(doc_id) for doc_id in doc_ids], dtype=np.int64)
+
+
+_WINDOW_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recent_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    signature BLOB NOT NULL,
+    base_cluster INTEGER,
+    recent_cluster INTEGER
+);
+CREATE TABLE IF NOT EXISTS recent_buckets (
+    bucket BLOB NOT NULL,
+    review INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recent_bucket ON recent_buckets (bucket);
+CREATE INDEX IF NOT EXISTS idx_recent_review ON recent_buckets (review);
+"""
+
+
+class RecentDuplicateWindow:
+    """Bounded window of reviews seen while serving, matched alongside a read-only index.
+
+    The training-time NearDuplicateIndex is never modified by the API. Reviews to
+    remember (matches and new fakes) go into this window instead: their signatures and
+    LSH buckets live in SQLite (WAL mode), so the window is shared by all server
+    workers and survives restarts, and only the newest `capacity` reviews are kept.
+    A review matching a training-time campaign keeps that campaign's cluster id;
+    campaigns first seen in live traffic get ids of the form 'recent-<n>'.
+    """
+
+    def __init__(self, index, db_path='models/near_duplicate_recent.db', capacity=100000):
+        self.index = index
+        self.db_path = db_path
+        self.capacity = capacity
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(_WINDOW_SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM recent_reviews').fetchone()[0]
+
+    def signature(self, text):
+        return self.index.signature(text)
+
+    def _buckets(self, sig):
+        return [band.to_bytes(2, 'big') + key for band, key in enumerate(self.index.band_keys(sig))]
+
+    def _candidates(self, conn, buckets):
+        marks = ', '.join('?' * len(buckets))
+        return conn.execute(f"SELECT id, signature, base_cluster, recent_cluster FROM recent_reviews WHERE id IN "
+                            f"(SELECT DISTINCT review FROM recent_buckets WHERE bucket IN ({marks}))",
+                            buckets).fetchall()
+
+    def query(self, sig):
+        """Best match for a signature in the training-time index or the window"""
+        result = self.index.query_signature(sig)
+        if sig is None:
+            return result
+        rows = self._candidates(self._connect(), self._buckets(sig))
+        if not rows:
+            return result
+        signatures = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.uint32).reshape(len(rows), -1)
+        similarities = (signatures == sig).mean(axis=1)
+        best = int(similarities.argmax())
+        similarity = float(similarities[best])
+        if similarity > result['similarity']:
+            result['similarity'] = similarity
+            if similarity >= self.index.threshold:
+                _, _, base_cluster, recent_cluster = rows[best]
+                result['is_near_duplicate'] = True
+                result['cluster_id'] = base_cluster if base_cluster is not None else f"recent-{recent_cluster}"
+        return result
+
+    def add(self, sig, match=None):
+        """Remember a review (by signature) in its matched campaign, evicting the oldest beyond capacity"""
+        if sig is None:
+            return None
+        base_cluster = recent_cluster = None
+        if match and match['is_near_duplicate']:
+            cluster = match['cluster_id']
+            if isinstance(cluster, str):
+                recent_cluster = int(cluster.split('-', 1)[1])
+            else:
+                base_cluster = cluster
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            review = conn.execute('INSERT INTO recent_reviews (signature, base_cluster, recent_cluster) '
+                                  'VALUES (?, ?, ?)', (sig.astype(np.uint32).tobytes(), base_cluster,
+                                                       recent_cluster)).lastrowid
+            if base_cluster is None and recent_cluster is None:
+                conn.execute('UPDATE recent_reviews SET recent_cluster = id WHERE id = ?', (review,))
+            conn.executemany('INSERT INTO recent_buckets (bucket, review) VALUES (?, ?)',
+                             [(bucket, review) for bucket in self._buckets(sig)])
+            oldest = review - self.capacity
+            if oldest > 0:
+                conn.execute('DELETE FROM recent_buckets WHERE review <= ?', (oldest,))
+                conn.execute('DELETE FROM recent_reviews WHERE id <= ?', (oldest,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return review
@@ -0,0 +1,203 @@
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offender_counters (
+    user_id TEXT PRIMARY KEY,
+    fake REAL NOT NULL,
+    removal REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_offender_updated ON offender_counters (updated);
+"""
+
+
+class OffenderTracker:
+    """Per-user time-decayed offence counters with automatic blocking
+    
+    Each tracked user holds two exponentially decayed counters (FAKE predictions and
+    removals) and the time they were last updated, so recording an offence is one
+    indexed read-modify-write and old behaviour fades with the configured half-life.
+    The counters live in SQLite (WAL mode, like the moderation queue), so every server
+    worker counts towards the same thresholds; beyond max_users the least recently
+    active users are pruned. Blocks are appended to a JSONL store, which is replayed on
+    start and re-read when another worker appends to it.
+    """
+    
+    def __init__(self, store_path='actions/blocked_users.jsonl', counters_path='actions/offender_counters.db',
+                 half_life_hours=72.0, fake_threshold=5.0, removal_threshold=3.0, max_users=100000,
+                 refresh_interval=1.0, prune_every=1000):
+        self.store_path = store_path
+        self.counters_path = counters_path
+        self.half_life = half_life_hours * 3600
+        self.fake_threshold = fake_threshold
+        self.removal_threshold = removal_threshold
+        self.max_users = max_users
+        self.refresh_interval = refresh_interval
+        self.prune_every = prune_every
+        self.blocked = {}
+        self._offset = 0
+        self._last_refresh = 0.0
+        self._records = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        for path in (store_path, counters_path):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+        self._refresh(force=True)
+    
+    def _connect(self):
+        # sqlite3 connections must not cross threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.counters_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def _refresh(self, force=False):
+        """Apply block/unblock records appended since the last read (by any worker)"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = now
+        try:
+            if os.path.getsize(self.store_path) == self._offset:
+                return
+            with open(self.store_path, 'rb') as f:
+                f.seek(self._offset)
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            # A partially written last line is picked up on the next refresh
+            if not line.endswith(b'\n'):
+                break
+            self._offset += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('action') == 'BLOCK':
+                self.blocked[record['user_id']] = record
+            elif record.get('action') == 'UNBLOCK':
+                self.blocked.pop(record['user_id'], None)
+    
+    def _append(self, record):
+        with open(self.store_path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    
+    def is_blocked(self, user_id):
+        """Block record for a user, or None; a dict lookup plus an occasional store refresh"""
+        if user_id is None:
+            return None
+        with self._lock:
+            self._refresh()
+            return self.blocked.get(str(user_id))
+    
+    def _decay(self, now, updated):
+        return 0.5 ** (max(now - updated, 0.0) / self.half_life)
+    
+    def scores(self, user_id, now=None):
+        """Current decayed (fake, removal) counters of a user"""
+        now = time.time() if now is None else now
+        row = self._connect().execute('SELECT fake, removal, updated FROM offender_counters WHERE user_id = ?',
+                                      (str(user_id),)).fetchone()
+        if row is None:
+            return 0.0, 0.0
+        decay = self._decay(now, row[2])
+        return row[0] * decay, row[1] * decay
+    
+    def record(self, user_id, fake=False, removal=False, now=None):
+        """Count an offence; returns a block reason when the user crosses a threshold, else None"""
+        if user_id is None or not (fake or removal):
+            return None
+        user_id = str(user_id)
+        now = time.time() if now is None else now
+        if self.is_blocked(user_id):
+            return None
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT fake, removal, updated FROM offender_counters WHERE user_id = ?',
+                               (user_id,)).fetchone()
+            fake_score, removal_score = (0.0, 0.0) if row is None else \
+                (row[0] * self._decay(now, row[2]), row[1] * self._decay(now, row[2]))
+            fake_score += fake
+            removal_score += removal
+            conn.execute('INSERT OR REPLACE INTO offender_counters (user_id, fake, removal, updated) '
+                         'VALUES (?, ?, ?, ?)', (user_id, fake_score, removal_score, max(now, row[2] if row else now)))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        
+        with self._lock:
+            self._records += 1
+            prune = self._records % self.prune_every == 0
+        if prune:
+            self.prune()
+        
+        # Rounding keeps back-to-back offences from missing the threshold by the decay of a few ms
+        if round(removal_score, 6) >= self.removal_threshold:
+            return f"{removal_score:.1f} recent removals (threshold {self.removal_threshold})"
+        if round(fake_score, 6) >= self.fake_threshold:
+            return f"{fake_score:.1f} recent fake reviews (threshold {self.fake_threshold})"
+        return None
+    
+    def prune(self):
+        """Drop the least recently active users beyond max_users; returns how many were removed"""
+        conn = self._connect()
+        return conn.execute('DELETE FROM offender_counters WHERE user_id IN (SELECT user_id FROM offender_counters '
+                            'ORDER BY updated DESC LIMIT -1 OFFSET ?)', (self.max_users,)).rowcount
+    
+    def block(self, user_id, reason, source='auto'):
+        """Block a user and append the block to the store"""
+        user_id = str(user_id)
+        record = {'action': 'BLOCK', 'user_id': user_id, 'reason': reason, 'source': source,
+                  'timestamp': datetime.now().isoformat()}
+        with self._lock:
+            self._refresh(force=True)
+            if user_id in self.blocked:
+                return self.blocked[user_id]
+            self._append(record)
+            self._refresh(force=True)
+        self._clear(user_id)
+        return record
+    
+    def unblock(self, user_id, reason):
+        """Lift a block (e.g. after a successful appeal); returns False if the user was not blocked"""
+        user_id = str(user_id)
+        with self._lock:
+            self._refresh(force=True)
+            if user_id not in self.blocked:
+                return False
+            self._append({'action': 'UNBLOCK', 'user_id': user_id, 'reason': reason,
+                          'timestamp': datetime.now().isoformat()})
+            self._refresh(force=True)
+        # Offences counted by a worker that had not seen the block yet must not carry over
+        self._clear(user_id)
+        return True
+    
+    def _clear(self, user_id):
+        self._connect().execute('DELETE FROM offender_counters WHERE user_id = ?', (user_id,))
+    
+    def get_statistics(self):
+        tracked = self._connect().execute('SELECT COUNT(*) FROM offender_counters').fetchone()[0]
+        with self._lock:
+            self._refresh()
+            return {
+                'blocked_users': len(self.blocked),
+                'tracked_users': tracked,
+                'max_tracked_users': self.max_users,
+                'half_life_hours': self.half_life / 3600,
+                'fake_threshold': self.fake_threshold,
+                'removal_threshold': self.removal_threshold
+            }
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+
+class PlatformError(Exception):
+    """A platform API call failed; retryable errors (timeouts, 429, 5xx) are tried again"""
+    
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def idempotency_key(action, review_ids):
+    """Stable key for one bulk action, so a retried or replayed call is applied only once"""
+    payload = f"{action}:{','.join(sorted(str(review_id) for review_id in review_ids))}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class PlatformBackend:
+    """E-commerce platform moderation API; subclasses apply one action to a batch of reviews"""
+    
+    max_batch_size = 100
+    
+    def apply(self, action, review_ids, idempotency_key):
+        raise NotImplementedError
+
+
+class StubPlatformBackend(PlatformBackend):
+    """Local stand-in for the platform API, for development and tests
+    
+    Simulates per-call latency and transient failures and honours idempotency keys
+    the way a real platform would: a repeated key returns the original result.
+    """
+    
+    def __init__(self, latency=0.0, failure_rate=0.0, max_batch_size=100):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_batch_size = max_batch_size
+        self._random = random.Random(42)
+        self._lock = threading.Lock()
+        self.results = {}
+        self.applied = {}
+        self.calls = 0
+    
+    def apply(self, action, review_ids, idempotency_key):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if idempotency_key in self.results:
+                return self.results[idempotency_key]
+            if self._random.random() < self.failure_rate:
+                raise PlatformError("Stub platform: simulated transient failure")
+            for review_id in review_ids:
+                self.applied[review_id] = action
+            result = {'action': action, 'applied': len(review_ids)}
+            self.results[idempotency_key] = result
+            return result
+
+
+class HTTPPlatformBackend(PlatformBackend):
+    """Platform bulk-moderation endpoint over a pooled keep-alive HTTP session"""
+    
+    def __init__(self, base_url, api_key=None, pool_size=10, timeout=5.0, max_batch_size=100):
+        # requests is only needed when a real platform is configured
+        import requests
+        from requests.adapters import HTTPAdapter
+        self._requests = requests
+        self.url = f"{base_url.rstrip('/')}/reviews/bulk_actions"
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+    
+    def apply(self, action, review_ids, idempotency_key):
+        try:
+            response = self.session.post(self.url, json={'action': action, 'review_ids': list(review_ids)},
+                                         headers={'Idempotency-Key': idempotency_key}, timeout=self.timeout)
+        except self._requests.RequestException as e:
+            raise PlatformError(f"Platform request failed: {e}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise PlatformError(f"Platform returned {response.status_code}")
+        if response.status_code >= 400:
+            raise PlatformError(f"Platform rejected {action}: {response.status_code} {response.text[:200]}",
+                                retryable=False)
+        return response.json() if response.content else {}
+
+
+class TokenBucket:
+    """Blocking rate limiter: at most rate calls per second, with bursts up to burst"""
+    
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ActionDispatcher:
+    """Applies moderation actions on the platform from background workers
+    
+    Callers hand over a whole group of reviews that share an action; it is split into
+    backend-sized batches and queued without blocking, so the request path never waits on
+    the platform; when the queue is full the batch is dropped and logged. Workers call the
+    backend through an optional rate limiter, retry transient errors with exponential
+    backoff and reuse the batch's idempotency key on every attempt.
+    """
+    
+    def __init__(self, backend, workers=4, max_queue=10000, max_retries=3, backoff=0.5, rate_limit=None):
+        self.backend = backend
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._pid = None
+        self.counts = {'submitted_batches': 0, 'submitted_reviews': 0, 'applied_batches': 0,
+                       'applied_reviews': 0, 'retries': 0, 'failed_batches': 0, 'dropped_batches': 0,
+                       'call_seconds': 0.0}
+        self.failed = deque(maxlen=100)
+    
+    def _ensure_workers(self):
+        # Threads do not survive fork, so each server worker starts its own on first use
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for _ in range(self.workers):
+                threading.Thread(target=self._run, daemon=True, name='action-dispatcher').start()
+    
+    def submit(self, action, review_ids):
+        """Queue one action for a group of reviews; returns the idempotency keys of its batches"""
+        self._ensure_workers()
+        review_ids = list(review_ids)
+        size = self.backend.max_batch_size
+        keys = []
+        for start in range(0, len(review_ids), size):
+            batch = review_ids[start:start + size]
+            key = idempotency_key(action, batch)
+            try:
+                self._queue.put_nowait((action, batch, key))
+            except queue.Full:
+                with self._lock:
+                    self.counts['dropped_batches'] += 1
+                self.failed.append({'action': action, 'review_ids': batch, 'idempotency_key': key,
+                                    'error': 'dispatch queue full'})
+                print(f"Dispatch queue full: dropped platform action {action} for {len(batch)} reviews "
+                      f"(idempotency key {key})")
+                continue
+            with self._lock:
+                self.counts['submitted_batches'] += 1
+                self.counts['submitted_reviews'] += len(batch)
+            keys.append(key)
+        return keys
+    
+    def _apply(self, action, review_ids, key):
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                return self.backend.apply(action, review_ids, key)
+            except PlatformError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.counts['retries'] += 1
+                time.sleep(self.backoff * 2 ** attempt)
+            finally:
+                with self._lock:
+                    self.counts['call_seconds'] += time.perf_counter() - start
+    
+    def _run(self):
+        while True:
+            action, review_ids, key = self._queue.get()
+            try:
+                self._apply(action, review_ids, key)
+                with self._lock:
+                    self.counts['applied_batches'] += 1
+                    self.counts['applied_reviews'] += len(review_ids)
+            except Exception as e:
+                with self._lock:
+                    self.counts['failed_batches'] += 1
+                self.failed.append({'action': action, 'review_ids': review_ids, 'idempotency_key': key,
+                                    'error': str(e)})
+                print(f"Platform action {action} failed for {len(review_ids)} reviews: {e}")
+            finally:
+                self._queue.task_done()
+    
+    def flush(self, timeout=None):
+        """Wait until every queued batch is applied or failed; False if the timeout ran out"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def get_statistics(self):
+        with self._lock:
+            counts = dict(self.counts)
+        calls = counts['applied_batches'] + counts['failed_batches'] + counts['retries']
+        call_seconds = counts.pop('call_seconds')
+        counts['avg_call_ms'] = call_seconds / calls * 1000 if calls else None
+        counts['queue_depth'] = self._queue.qsize()
+        return counts
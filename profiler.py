@@ -0,0 +1,240 @@
+"""Per-stage profiling of the training pipeline.
+
+Usage: python profiler.py show <report.json>
+       python profiler.py compare <baseline.json> <report.json>
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from memory_usage import peak_rss_bytes, reset_peak_rss, rss_bytes
+
+_active = None
+
+
+def stage(name):
+    """Profile a block as a stage of the running pipeline profile, if any; a no-op otherwise
+    
+    Library code (preprocessing, training) marks its steps with this so they show up
+    nested under the caller's stage without knowing about the profiler.
+    """
+    profiler = _active
+    if profiler is None or threading.get_ident() != profiler.thread_id:
+        return nullcontext()
+    return profiler.stage(name)
+
+
+def active():
+    """The pipeline profile being recorded in this process, or None"""
+    return _active
+
+
+def from_config(run_name):
+    """Profiler for a run, configured from the PROFILE_* settings; the report goes to PROFILE_DIR"""
+    from config import Config
+    run_id = f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return PipelineProfiler(
+        run_name,
+        report_path=os.path.join(Config.PROFILE_DIR, f"{run_id}.json"),
+        trace_memory=Config.PROFILE_TRACE_MEMORY,
+        top_allocations=Config.PROFILE_TOP_ALLOCATIONS,
+        cprofile_dir=os.path.join(Config.PROFILE_DIR, run_id) if Config.PROFILE_CPROFILE else None
+    )
+
+
+def _mb(n_bytes):
+    return None if n_bytes is None else round(n_bytes / 1e6, 1)
+
+
+class PipelineProfiler:
+    """Records wall time, CPU time and memory of each stage of a pipeline run
+    
+    Stages nest; a nested stage is reported as 'parent/child'. Peak RSS is measured per
+    stage by resetting the kernel's high-water mark at each stage boundary, and folding
+    the peak seen so far into every open stage first so parents still see their
+    children's peaks. With trace_memory, tracemalloc adds the peak of Python allocations
+    and, for top-level stages, the source lines that allocated the most memory still
+    held when the stage ended; it slows Python-heavy stages down noticeably, so it is
+    opt-in. With cprofile_dir, each top-level stage is also run under cProfile and
+    dumped there. The report is rewritten after every top-level stage, so a run that
+    is killed (e.g. by the OOM killer) still leaves the stages it finished.
+    """
+    
+    def __init__(self, run_name, report_path=None, trace_memory=False, top_allocations=10, cprofile_dir=None):
+        self.run_name = run_name
+        self.report_path = report_path
+        self.trace_memory = trace_memory
+        self.top_allocations = top_allocations
+        self.cprofile_dir = cprofile_dir
+        self.thread_id = threading.get_ident()
+        self.stages = []
+        self._open = []
+        self._started_at = datetime.now().isoformat()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._peak_rss_per_stage = reset_peak_rss()
+        self._started_tracing = False
+    
+    def __enter__(self):
+        global _active
+        # Tracing the caller already started is left running when the profile ends
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        _active = self
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        _active = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self.save()
+        return False
+    
+    def _checkpoint(self):
+        """Fold the peaks since the last boundary into every open stage, then restart measuring"""
+        peak_rss = peak_rss_bytes()
+        peak_traced = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        for record in self._open:
+            record['_peak_rss'] = max(filter(None, (record['_peak_rss'], peak_rss)), default=None)
+            record['_peak_traced'] = max(filter(None, (record['_peak_traced'], peak_traced)), default=None)
+        if self._peak_rss_per_stage:
+            reset_peak_rss()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+    
+    @contextmanager
+    def stage(self, name):
+        self._checkpoint()
+        parent = self._open[-1]['name'] if self._open else None
+        record = {'name': f"{parent}/{name}" if parent else name, 'depth': len(self._open),
+                  '_peak_rss': None, '_peak_traced': None}
+        self._open.append(record)
+        # Appended on entry so the report lists stages in the order they started
+        self.stages.append(record)
+        # Snapshots and cProfile cover top-level stages only, so their cost is not timed as part of a parent
+        top_level = record['depth'] == 0
+        snapshot = tracemalloc.take_snapshot() if top_level and tracemalloc.is_tracing() else None
+        profile = cProfile.Profile() if top_level and self.cprofile_dir else None
+        rss_start = rss_bytes()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            record['wall_s'] = round(time.perf_counter() - wall, 3)
+            record['cpu_s'] = round(time.process_time() - cpu, 3)
+            self._checkpoint()
+            self._open.pop()
+            record['rss_start_mb'] = _mb(rss_start)
+            record['rss_end_mb'] = _mb(rss_bytes())
+            # Without per-stage resets VmHWM is the process-wide peak so far
+            record['peak_rss_mb'] = _mb(record.pop('_peak_rss'))
+            record['peak_rss_scope'] = 'stage' if self._peak_rss_per_stage else 'process'
+            record['peak_traced_mb'] = _mb(record.pop('_peak_traced'))
+            if snapshot is not None:
+                record['top_allocations'] = self._top_allocations(snapshot)
+            if profile is not None:
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                record['cprofile'] = os.path.join(self.cprofile_dir, f"{name}.prof")
+                profile.dump_stats(record['cprofile'])
+            if top_level:
+                self.save()
+    
+    def _top_allocations(self, before):
+        """Source lines that allocated the most memory still held at the end of the stage"""
+        # Leave out allocations made by the profiler and by tracemalloc itself
+        filters = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = tracemalloc.take_snapshot().filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        return [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 'size_mb': _mb(stat.size_diff), 'count': stat.count_diff}
+                for stat in diff[:self.top_allocations] if stat.size_diff > 0]
+    
+    def report(self):
+        stages = [record for record in self.stages if 'wall_s' in record]
+        return {
+            'run': self.run_name,
+            'started_at': self._started_at,
+            'wall_s': round(time.perf_counter() - self._start_wall, 3),
+            'cpu_s': round(time.process_time() - self._start_cpu, 3),
+            'peak_rss_mb': max((record['peak_rss_mb'] or 0 for record in stages), default=None),
+            'trace_memory': self.trace_memory,
+            'stages': stages
+        }
+    
+    def save(self):
+        if not self.report_path:
+            return None
+        report_dir = os.path.dirname(self.report_path)
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+        tmp_path = f"{self.report_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp_path, self.report_path)
+        return self.report_path
+
+
+def print_report(report):
+    print(f"\nProfile of {report['run']} ({report['started_at']}): "
+          f"{report['wall_s']:.1f}s wall, {report['cpu_s']:.1f}s CPU")
+    print(f"{'stage':<44}{'wall s':>9}{'cpu s':>9}{'peak RSS MB':>13}{'traced MB':>11}")
+    for record in report['stages']:
+        label = '  ' * record['depth'] + record['name'].rsplit('/', 1)[-1]
+        traced = record.get('peak_traced_mb')
+        print(f"{label:<44}{record['wall_s']:>9.2f}{record['cpu_s']:>9.2f}"
+              f"{record['peak_rss_mb'] or 0:>13.1f}{'' if traced is None else f'{traced:.1f}':>11}")
+
+
+def compare_reports(baseline, current):
+    """Per-stage (name, baseline, current) wall time and peak RSS; repeated stages are summed"""
+    def totals(report):
+        stages = {}
+        for record in report['stages']:
+            wall, peak = stages.get(record['name'], (0.0, 0.0))
+            stages[record['name']] = (wall + record['wall_s'], max(peak, record['peak_rss_mb'] or 0.0))
+        return stages
+    
+    before, after = totals(baseline), totals(current)
+    names = list(before) + [name for name in after if name not in before]
+    return [(name, before.get(name), after.get(name)) for name in names]
+
+
+def print_comparison(baseline, current):
+    print(f"\n{baseline['run']} ({baseline['started_at']}) -> {current['run']} ({current['started_at']})")
+    print(f"{'stage':<44}{'wall s':>18}{'change':>9}{'peak RSS MB':>22}")
+    for name, before, after in compare_reports(baseline, current):
+        if before is None or after is None:
+            print(f"{name:<44}{'only in ' + ('current' if before is None else 'baseline'):>18}")
+            continue
+        change = f"{(after[0] - before[0]) / before[0]:+.0%}" if before[0] else ''
+        print(f"{name:<44}{before[0]:>8.2f} -> {after[0]:<6.2f}{change:>9}{before[1]:>10.1f} -> {after[1]:<8.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'show':
+        with open(sys.argv[2]) as f:
+            print_report(json.load(f))
+    elif len(sys.argv) == 4 and sys.argv[1] == 'compare':
+        with open(sys.argv[2]) as f:
+            baseline = json.load(f)
+        with open(sys.argv[3]) as f:
+            current = json.load(f)
+        print_comparison(baseline, current)
+    else:
+        print(__doc__)
+        sys.exit(1)
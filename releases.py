@@ -0,0 +1,60 @@
+"""Published model releases.
+
+Each release is an immutable directory under the releases dir; the release manifest
+names the current one. Readers resolve every artifact through a single read of the
+manifest, so a model and its preprocessor always come from the same release.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+
+def read_manifest(manifest_path):
+    """The current release manifest, or None if nothing has been published"""
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def served_path(default_path, manifest=None):
+    """Path to load an artifact from: its copy in the manifest's release, else default_path"""
+    name = os.path.basename(default_path)
+    if manifest and name in manifest.get('files', ()):
+        return os.path.join(manifest['dir'], name)
+    return default_path
+
+
+def publish(candidate_dir, releases_dir, manifest_path, report, keep=3):
+    """Copy candidate artifacts into a new release directory, then point the manifest at it
+    
+    The directory is complete before it is renamed into place and the manifest is
+    swapped with one rename, so a reader sees either the old release or the new one.
+    Only the newest keep releases are kept.
+    """
+    version = os.path.basename(os.path.normpath(candidate_dir))
+    release_dir = os.path.join(releases_dir, version)
+    tmp_dir = f"{release_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    files = sorted(name for name in os.listdir(candidate_dir) if name.endswith('.pkl'))
+    for name in files:
+        shutil.copyfile(os.path.join(candidate_dir, name), os.path.join(tmp_dir, name))
+    os.replace(tmp_dir, release_dir)
+    
+    manifest = {'version': version, 'dir': release_dir, 'published_at': datetime.now().isoformat(),
+                'files': files, 'metrics': report['metrics']}
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    
+    # Versions are timestamps, so name order is publication order; the previous release
+    # stays on disk for workers that have not reloaded yet
+    versions = sorted(name for name in os.listdir(releases_dir)
+                      if os.path.isdir(os.path.join(releases_dir, name)) and not name.endswith('.tmp'))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(releases_dir, old), ignore_errors=True)
+    return manifest
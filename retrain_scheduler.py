@@ -0,0 +1,218 @@
+"""Background retraining scheduler.
+
+Runs beside the API (not inside it): watches the feedback retrain trigger and the
+aggregate drift signal, retrains in a separate low-priority process with CPU and
+memory limits, and publishes the candidate as a new release for the API to pick up
+only if it beats the model being served. After a candidate is rejected, retraining
+waits for new feedback instead of retraining on the same data again.
+
+Usage: python retrain_scheduler.py [--once] [--force]
+"""
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+from config import Config
+from continuous_learning import ContinuousLearning
+from monitoring import ModelMonitor
+from releases import publish, read_manifest, served_path
+
+
+def _limit_resources(nice, max_memory_mb, max_cpu_seconds):
+    """Lower the job's priority and cap its address space and CPU time (POSIX only)"""
+    try:
+        os.nice(nice)
+        import resource
+        if max_memory_mb:
+            limit = int(max_memory_mb * 1024 * 1024)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if max_cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (max_cpu_seconds, max_cpu_seconds))
+    except (AttributeError, ImportError, OSError, ValueError) as e:
+        print(f"Could not apply retrain resource limits: {e}")
+
+
+def retrain_job(candidate_dir, limits):
+    """Child process: retrain on a split of the labeled data, evaluate against the served model, maybe publish"""
+    _limit_resources(**limits)
+    
+    import joblib
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from data_preprocessing import DataPreprocessor
+    from label_generator import SyntheticLabelGenerator
+    from model_evaluation import ModelEvaluator
+    from model_training import ModelTrainer
+    
+    learning = ContinuousLearning()
+    base_df = None
+    if Config.RETRAIN_BASE_SAMPLE:
+        base_df = SyntheticLabelGenerator().generate_labels(pd.read_csv(Config.DATASET_PATH),
+                                                            sample_size=Config.RETRAIN_BASE_SAMPLE)
+    df = learning.load_training_data(base_df)
+    stratify = df['label'] if df['label'].nunique() > 1 else None
+    train_df, test_df = train_test_split(df, test_size=0.2, random_state=42, stratify=stratify)
+    
+    os.makedirs(candidate_dir, exist_ok=True)
+    preprocessor = DataPreprocessor(use_behavioral=Config.USE_BEHAVIORAL_FEATURES)
+    learning.retrain_model(preprocessor, ModelTrainer(), df=train_df.reset_index(drop=True),
+                           output_dir=candidate_dir, archive=False)
+    
+    # Both models are scored on the same held-out reviews, each through its own preprocessor
+    y_test = test_df['label'].to_numpy()
+    evaluator = ModelEvaluator()
+    candidate = joblib.load(os.path.join(candidate_dir, os.path.basename(Config.MODEL_PATH)))
+    X_candidate, _ = preprocessor.prepare_data(test_df.reset_index(drop=True), fit=False)
+    evaluator.evaluate_all({'candidate': candidate}, X_candidate, y_test)
+    try:
+        manifest = read_manifest(Config.RELEASE_MANIFEST_PATH)
+        current = joblib.load(served_path(Config.MODEL_PATH, manifest))
+        current_preprocessor = joblib.load(served_path(Config.PREPROCESSOR_PATH, manifest))
+    except Exception as e:
+        print(f"No served model to compare against: {e}")
+        current = None
+    if current is not None:
+        X_current, _ = current_preprocessor.prepare_data(test_df.reset_index(drop=True), fit=False)
+        evaluator.evaluate_all({'current': current}, X_current, y_test)
+    results = evaluator.compare_models()
+    
+    candidate_f1 = results.loc['candidate', 'F1-Score']
+    current_f1 = results.loc['current', 'F1-Score'] if current is not None else None
+    better = current_f1 is None or candidate_f1 > current_f1 + Config.RETRAIN_MIN_IMPROVEMENT
+    report = {
+        'candidate_dir': candidate_dir,
+        'train_samples': len(train_df),
+        'test_samples': len(test_df),
+        'metrics': json.loads(results.to_json(orient='index')),
+        'published': bool(better),
+        'finished_at': datetime.now().isoformat()
+    }
+    if better:
+        publish(candidate_dir, Config.RELEASES_DIR, Config.RELEASE_MANIFEST_PATH, report, keep=Config.RELEASES_KEEP)
+        learning.archive_feedback()
+        print(f"Published candidate (F1 {candidate_f1:.4f} vs {current_f1})")
+    else:
+        print(f"Candidate not published (F1 {candidate_f1:.4f} vs {current_f1:.4f})")
+    with open(os.path.join(candidate_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+class RetrainScheduler:
+    """Decide when to retrain and run each retrain in a separate, resource-limited process"""
+    
+    def __init__(self, learning=None, monitor=None, poll_interval=300, min_interval=3600,
+                 candidates_dir='models/candidates', nice=10, max_memory_mb=4096, max_cpu_seconds=7200,
+                 state_path='models/retrain_state.json'):
+        self.learning = learning or ContinuousLearning()
+        self.monitor = monitor or ModelMonitor()
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+        self.candidates_dir = candidates_dir
+        self.limits = {'nice': nice, 'max_memory_mb': max_memory_mb, 'max_cpu_seconds': max_cpu_seconds}
+        self.state_path = state_path
+        self.last_run = 0.0
+    
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_state(self, state):
+        state_dir = os.path.dirname(self.state_path)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+    
+    def record_result(self, report, feedback, reason):
+        """Remember a rejected candidate (with the feedback count and trigger it was trained on); forget it on publish"""
+        if report['published']:
+            self._save_state({})
+            return
+        self._save_state({'rejected': {'candidate_dir': report['candidate_dir'], 'feedback': feedback,
+                                       'reason': reason, 'finished_at': report['finished_at']}})
+    
+    def backing_off(self):
+        """Why retraining should wait, or None: a candidate was rejected and no feedback arrived since"""
+        rejected = self._load_state().get('rejected')
+        if rejected and self.learning.feedback_count() == rejected['feedback']:
+            return (f"candidate {rejected['candidate_dir']} was rejected at {rejected['finished_at']} "
+                    f"({rejected['reason']}); waiting for new feedback")
+        return None
+    
+    def check(self):
+        """(needed, reason) from the feedback accuracy trigger, then the aggregate drift signal"""
+        needed, message = self.learning.check_retraining_needed()
+        if needed:
+            return True, message
+        drifted, drift_message = self.monitor.check_drift()
+        if drifted:
+            return True, drift_message
+        return False, f"{message}; {drift_message}"
+    
+    def run_once(self, reason='manual'):
+        """Retrain in a child process and wait for it; returns the candidate's report or None"""
+        candidate_dir = os.path.join(self.candidates_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+        print(f"Retraining ({reason}) into {candidate_dir}")
+        self.last_run = time.time()
+        # Feedback arriving while the job runs counts as new for the back-off
+        feedback = self.learning.feedback_count()
+        # spawn: the job starts from a clean interpreter instead of a copy of this process
+        job = multiprocessing.get_context('spawn').Process(target=retrain_job, args=(candidate_dir, self.limits),
+                                                           name='retrain-job')
+        job.start()
+        job.join()
+        if job.exitcode != 0:
+            print(f"Retrain job failed with exit code {job.exitcode}")
+            return None
+        with open(os.path.join(candidate_dir, 'report.json')) as f:
+            report = json.load(f)
+        self.record_result(report, feedback, reason)
+        return report
+    
+    def run_forever(self):
+        while True:
+            needed, reason = self.check()
+            backoff = self.backing_off() if needed else None
+            if backoff:
+                print(f"No retrain: {backoff}")
+            elif needed and time.time() - self.last_run >= self.min_interval:
+                self.run_once(reason)
+            else:
+                print(f"No retrain: {reason}")
+            time.sleep(self.poll_interval)
+
+
+def main(args):
+    scheduler = RetrainScheduler(
+        poll_interval=Config.RETRAIN_POLL_SECONDS,
+        min_interval=Config.RETRAIN_MIN_INTERVAL_SECONDS,
+        candidates_dir=Config.RETRAIN_CANDIDATES_DIR,
+        nice=Config.RETRAIN_NICE,
+        max_memory_mb=Config.RETRAIN_MAX_MEMORY_MB,
+        max_cpu_seconds=Config.RETRAIN_MAX_CPU_SECONDS,
+        state_path=Config.RETRAIN_STATE_PATH
+    )
+    if '--once' not in args:
+        scheduler.run_forever()
+        return
+    needed, reason = scheduler.check()
+    backoff = scheduler.backing_off() if needed else None
+    if backoff and '--force' not in args:
+        print(f"No retrain: {backoff}")
+    elif needed or '--force' in args:
+        report = scheduler.run_once(reason if needed else 'forced')
+        if report:
+            print(json.dumps({key: report[key] for key in ('published', 'train_samples', 'test_samples')}))
+    else:
+        print(f"No retrain: {reason}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
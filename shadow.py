@@ -0,0 +1,223 @@
+import glob
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+import numpy as np
+
+# (model, preprocessor) of the candidate, loaded once in each scoring process
+_scorer = None
+
+
+def _load_scorer(model_path, preprocessor_path):
+    global _scorer
+    import joblib
+    _scorer = (joblib.load(model_path), joblib.load(preprocessor_path))
+
+
+def _score(texts, behavioral_features):
+    """Runs in a scoring process: candidate predictions, fake probabilities and scoring time"""
+    model, preprocessor = _scorer
+    start = time.perf_counter()
+    X = preprocessor.prepare_texts(texts, behavioral_features=behavioral_features)
+    predictions = model.predict(X)
+    fake_probabilities = model.predict_proba(X)[:, 1]
+    return predictions, fake_probabilities, time.perf_counter() - start
+
+
+class ShadowEvaluator:
+    """Score a sample of live traffic with a candidate model, entirely off the request path
+    
+    The request thread only does a sampling coin-flip and hands the sample to a pool of
+    separate scoring processes, so the candidate never competes with request threads
+    for the GIL. At most max_queue samples are pending; beyond that a sample is dropped,
+    so a slow candidate can never add latency to production traffic. Agreement,
+    confidence deltas and per-model latency are recorded as results come back.
+    
+    Each server worker has its own pool and counters and publishes snapshots to a
+    shared directory (like ModelMonitor), so statistics can be reported across workers.
+    """
+    
+    def __init__(self, model_path, preprocessor_path, sample_rate=0.1, max_queue=1000, workers=1,
+                 latency_window=1000, monitor_dir='monitoring', snapshot_interval=5.0):
+        for path in (model_path, preprocessor_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+        self.model_path = model_path
+        self.preprocessor_path = preprocessor_path
+        self.model_version = f"{model_path}@{os.path.getmtime(model_path):.0f}"
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.workers = workers
+        self.latency_window = latency_window
+        self.worker_dir = f"{monitor_dir}/shadow_{datetime.now().strftime('%Y%m%d')}"
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self._executor = None
+        self._reset()
+    
+    def _reset(self):
+        self._pid = os.getpid()
+        self._started = time.time()
+        self._last_snapshot = 0.0
+        self._pending = 0
+        self.counts = {'sampled': 0, 'scored': 0, 'dropped': 0, 'errors': 0,
+                       'agreements': 0, 'fake_probability_delta_sum': 0.0,
+                       'abs_fake_probability_delta_sum': 0.0}
+        self.primary_latency_ms = deque(maxlen=self.latency_window)
+        self.shadow_latency_ms = deque(maxlen=self.latency_window)
+    
+    def _ensure_pool(self):
+        # Pools do not survive fork, so each server worker starts its own on first use;
+        # spawn avoids forking a process that is running request threads
+        if self._pid != os.getpid():
+            self._reset()
+            self._executor = None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_load_scorer, initargs=(self.model_path, self.preprocessor_path))
+        return self._executor
+    
+    def submit(self, texts, primary_predictions, primary_fake_probabilities, primary_latency,
+               behavioral_features=None):
+        """Maybe hand a scored request to the scoring processes; never blocks"""
+        if random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            executor = self._ensure_pool()
+            if self._pending >= self.max_queue:
+                self.counts['dropped'] += 1
+                return False
+            self._pending += 1
+            self.counts['sampled'] += 1
+        done = partial(self._record, np.asarray(primary_predictions),
+                       np.asarray(primary_fake_probabilities, dtype=np.float64), primary_latency)
+        try:
+            executor.submit(_score, list(texts), behavioral_features).add_done_callback(done)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._failed(e, restart=True)
+            return False
+        return True
+    
+    def _failed(self, error, restart=False):
+        with self._lock:
+            self._pending -= 1
+            self.counts['errors'] += 1
+            if restart:
+                # A scoring process died; start a fresh pool on the next sample
+                self._executor = None
+        print(f"Shadow evaluation error: {error}")
+    
+    def _record(self, primary_predictions, primary_fake, primary_latency, future):
+        """Done callback (runs on the pool's management thread): fold one result into the counters"""
+        try:
+            predictions, fake_probabilities, shadow_latency = future.result()
+        except Exception as e:
+            self._failed(e, restart=isinstance(e, BrokenProcessPool))
+            return
+        delta = fake_probabilities - primary_fake
+        with self._lock:
+            self._pending -= 1
+            self.counts['scored'] += len(predictions)
+            self.counts['agreements'] += int((predictions == primary_predictions).sum())
+            self.counts['fake_probability_delta_sum'] += float(delta.sum())
+            self.counts['abs_fake_probability_delta_sum'] += float(np.abs(delta).sum())
+            self.primary_latency_ms.append(primary_latency * 1000)
+            self.shadow_latency_ms.append(shadow_latency * 1000)
+            publish = time.time() - self._last_snapshot >= self.snapshot_interval
+        if publish:
+            self.publish_snapshot()
+    
+    def _snapshot(self):
+        return dict(self.counts, pending=self._pending, model_version=self.model_version,
+                    primary_latency_ms=list(self.primary_latency_ms),
+                    shadow_latency_ms=list(self.shadow_latency_ms))
+    
+    def publish_snapshot(self):
+        """Write this process's counters and latency samples to the shared worker directory"""
+        with self._lock:
+            if os.getpid() != self._pid or not self.counts['sampled']:
+                return
+            snapshot = self._snapshot()
+            path = f"{self.worker_dir}/{self._pid}_{int(self._started)}.json"
+            self._last_snapshot = time.time()
+        try:
+            os.makedirs(self.worker_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error publishing shadow snapshot: {e}")
+    
+    def close(self):
+        """Publish a final snapshot and stop the scoring processes, abandoning pending samples"""
+        self.publish_snapshot()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _latency_summary(samples):
+        if not samples:
+            return None
+        samples = np.asarray(samples, dtype=np.float64)
+        return {'mean_ms': float(samples.mean()), 'p50_ms': float(np.percentile(samples, 50)),
+                'p95_ms': float(np.percentile(samples, 95))}
+    
+    def _summarize(self, snapshot):
+        scored = snapshot['scored']
+        return {
+            'sample_rate': self.sample_rate,
+            'sampled_requests': snapshot['sampled'],
+            'scored_reviews': scored,
+            'dropped_requests': snapshot['dropped'],
+            'errors': snapshot['errors'],
+            'queue_depth': snapshot['pending'],
+            'agreement_rate': snapshot['agreements'] / scored if scored else None,
+            'mean_fake_probability_delta': snapshot['fake_probability_delta_sum'] / scored if scored else None,
+            'mean_abs_fake_probability_delta': snapshot['abs_fake_probability_delta_sum'] / scored if scored else None,
+            'primary_latency': self._latency_summary(snapshot['primary_latency_ms']),
+            'shadow_latency': self._latency_summary(snapshot['shadow_latency_ms'])
+        }
+    
+    def get_statistics(self):
+        """Statistics for samples taken by this process"""
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset()
+            return self._summarize(self._snapshot())
+    
+    def get_aggregate_statistics(self):
+        """Statistics across all worker processes that published a snapshot today for this candidate"""
+        self.publish_snapshot()
+        total = None
+        workers = 0
+        for path in glob.glob(f"{self.worker_dir}/*.json"):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get('model_version') != self.model_version:
+                continue
+            workers += 1
+            if total is None:
+                total = snapshot
+                continue
+            for key, value in snapshot.items():
+                if key != 'model_version':
+                    total[key] += value
+        
+        if total is None:
+            return dict(self.get_statistics(), workers=1)
+        return dict(self._summarize(total), workers=workers)
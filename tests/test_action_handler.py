@@ -0,0 +1,24 @@
+import json
+from action_handler import ReviewActionHandler
+
+
+def test_statistics_include_legacy_json_log(tmp_path):
+    handler = ReviewActionHandler(action_log_dir=str(tmp_path))
+    with open(handler.legacy_action_log, 'w') as f:
+        json.dump([{'decision': 'REMOVE'}, {'decision': 'PUBLISH'}], f)
+    handler._log_actions([{'decision': 'REMOVE'}, {'decision': 'FLAG_FOR_REVIEW'}])
+    
+    stats = handler.get_statistics()
+    assert stats['total_actions'] == 4
+    assert stats['removed'] == 2 and stats['published'] == 1 and stats['flagged'] == 1
+
+
+def test_flagged_reviews_are_queued_by_fake_probability(tmp_path):
+    handler = ReviewActionHandler(action_log_dir=str(tmp_path))
+    handler.decide_actions([
+        {'review_id': 'r1', 'prediction': 'FAKE', 'confidence': 0.8, 'fake_probability': 0.131},
+        {'review_id': 'r2', 'prediction': 'FAKE', 'confidence': 0.75}
+    ])
+    
+    flagged = {row['review_id']: row['fake_probability'] for row in handler.moderation_queue.page()[0]}
+    assert flagged == {'r1': 0.131, 'r2': 0.75}
@@ -0,0 +1,70 @@
+import threading
+import time
+from flask import Flask, jsonify
+from admission import AdmissionController, Deadline, admission_control, queue_wait
+
+
+def _app(controller, hold=None):
+    app = Flask(__name__)
+    
+    @app.route('/score', methods=['POST'])
+    @admission_control(controller, cost=lambda data: len(data.get('reviews', [])) or 1)
+    def score():
+        if hold is not None:
+            hold.wait(5)
+        return jsonify({'ok': True})
+    return app
+
+
+def test_controller_sheds_when_budget_is_full():
+    controller = AdmissionController(max_inflight_reviews=10, max_wait=0.01)
+    assert controller.acquire(8, Deadline())
+    assert not controller.acquire(5, Deadline())
+    assert controller.acquire(2, Deadline())
+    controller.release(8)
+    assert controller.acquire(5, Deadline())
+    stats = controller.get_statistics()
+    assert stats['shed'] == 1 and stats['admitted'] == 3 and stats['inflight_reviews'] == 7
+
+
+def test_concurrent_request_over_budget_gets_503():
+    controller = AdmissionController(max_inflight_reviews=10, max_wait=0.05, retry_after=2)
+    hold = threading.Event()
+    app = _app(controller, hold)
+    first = threading.Thread(target=lambda: app.test_client().post('/score', json={'reviews': ['a'] * 10}))
+    first.start()
+    try:
+        while controller.get_statistics()['inflight_reviews'] < 10:
+            time.sleep(0.005)
+        response = app.test_client().post('/score', json={'reviews': ['b']})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '2'
+    finally:
+        hold.set()
+        first.join()
+    assert app.test_client().post('/score', json={'reviews': ['c']}).status_code == 200
+    assert controller.get_statistics()['inflight_reviews'] == 0
+
+
+def test_request_queued_too_long_is_shed():
+    controller = AdmissionController(max_queue_wait=0.5)
+    client = _app(controller).test_client()
+    stale = client.post('/score', json={}, headers={'X-Request-Start': f"t={time.time() - 2:.3f}"})
+    fresh = client.post('/score', json={}, headers={'X-Request-Start': str(int(time.time() * 1e6))})
+    assert stale.status_code == 503 and fresh.status_code == 200
+    assert controller.get_statistics()['shed_queue_wait'] == 1
+
+
+def test_queue_wait_header_formats():
+    now = 1700000000.0
+    assert queue_wait({'X-Request-Start': 't=1699999999.5'}, now) == 0.5
+    assert queue_wait({'X-Request-Start': '1699999999000'}, now) == 1.0
+    assert queue_wait({'X-Request-Start': '1699999998000000'}, now) == 2.0
+    assert queue_wait({'X-Request-Start': 'garbage'}, now) is None
+    assert queue_wait({}, now) is None
+
+
+def test_expired_deadline_returns_504():
+    client = _app(AdmissionController()).test_client()
+    response = client.post('/score', json={}, headers={'X-Request-Deadline': str(time.time() - 1)})
+    assert response.status_code == 504
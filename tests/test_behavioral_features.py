@@ -0,0 +1,133 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from behavioral_features import BehavioralFeatureExtractor, BehavioralFeatureStore, SharedBehavioralStore
+
+
+def test_nan_rating_does_not_poison_product_mean():
+    store = BehavioralFeatureStore()
+    store.update('u1', 'p1', 4.0, 0)
+    store.update('u2', 'p1', float('nan'), 10)
+    store.update('u3', 'p1', 'not a rating', 20)
+    features = store.query('u4', 'p1', 2.0, 30)
+    assert features['rating_deviation'] == 1.0
+    assert store.products['p1'].count == 1
+    assert np.isfinite(store.users['u2'].rating_mean)
+
+
+def test_least_recently_active_entries_are_evicted():
+    store = BehavioralFeatureStore(max_users=2, max_products=2)
+    store.update('u1', 'p1', 5, 0)
+    store.update('u2', 'p2', 5, 1)
+    store.update('u1', 'p1', 5, 2)
+    store.update('u3', 'p3', 5, 3)
+    assert list(store.users) == ['u1', 'u3']
+    assert list(store.products) == ['p1', 'p3']
+
+
+def test_store_pickled_without_caps_still_loads():
+    store = BehavioralFeatureStore()
+    store.update('u1', 'p1', 5, 0)
+    state = store.__getstate__()
+    state['users'], state['products'] = dict(state['users']), dict(state['products'])
+    del state['max_users'], state['max_products']
+    restored = BehavioralFeatureStore.__new__(BehavioralFeatureStore)
+    restored.__setstate__(state)
+    restored.update('u2', 'p2', 3, 1)
+    assert list(pickle.loads(pickle.dumps(restored)).users) == ['u1', 'u2']
+
+
+def _reviews_frame(n=400, seed=0):
+    rng = np.random.RandomState(seed)
+    timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.randint(0, 30 * 86400, size=n), unit='s')
+    df = pd.DataFrame({
+        'user_id': rng.choice([f"u{i}" for i in range(40)], size=n),
+        'product_id': rng.choice([f"p{i}" for i in range(15)], size=n),
+        'rating': rng.choice([1.0, 2.0, 3.0, 4.0, 5.0, np.nan], size=n),
+        'timestamp': timestamps,
+        'account_created': timestamps - pd.to_timedelta(rng.randint(0, 400, size=n), unit='D'),
+        'verified_purchase': rng.choice([True, False, 'False', 'yes', None], size=n),
+    })
+    return df
+
+
+def test_batch_features_match_serving_replay():
+    df = _reviews_frame()
+    batch = BehavioralFeatureExtractor().extract_all_behavioral_features(df.copy())
+    
+    # Serving: the same reviews arriving one at a time at the API, in time order
+    serving = BehavioralFeatureExtractor(store=BehavioralFeatureStore())
+    expected = {}
+    for i in df.sort_values('timestamp', kind='stable').index:
+        row = df.loc[i]
+        expected[i] = serving.extract_for_review(
+            row['user_id'], row['product_id'], None if pd.isna(row['rating']) else row['rating'],
+            row['timestamp'].isoformat(), row['account_created'].isoformat(), row['verified_purchase'])
+    
+    for column in ('review_frequency', 'rating_deviation', 'burst_activity', 'account_age_days',
+                   'new_account', 'is_verified'):
+        np.testing.assert_allclose(batch[column].to_numpy(dtype=float),
+                                   [expected[i][column] for i in df.index], err_msg=column)
+
+
+def test_review_frequency_only_counts_earlier_reviews():
+    df = pd.DataFrame({'user_id': ['u1', 'u1', 'u1'], 'timestamp': ['2024-01-03', '2024-01-01', '2024-01-02']})
+    features = BehavioralFeatureExtractor().extract_all_behavioral_features(df)
+    assert features['review_frequency'].tolist() == [3, 1, 2]
+
+
+def test_workers_share_history_through_sqlite(tmp_path):
+    path = str(tmp_path / 'behavior.db')
+    df = _reviews_frame()
+    seed = BehavioralFeatureStore().update_from_frame(df.iloc[:200])
+    expected = BehavioralFeatureStore().update_from_frame(df.iloc[:200])
+    
+    # Two workers seed the same database (only the first imports) and take turns recording reviews
+    workers = [SharedBehavioralStore(path), SharedBehavioralStore(path)]
+    assert workers[0].seed(seed) == len(seed.users)
+    assert workers[1].seed(seed) == 0
+    rest = df.iloc[200:].sort_values('timestamp', kind='stable')
+    for n, row in enumerate(rest.itertuples()):
+        args = (row.user_id, row.product_id, row.rating, row.timestamp.isoformat())
+        assert workers[n % 2].observe(*args) == pytest.approx(expected.observe(*args))
+    
+    assert workers[0].get_statistics() == expected.get_statistics()
+    user_id = rest['user_id'].iloc[-1]
+    assert workers[1].query(user_id, timestamp=0) == expected.query(user_id, timestamp=0)
+
+
+def test_shared_store_prunes_least_recently_active(tmp_path):
+    store = SharedBehavioralStore(str(tmp_path / 'behavior.db'), max_users=2, max_products=2, prune_every=3)
+    for n, user_id in enumerate(['u1', 'u2', 'u3']):
+        store.update(user_id, f"p{n}", 5, n)
+    assert store.get_statistics() == {'users': 2, 'products': 2}
+    assert store.query('u1', timestamp=10)['review_frequency'] == 1
+    assert store.query('u3', timestamp=10)['review_frequency'] == 2
+
+
+def test_vectorized_features_match_serving_on_edge_cases():
+    # Missing users, products and timestamps, tied timestamps, numeric ids and bad ratings
+    df = pd.DataFrame({
+        'user_id': [1, 1, None, 'u2', 'u2', 1, 'u2'],
+        'product_id': ['p1', 'p1', 'p1', None, 'p1', 'p2', 'p2'],
+        'rating': [5, '3', 2.0, 4, np.inf, 'bad', 1],
+        'timestamp': ['2024-01-01T00:00:00', '2024-01-01T00:00:00', '2024-01-01T00:30:00', None,
+                      '2024-01-01T02:00:00', 'not a date', '2024-01-01T02:59:00'],
+        'account_created': ['2023-12-20', None, '2023-01-01', '2023-12-31', 'bad', '2023-12-25', '2023-12-31'],
+    })
+    batch = BehavioralFeatureExtractor().extract_all_behavioral_features(df.copy())
+    
+    serving = BehavioralFeatureExtractor()
+    epochs = pd.to_datetime(df['timestamp'], errors='coerce')
+    expected = {}
+    for i in np.argsort(epochs.fillna(pd.Timestamp.max).to_numpy(), kind='stable'):
+        row = df.loc[i]
+        created = pd.to_datetime(row['account_created'], errors='coerce')
+        expected[i] = serving.extract_for_review(
+            None if pd.isna(row['user_id']) else row['user_id'], row['product_id'], row['rating'],
+            None if pd.isna(epochs[i]) else epochs[i].isoformat(),
+            None if pd.isna(created) else created.isoformat())
+    
+    for column in ('review_frequency', 'rating_deviation', 'burst_activity', 'new_account', 'is_verified'):
+        assert batch[column].tolist() == pytest.approx([expected[i][column] for i in df.index]), column
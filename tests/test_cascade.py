@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from cascade import CascadeClassifier
+
+
+class _FixedModel:
+    """Returns a fixed fake probability per row (the row's first column) and records what it scored"""
+    
+    def __init__(self, offset=0.0):
+        self.offset = offset
+        self.scored = []
+    
+    def predict_proba(self, X):
+        self.scored.append(X[:, 0].copy())
+        fake = np.clip(X[:, 0] + self.offset, 0, 1)
+        return np.column_stack([1 - fake, fake])
+    
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+def test_only_uncertain_rows_are_escalated():
+    fast, full = _FixedModel(), _FixedModel(offset=0.5)
+    cascade = CascadeClassifier(fast, full, lower=0.2, upper=0.9)
+    X = np.array([[0.05], [0.2], [0.3], [0.6], [0.9], [0.95]])
+    
+    predictions, probabilities, stages = cascade.predict_with_stage(X)
+    
+    # The band is exclusive: 0.2 and 0.9 are decided by the fast model
+    assert stages.tolist() == ['fast', 'fast', 'full', 'full', 'fast', 'fast']
+    np.testing.assert_allclose(full.scored[0], [0.3, 0.6])
+    np.testing.assert_allclose(probabilities[:, 1], [0.05, 0.2, 0.8, 1.0, 0.9, 0.95])
+    assert predictions.tolist() == [0, 0, 1, 1, 1, 1]
+
+
+def test_confident_batch_never_calls_full_model():
+    fast, full = _FixedModel(), _FixedModel()
+    cascade = CascadeClassifier(fast, full, lower=0.2, upper=0.9)
+    _, _, stages = cascade.predict_with_stage(np.array([[0.01], [0.99]]))
+    assert full.scored == []
+    assert set(stages) == {'fast'}
+
+
+def test_invalid_band_is_rejected():
+    with pytest.raises(ValueError):
+        CascadeClassifier(_FixedModel(), _FixedModel(), lower=0.9, upper=0.2)
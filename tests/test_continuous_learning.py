@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+from continuous_learning import ContinuousLearning
+
+
+def test_archives_on_the_same_day_do_not_overwrite(tmp_path):
+    learning = ContinuousLearning(feedback_dir=str(tmp_path))
+    archives = []
+    for n in range(2):
+        learning.collect_feedback(f"review {n}", 'FAKE', 'REAL', 0.9)
+        archives.append(learning.archive_feedback())
+    assert archives[0] != archives[1]
+    assert len(list(tmp_path.glob('*_archived_*.csv'))) == 2
+
+
+def test_missing_feedback_is_not_archived_and_trains_on_base_data(tmp_path):
+    learning = ContinuousLearning(feedback_dir=str(tmp_path))
+    assert learning.archive_feedback() is None
+    base = pd.DataFrame({'review_text': ['a', 'b'], 'label': [1, 0]})
+    assert learning.load_training_data(base)['label'].tolist() == [1, 0]
+    with pytest.raises(FileNotFoundError):
+        learning.load_training_data()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+from scipy.sparse import hstack, random as sparse_random
+from data_preprocessing import DataPreprocessor
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_assemble_features_matches_hstack(dtype):
+    rng = np.random.RandomState(0)
+    tfidf = sparse_random(50, 300, density=0.05, format='lil', dtype=dtype, random_state=rng)
+    tfidf[7] = 0  # a row with no TF-IDF terms
+    tfidf = tfidf.tocsr()
+    dense = rng.randn(50, 8)
+    
+    assembled = DataPreprocessor().assemble_features(tfidf, dense)
+    expected = hstack([tfidf, dense]).tocsr()
+    
+    assert assembled.shape == expected.shape
+    assert assembled.dtype == tfidf.dtype
+    assert assembled.has_sorted_indices
+    np.testing.assert_allclose(assembled.toarray(), expected.toarray().astype(dtype), rtol=1e-6)
+
+
+def test_assemble_features_with_empty_matrix():
+    tfidf = sparse_random(0, 10, format='csr', dtype=np.float32)
+    assembled = DataPreprocessor().assemble_features(tfidf, np.empty((0, 3)))
+    assert assembled.shape == (0, 13)
+
+
+@pytest.mark.parametrize('cache_size', [0, 10, 50000])
+def test_stem_cache_matches_uncached_stemming_and_stays_bounded(cache_size):
+    texts = ["Running runners ran quickly; the product isn't working!!", 'AMAZING amazing Amazingly good',
+             'Worst purchase ever, returned it after 2 days', '', None] * 3
+    preprocessor = DataPreprocessor(stem_cache_size=cache_size)
+    
+    def uncached(text):
+        words = ''.join(c for c in str(text).lower() if c.isalpha() or c.isspace()).split()
+        return ' '.join(preprocessor.stemmer.stem(word) for word in words if word not in preprocessor.stop_words)
+    
+    expected = [uncached(text) for text in texts]
+    assert preprocessor.clean_texts(texts) == expected
+    assert [preprocessor.clean_text(text) for text in texts] == expected
+    assert len(preprocessor.stem_cache) <= cache_size
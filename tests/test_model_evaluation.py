@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.naive_bayes import MultinomialNB
+from model_evaluation import ModelEvaluator
+
+
+@pytest.fixture
+def fitted():
+    rng = np.random.default_rng(0)
+    X = sparse.random(230, 40, density=0.2, format='csr', random_state=0)
+    y = np.where(np.asarray(X[:, :5].sum(axis=1)).ravel() > 0.5, 'OR', 'CG')
+    y[rng.choice(len(y), 20, replace=False)] = 'OR'
+    models = {'Logistic Regression': LogisticRegression(max_iter=1000).fit(X, y),
+              'Naive Bayes': MultinomialNB().fit(X, y)}
+    return models, X, y
+
+
+@pytest.mark.parametrize('chunk_size', [1, 17, 230, 5000])
+def test_chunked_predictions_match_single_pass(fitted, chunk_size):
+    models, X, _ = fitted
+    for model in models.values():
+        y_pred, y_proba = ModelEvaluator.predict_chunked(model, X, chunk_size)
+        assert np.array_equal(y_pred, model.predict(X))
+        np.testing.assert_allclose(y_proba, model.predict_proba(X))
+
+
+def test_evaluate_all_metrics_match_single_pass(fitted):
+    models, X, y = fitted
+    evaluator = ModelEvaluator()
+    predictions = evaluator.evaluate_all(models, X, y, chunk_size=17, n_jobs=2, latency_samples=10)
+    
+    for name, model in models.items():
+        y_pred = model.predict(X)
+        expected = {
+            'Accuracy': accuracy_score(y, y_pred),
+            'Precision': precision_score(y, y_pred, average='weighted'),
+            'Recall': recall_score(y, y_pred, average='weighted'),
+            'F1-Score': f1_score(y, y_pred, average='weighted')
+        }
+        result = evaluator.results[name]
+        for metric, value in expected.items():
+            assert result[metric] == pytest.approx(value)
+        assert np.array_equal(predictions[name][0], y_pred)
+        np.testing.assert_allclose(predictions[name][1], model.predict_proba(X))
+
+
+def test_evaluate_all_profiles_inference_cost(fitted):
+    models, X, y = fitted
+    evaluator = ModelEvaluator()
+    evaluator.evaluate_all(models, X, y, chunk_size=50, latency_samples=10)
+    
+    for name in models:
+        result = evaluator.results[name]
+        assert result['Throughput (rows/s)'] > 0
+        assert 0 <= result['p50 latency (ms)'] <= result['p95 latency (ms)'] <= result['p99 latency (ms)']
+        assert result['File size (MB)'] > 0
+        assert result['Loaded memory (MB)'] >= 0
+    df_results = evaluator.compare_models()
+    assert set(df_results.index) == set(models)
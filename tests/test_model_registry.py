@@ -0,0 +1,78 @@
+import threading
+import time
+import joblib
+import pytest
+import model_registry
+from model_registry import ModelRegistry, UnknownTenant
+
+
+def make_tenant(tenants_dir, tenant_id, size=500000):
+    tenant_dir = tenants_dir / tenant_id
+    tenant_dir.mkdir(parents=True)
+    joblib.dump(b'm' * size, tenant_dir / 'svm.pkl')
+    joblib.dump(b'p' * size, tenant_dir / 'preprocessor.pkl')
+
+
+def test_least_recently_used_tenant_is_evicted_beyond_budget(tmp_path, monkeypatch):
+    # Without an RSS reading a set costs its size on disk (about 1 MB here)
+    monkeypatch.setattr(model_registry, 'rss_bytes', lambda: None)
+    for tenant_id in ('a', 'b', 'c'):
+        make_tenant(tmp_path, tenant_id)
+    registry = ModelRegistry(str(tmp_path), memory_budget_mb=2.5)
+    
+    assert registry.get('a')['model'] == b'm' * 500000
+    registry.get('b')
+    registry.get('a')
+    registry.get('c')
+    stats = registry.get_statistics()
+    assert stats['cached_tenants'] == ['a', 'c']
+    assert stats['memory_used_mb'] <= 2.5
+    assert stats['tenants']['b']['evictions'] == 1
+    assert stats['tenants']['a']['hits'] == 1
+
+
+def test_concurrent_first_requests_share_one_load(tmp_path, monkeypatch):
+    make_tenant(tmp_path, 'a', size=10)
+    registry = ModelRegistry(str(tmp_path))
+    release = threading.Event()
+    load = registry._load
+    calls = []
+    
+    def slow_load(tenant_id):
+        calls.append(tenant_id)
+        release.wait(5)
+        return load(tenant_id)
+    
+    monkeypatch.setattr(registry, '_load', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('a'))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while registry.get_statistics()['tenants'].get('a', {}).get('coalesced_loads', 0) < 4:
+        assert time.monotonic() < deadline, 'requests were not coalesced'
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert calls == ['a']
+    assert len(results) == 5 and all(result is results[0] for result in results)
+
+
+@pytest.mark.parametrize('tenant_id', ['missing', '../a', 'a/../a', '', None, 'empty'])
+def test_unknown_or_invalid_tenant_is_rejected(tmp_path, tenant_id):
+    make_tenant(tmp_path / 'tenants', 'a', size=10)
+    (tmp_path / 'tenants' / 'empty').mkdir()
+    registry = ModelRegistry(str(tmp_path / 'tenants'))
+    with pytest.raises(UnknownTenant):
+        registry.get(tenant_id)
+    assert 'missing' not in registry.get_statistics()['tenants']
+
+
+def test_api_returns_404_for_unknown_tenant(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app as api
+    response = api.app.test_client().post('/predict', json={'review_text': 'Great product, works well'},
+                                          headers={'X-Tenant-ID': '../models'})
+    assert response.status_code == 404
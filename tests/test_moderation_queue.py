@@ -0,0 +1,43 @@
+from moderation_queue import ModerationQueue
+
+
+def make_queue(tmp_path, probabilities):
+    queue = ModerationQueue(str(tmp_path / 'moderation_queue.db'), lease_seconds=600)
+    queue.enqueue_many([{'review_id': f"r{i}", 'fake_probability': p} for i, p in enumerate(probabilities)])
+    return queue
+
+
+def test_claim_takes_highest_priority_and_ack_resolves(tmp_path):
+    queue = make_queue(tmp_path, [0.7, 0.95, 0.8])
+    assert queue.enqueue('r1', 0.99) == 0
+    claimed = queue.claim('alice', limit=2)
+    assert [row['review_id'] for row in claimed] == ['r1', 'r2']
+    assert queue.claim('bob', limit=5)[0]['review_id'] == 'r0'
+    
+    assert not queue.ack('r1', 'bob', 'REMOVED')
+    assert queue.ack('r1', 'alice', 'REMOVED')
+    assert queue.release('r2', 'alice')
+    assert queue.get_statistics() == {'pending': 1, 'claimed': 1, 'resolved': 1}
+
+
+def test_expired_lease_returns_review_to_queue(tmp_path):
+    queue = make_queue(tmp_path, [0.9])
+    queue.claim('alice', lease_seconds=-1)
+    assert not queue.ack('r0', 'alice', 'REMOVED')
+    
+    items, _ = queue.page('pending')
+    assert [row['review_id'] for row in items] == ['r0']
+    assert queue.claim('bob')[0]['claimed_by'] == 'bob'
+
+
+def test_keyset_pages_cover_queue_in_priority_order(tmp_path):
+    probabilities = [0.5, 0.9, 0.9, 0.7, 0.6, 0.9, 0.8]
+    queue = make_queue(tmp_path, probabilities)
+    seen, cursor = [], None
+    while True:
+        items, cursor = queue.page('pending', limit=2, cursor=cursor)
+        seen += [row['review_id'] for row in items]
+        if cursor is None:
+            break
+    expected = sorted(range(len(probabilities)), key=lambda i: (-probabilities[i], i))
+    assert seen == [f"r{i}" for i in expected]
@@ -0,0 +1,73 @@
+import zlib
+import numpy as np
+from near_duplicate import NearDuplicateIndex, RecentDuplicateWindow
+
+
+def _reviews(n, length=30, seed=0):
+    rng = np.random.RandomState(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return [' '.join(rng.choice(vocabulary, size=length)) for _ in range(n)]
+
+
+def _paraphrase(text, seed):
+    tokens = text.split()
+    tokens[np.random.RandomState(seed).randint(len(tokens))] = 'replaced'
+    return ' '.join(tokens)
+
+
+def test_signature_matches_python_int_reference():
+    index = NearDuplicateIndex()
+    text = ' '.join(f"token{i}" for i in range(50))
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in index._shingles(text)]
+    prime = (1 << 61) - 1
+    expected = [min((int(a) * h + int(b)) % prime & 0xFFFFFFFF for h in hashes)
+                for a, b in zip(index._a, index._b)]
+    assert index.signature(text).tolist() == expected
+
+
+def test_lsh_recall_on_near_duplicates():
+    originals = _reviews(300)
+    index = NearDuplicateIndex()
+    index.add_many(originals)
+    matches = [index.query(_paraphrase(text, seed)) for seed, text in enumerate(originals)]
+    recall = np.mean([match['is_near_duplicate'] for match in matches])
+    assert recall >= 0.95
+    false_positives = [index.query(text)['is_near_duplicate'] for text in _reviews(300, seed=1)]
+    assert not any(false_positives)
+
+
+def test_paraphrases_share_a_cluster():
+    original = _reviews(1)[0]
+    index = NearDuplicateIndex()
+    ids = index.add_many([original, _paraphrase(original, 1), _reviews(1, seed=2)[0]])
+    clusters = index.cluster_ids(ids)
+    assert clusters[0] == clusters[1] == ids[0]
+    assert clusters[2] == -1
+
+
+def test_recent_window_is_shared_and_bounded(tmp_path):
+    index = NearDuplicateIndex()
+    base = _reviews(1)[0]
+    index.add_many([base, _paraphrase(base, 1)])
+    db_path = str(tmp_path / 'recent.db')
+    window = RecentDuplicateWindow(index, db_path=db_path, capacity=5)
+    other_worker = RecentDuplicateWindow(index, db_path=db_path, capacity=5)
+    
+    # A paraphrase of a training-time campaign keeps the campaign's id
+    signature = window.signature(_paraphrase(base, 2))
+    match = window.query(signature)
+    assert match['is_near_duplicate'] and match['cluster_id'] == 0
+    window.add(signature, match)
+    
+    # A campaign first seen in live traffic is visible to every worker
+    new_campaign = _reviews(1, seed=3)[0]
+    first = window.signature(new_campaign)
+    assert not window.query(first)['is_near_duplicate']
+    window.add(first, window.query(first))
+    match = other_worker.query(other_worker.signature(_paraphrase(new_campaign, 4)))
+    assert match['is_near_duplicate'] and match['cluster_id'].startswith('recent-')
+    
+    for text in _reviews(10, seed=5):
+        other_worker.add(other_worker.signature(text))
+    assert len(window) == 5
+    assert not window.query(first)['is_near_duplicate']
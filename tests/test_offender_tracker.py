@@ -0,0 +1,57 @@
+import pytest
+from offender_tracker import OffenderTracker
+
+
+def make_tracker(tmp_path, **kwargs):
+    return OffenderTracker(store_path=str(tmp_path / 'blocked_users.jsonl'),
+                           counters_path=str(tmp_path / 'offender_counters.db'), **kwargs)
+
+
+def test_counters_decay_with_half_life(tmp_path):
+    tracker = make_tracker(tmp_path, half_life_hours=1.0)
+    tracker.record('u1', fake=True, now=0.0)
+    tracker.record('u1', fake=True, now=0.0)
+    assert tracker.scores('u1', now=0.0) == pytest.approx((2.0, 0.0))
+    assert tracker.scores('u1', now=3600.0) == pytest.approx((1.0, 0.0))
+    
+    # A new offence adds to the decayed count
+    tracker.record('u1', fake=True, removal=True, now=7200.0)
+    assert tracker.scores('u1', now=7200.0) == pytest.approx((1.5, 1.0))
+
+
+def test_threshold_returns_block_reason(tmp_path):
+    tracker = make_tracker(tmp_path, fake_threshold=3.0)
+    assert tracker.record('u1', fake=True, now=0.0) is None
+    assert tracker.record('u1', fake=True, now=0.0) is None
+    assert 'fake reviews' in tracker.record('u1', fake=True, now=0.0)
+    # Decayed offences do not reach the threshold
+    assert tracker.record('u2', fake=True, now=0.0) is None
+    assert tracker.record('u2', fake=True, now=0.0) is None
+    assert tracker.record('u2', fake=True, now=72 * 3600.0) is None
+
+
+def test_workers_share_counters_and_blocks(tmp_path):
+    first = make_tracker(tmp_path, fake_threshold=2.0)
+    second = make_tracker(tmp_path, fake_threshold=2.0)
+    assert first.record('u1', fake=True, now=0.0) is None
+    reason = second.record('u1', fake=True, now=0.0)
+    assert reason is not None
+    
+    second.block('u1', reason)
+    first._refresh(force=True)
+    assert first.is_blocked('u1')
+    assert first.scores('u1', now=0.0) == (0.0, 0.0)
+    
+    assert first.unblock('u1', 'appeal')
+    second._refresh(force=True)
+    assert not second.is_blocked('u1')
+    assert second.record('u1', fake=True, now=0.0) is None
+
+
+def test_prune_keeps_most_recently_active_users(tmp_path):
+    tracker = make_tracker(tmp_path, max_users=2, prune_every=3)
+    for now, user_id in enumerate(['u1', 'u2', 'u3']):
+        tracker.record(user_id, fake=True, now=float(now))
+    assert tracker.get_statistics()['tracked_users'] == 2
+    assert tracker.scores('u1', now=3.0) == (0.0, 0.0)
+    assert tracker.scores('u3', now=3.0)[0] > 0
@@ -0,0 +1,82 @@
+import threading
+import time
+from platform_client import ActionDispatcher, PlatformBackend, PlatformError, StubPlatformBackend, idempotency_key
+
+
+class _FlakyBackend(PlatformBackend):
+    """Fails the first `failures` calls for each key, optionally after applying the action"""
+    
+    max_batch_size = 2
+    
+    def __init__(self, failures=1, retryable=True):
+        self.failures = failures
+        self.retryable = retryable
+        self.keys = []
+        self.applied = {}
+        self._lock = threading.Lock()
+    
+    def apply(self, action, review_ids, key):
+        with self._lock:
+            self.keys.append(key)
+            if self.keys.count(key) <= self.failures:
+                raise PlatformError("temporarily unavailable", retryable=self.retryable)
+            self.applied.setdefault(key, (action, list(review_ids)))
+            return {'applied': len(review_ids)}
+
+
+def test_idempotency_key_ignores_review_order():
+    assert idempotency_key('remove', ['b', 'a']) == idempotency_key('remove', ['a', 'b'])
+    assert idempotency_key('remove', ['a']) != idempotency_key('flag', ['a'])
+
+
+def test_transient_failures_are_retried_with_the_same_key():
+    backend = _FlakyBackend(failures=2)
+    dispatcher = ActionDispatcher(backend, workers=2, max_retries=3, backoff=0)
+    keys = dispatcher.submit('remove', ['r1', 'r2', 'r3'])
+    assert dispatcher.flush(timeout=5)
+    
+    assert len(keys) == 2
+    assert sorted(backend.keys) == sorted(keys * 3)
+    assert sorted(review for _, reviews in backend.applied.values() for review in reviews) == ['r1', 'r2', 'r3']
+    stats = dispatcher.get_statistics()
+    assert stats['applied_batches'] == 2 and stats['retries'] == 4 and stats['failed_batches'] == 0
+
+
+def test_permanent_failures_are_not_retried():
+    backend = _FlakyBackend(failures=1, retryable=False)
+    dispatcher = ActionDispatcher(backend, workers=1, max_retries=3, backoff=0)
+    dispatcher.submit('remove', ['r1'])
+    assert dispatcher.flush(timeout=5)
+    assert len(backend.keys) == 1
+    assert dispatcher.get_statistics()['failed_batches'] == 1
+    assert dispatcher.failed[-1]['review_ids'] == ['r1']
+
+
+def test_replayed_batch_is_applied_once():
+    backend = StubPlatformBackend()
+    dispatcher = ActionDispatcher(backend, workers=2, backoff=0)
+    dispatcher.submit('remove', ['r1', 'r2'])
+    dispatcher.submit('remove', ['r2', 'r1'])
+    assert dispatcher.flush(timeout=5)
+    assert backend.calls == 2
+    assert len(backend.results) == 1
+    assert backend.applied == {'r1': 'remove', 'r2': 'remove'}
+
+
+def test_full_queue_drops_without_blocking():
+    release = threading.Event()
+    
+    class _SlowBackend(PlatformBackend):
+        def apply(self, action, review_ids, key):
+            release.wait(5)
+    
+    dispatcher = ActionDispatcher(_SlowBackend(), workers=1, max_queue=1)
+    dispatcher.submit('flag', ['r1'])
+    while dispatcher.get_statistics()['queue_depth']:
+        time.sleep(0.001)  # wait until the worker has taken r1
+    dispatcher.submit('flag', ['r2'])
+    dispatcher.submit('flag', ['r3'])
+    stats = dispatcher.get_statistics()
+    release.set()
+    assert stats['dropped_batches'] == 1 and dispatcher.failed[-1]['review_ids'] == ['r3']
+    assert dispatcher.flush(timeout=5)
@@ -0,0 +1,27 @@
+import tracemalloc
+import profiler
+from profiler import PipelineProfiler
+
+
+def test_leaves_caller_tracing_running():
+    tracemalloc.start()
+    try:
+        with PipelineProfiler('run', trace_memory=True):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    
+    with PipelineProfiler('run', trace_memory=True):
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+
+
+def test_top_allocations_exclude_profiler_frames():
+    with PipelineProfiler('run', trace_memory=True) as run:
+        with profiler.stage('allocate'):
+            held = [bytearray(1024) for _ in range(2000)]
+    locations = [entry['location'] for entry in run.stages[0]['top_allocations']]
+    assert locations and __file__ in locations[0]
+    assert not any(location.startswith((profiler.__file__, tracemalloc.__file__)) for location in locations)
+    assert len(held) == 2000
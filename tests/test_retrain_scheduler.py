@@ -0,0 +1,52 @@
+import json
+import os
+from releases import publish, read_manifest, served_path
+from retrain_scheduler import RetrainScheduler
+
+
+class FakeLearning:
+    def __init__(self, feedback):
+        self.feedback = feedback
+    
+    def feedback_count(self):
+        return self.feedback
+
+
+def make_candidate(tmp_path, version, content):
+    candidate_dir = tmp_path / 'candidates' / version
+    candidate_dir.mkdir(parents=True)
+    for name in ('svm.pkl', 'preprocessor.pkl'):
+        (candidate_dir / name).write_text(f"{name} {content}")
+    return str(candidate_dir)
+
+
+def test_publish_switches_release_through_manifest(tmp_path):
+    releases_dir, manifest_path = str(tmp_path / 'releases'), str(tmp_path / 'release.json')
+    assert served_path('models/svm.pkl', read_manifest(manifest_path)) == 'models/svm.pkl'
+    
+    for i, version in enumerate(['20260101_000000', '20260102_000000', '20260103_000000']):
+        publish(make_candidate(tmp_path, version, i), releases_dir, manifest_path, {'metrics': {}}, keep=2)
+    manifest = read_manifest(manifest_path)
+    assert manifest['version'] == '20260103_000000'
+    with open(served_path('models/preprocessor.pkl', manifest)) as f:
+        assert f.read() == 'preprocessor.pkl 2'
+    assert sorted(os.listdir(releases_dir)) == ['20260102_000000', '20260103_000000']
+
+
+def test_rejected_candidate_backs_off_until_new_feedback(tmp_path):
+    learning = FakeLearning(feedback=150)
+    scheduler = RetrainScheduler(learning=learning, monitor=object(), state_path=str(tmp_path / 'state.json'))
+    assert scheduler.backing_off() is None
+    
+    report = {'candidate_dir': 'models/candidates/x', 'published': False, 'finished_at': '2026-01-01T00:00:00'}
+    scheduler.record_result(report, feedback=150, reason='Drift detected: 12.00% deviation')
+    assert 'waiting for new feedback' in scheduler.backing_off()
+    with open(tmp_path / 'state.json') as f:
+        assert json.load(f)['rejected']['reason'].startswith('Drift')
+    
+    learning.feedback = 151
+    assert scheduler.backing_off() is None
+    
+    scheduler.record_result(dict(report, published=True), feedback=151, reason='manual')
+    learning.feedback = 150
+    assert scheduler.backing_off() is None
@@ -0,0 +1,47 @@
+import gzip
+import io
+import json
+import numpy as np
+from flask import Flask, request
+from serialization import NPZ_MIMETYPE, encode_response
+
+app = Flask(__name__)
+PAYLOAD = {'predictions': [{'prediction': 'FAKE', 'review': 'ok'}]}
+ARRAYS = {'prediction': np.array(['FAKE', 'GENUINE']), 'fake_probability': np.array([0.9, 0.1])}
+
+
+def encode(headers, **kwargs):
+    with app.test_request_context('/predict_batch', headers=headers):
+        return encode_response(request, PAYLOAD, ARRAYS, **kwargs)
+
+
+def test_json_by_default():
+    response = encode({})
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == PAYLOAD
+    assert 'Content-Encoding' not in response.headers
+    assert set(response.vary) >= {'Accept', 'Accept-Encoding'}
+
+
+def test_npz_when_preferred():
+    response = encode({'Accept': f"{NPZ_MIMETYPE}, application/json;q=0.5"})
+    assert response.mimetype == NPZ_MIMETYPE
+    arrays = np.load(io.BytesIO(response.get_data()), allow_pickle=False)
+    assert list(np.char.decode(arrays['prediction'], 'utf-8')) == ['FAKE', 'GENUINE']
+    assert np.allclose(arrays['fake_probability'], [0.9, 0.1])
+
+
+def test_gzip_only_above_threshold():
+    assert 'Content-Encoding' not in encode({'Accept-Encoding': 'gzip'}, gzip_min_bytes=10000).headers
+    response = encode({'Accept-Encoding': 'gzip'}, gzip_min_bytes=1)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == PAYLOAD
+
+
+def test_predict_batch_rejects_non_object_body(tmp_path, monkeypatch):
+    # The API creates its runtime files (queues, logs) relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    import app as api
+    client = api.app.test_client()
+    assert client.post('/predict_batch', json=['a review']).status_code == 400
+    assert client.post('/predict', json='a review').status_code == 400
@@ -0,0 +1,75 @@
+import json
+import os
+import time
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from shadow import ShadowEvaluator
+
+
+class LengthPreprocessor:
+    """Stand-in preprocessor: one feature, the review length (importable by the scoring process)"""
+    
+    def prepare_texts(self, texts, behavioral_features=None):
+        return np.array([[len(text)] for text in texts], dtype=float)
+
+
+def make_candidate(tmp_path):
+    preprocessor = LengthPreprocessor()
+    texts = ['ok', 'bad', 'great product, would buy again', 'terrible, broke after one day of use']
+    model = LogisticRegression().fit(preprocessor.prepare_texts(texts), [1, 1, 0, 0])
+    joblib.dump(model, tmp_path / 'candidate.pkl')
+    joblib.dump(preprocessor, tmp_path / 'preprocessor.pkl')
+    return model, preprocessor
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the scoring process'
+        time.sleep(0.05)
+
+
+def test_scores_samples_in_a_process_and_aggregates_snapshots(tmp_path):
+    model, preprocessor = make_candidate(tmp_path)
+    shadow = ShadowEvaluator(str(tmp_path / 'candidate.pkl'), str(tmp_path / 'preprocessor.pkl'), sample_rate=1.0,
+                             monitor_dir=str(tmp_path / 'monitoring'), snapshot_interval=0)
+    texts = ['short', 'a much longer review text than the other one']
+    X = preprocessor.prepare_texts(texts)
+    try:
+        for _ in range(3):
+            assert shadow.submit(texts, model.predict(X), model.predict_proba(X)[:, 1], 0.002)
+        wait_for(lambda: shadow.get_statistics()['scored_reviews'] == 6)
+        
+        stats = shadow.get_statistics()
+        assert stats['agreement_rate'] == 1.0
+        assert abs(stats['mean_abs_fake_probability_delta']) < 1e-9
+        assert stats['queue_depth'] == 0 and stats['errors'] == 0
+        assert stats['primary_latency']['mean_ms'] == 2.0
+        
+        # Another worker's snapshot for the same candidate is combined; other candidates are not
+        snapshots = os.listdir(shadow.worker_dir)
+        assert len(snapshots) == 1
+        with open(os.path.join(shadow.worker_dir, snapshots[0])) as f:
+            snapshot = json.load(f)
+        for name, version in (('other_worker', shadow.model_version), ('old_candidate', 'old.pkl@0')):
+            with open(os.path.join(shadow.worker_dir, f"{name}.json"), 'w') as f:
+                json.dump(dict(snapshot, model_version=version), f)
+        aggregate = shadow.get_aggregate_statistics()
+        assert aggregate['workers'] == 2
+        assert aggregate['scored_reviews'] == 12
+        assert aggregate['agreement_rate'] == 1.0
+    finally:
+        shadow.close()
+    assert shadow._executor is None
+
+
+def test_full_queue_drops_samples_without_blocking(tmp_path):
+    make_candidate(tmp_path)
+    shadow = ShadowEvaluator(str(tmp_path / 'candidate.pkl'), str(tmp_path / 'preprocessor.pkl'), sample_rate=1.0,
+                             max_queue=0, monitor_dir=str(tmp_path / 'monitoring'))
+    try:
+        assert not shadow.submit(['text'], [0], [0.1], 0.001)
+        assert shadow.get_statistics()['dropped_requests'] == 1
+    finally:
+        shadow.close()
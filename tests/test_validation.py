@@ -0,0 +1,14 @@
+import pytest
+from validation import InputValidator
+
+
+@pytest.mark.parametrize('metadata', [{'user_id': ['x']}, {'product_id': {'id': 1}}, {'user_id': True},
+                                      {'user_id': 1.5}, {'rating': 6}, {'timestamp': 'yesterday'}])
+def test_invalid_metadata_is_rejected(metadata):
+    assert not InputValidator.validate_metadata(metadata)[0]
+
+
+def test_valid_metadata_is_accepted():
+    metadata = {'user_id': 'u1', 'product_id': 42, 'rating': 4.5, 'timestamp': '2024-01-01T10:00:00',
+                'account_created': 1700000000}
+    assert InputValidator.validate_metadata(metadata)[0]
@@ -0,0 +1,57 @@
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from vocabulary import VocabularyBuilder
+
+
+def _corpus(n_documents=400, seed=0):
+    rng = np.random.RandomState(seed)
+    words = np.array([f"w{i}" for i in range(300)])
+    weights = 1.0 / np.arange(1, len(words) + 1)
+    weights /= weights.sum()
+    return [' '.join(rng.choice(words, size=rng.randint(3, 15), p=weights)) for _ in range(n_documents)]
+
+
+def _chunks(documents, size=50):
+    return [documents[i:i + size] for i in range(0, len(documents), size)]
+
+
+def _true_counts(documents, ngram_range=(1, 2)):
+    counter = CountVectorizer(ngram_range=ngram_range)
+    totals = np.asarray(counter.fit_transform(documents).sum(axis=0)).ravel()
+    return dict(zip(counter.get_feature_names_out(), totals))
+
+
+def test_chunked_vocabulary_matches_sklearn_without_pruning():
+    documents = _corpus()
+    counts = _true_counts(documents)
+    document_counts = CountVectorizer(ngram_range=(1, 2), min_df=2).fit(documents).vocabulary_
+    # A max_features at a strict drop in counts, so ties at the cut-off cannot reorder the selection
+    ranked = sorted((counts[term] for term in document_counts), reverse=True)
+    max_features = next(k for k in range(100, len(ranked)) if ranked[k - 1] > ranked[k])
+    
+    tfidf = TfidfVectorizer(ngram_range=(1, 2), min_df=2, max_features=max_features).fit(documents)
+    builder = VocabularyBuilder(tfidf.build_analyzer(), max_features=max_features, min_df=2,
+                                max_candidates=10 ** 6).fit(_chunks(documents))
+    assert builder.n_prunes == 0
+    assert builder.vocabulary() == tfidf.vocabulary_
+
+
+def test_pruned_counts_stay_within_lossy_counting_bound():
+    documents = _corpus(n_documents=2000)
+    counts = _true_counts(documents)
+    analyzer = TfidfVectorizer(ngram_range=(1, 2)).build_analyzer()
+    builder = VocabularyBuilder(analyzer, max_features=100, min_df=2, max_candidates=400).fit(_chunks(documents))
+    
+    assert builder.n_prunes > 0
+    assert builder.max_pruned_count > 0
+    for term, count in builder.term_counts.items():
+        error = builder.errors.get(term, 0)
+        assert error <= builder.max_pruned_count
+        # Counted occurrences never exceed the truth and the upper-bound estimate never falls below it
+        assert count <= counts[term] <= count + error
+    
+    vocabulary = builder.vocabulary()
+    assert len(vocabulary) == 100
+    # N-grams clearly above the cut-off (by more than the error bound) are all selected
+    cutoff = sorted(counts.values(), reverse=True)[99]
+    assert {term for term, count in counts.items() if count > cutoff + builder.max_pruned_count} <= set(vocabulary)
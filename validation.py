@@ -1,6 +1,8 @@
 import re
+from datetime import datetime
 from functools import wraps
 from flask import request, jsonify
+from config import Config
 
 class InputValidator:
     @staticmethod
@@ -40,6 +42,30 @@ class InputValidator:
                 return False, f"Invalid review: {msg}"
         
         return True, "Valid"
+    
+    @staticmethod
+    def validate_metadata(data):
+        """Validate optional review metadata (ids, rating, timestamps)"""
+        for field in ('user_id', 'product_id'):
+            value = data.get(field)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (str, int))):
+                return False, f"{field} must be a string or an integer"
+        
+        rating = data.get('rating')
+        if rating is not None:
+            if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not 1 <= rating <= 5:
+                return False, "Rating must be a number between 1 and 5"
+        
+        for field in ('timestamp', 'account_created'):
+            value = data.get(field)
+            if value is None or isinstance(value, (int, float)):
+                continue
+            try:
+                datetime.fromisoformat(str(value))
+            except ValueError:
+                return False, f"{field} must be an ISO 8601 date or epoch seconds"
+        
+        return True, "Valid"
 
 def rate_limit(max_requests=100):
     """Simple rate limiting decorator"""
@@ -48,6 +74,8 @@ def rate_limit(max_requests=100):
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
+            if not Config.RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
             client_ip = request.remote_addr
             current_count = request_counts.get(client_ip, 0)
             
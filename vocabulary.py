@@ -0,0 +1,85 @@
+import heapq
+from collections import Counter
+from operator import itemgetter
+
+
+class VocabularyBuilder:
+    """Top-k n-gram vocabulary over a stream of documents with bounded memory
+    
+    TfidfVectorizer(max_features=k) counts every distinct n-gram in the corpus before
+    keeping the k most frequent. This builder counts one chunk of documents at a time,
+    merges the chunk into running term/document frequencies and, whenever more than
+    max_candidates n-grams are tracked, prunes back to the most frequent half
+    (chunked count-and-prune). Memory is bounded by max_candidates plus one chunk,
+    regardless of corpus size. As in lossy counting, an n-gram first seen after a prune
+    may have lost up to max_pruned_count earlier occurrences, so it is ranked by that
+    upper bound; this keeps late-arriving frequent n-grams from being pruned again
+    before they can accumulate. The selection rule matches sklearn's: n-grams in at
+    least min_df documents, ranked by total count.
+    """
+    
+    def __init__(self, analyzer, max_features=3000, min_df=2, max_candidates=200000):
+        if max_candidates < 2 * max_features:
+            raise ValueError("max_candidates must be at least twice max_features")
+        self.analyzer = analyzer
+        self.max_features = max_features
+        self.min_df = min_df
+        self.max_candidates = max_candidates
+        self.term_counts = Counter()
+        self.doc_counts = Counter()
+        self.errors = {}
+        self.n_documents = 0
+        self.n_prunes = 0
+        self.max_pruned_count = 0
+        self.peak_candidates = 0
+    
+    def partial_fit(self, documents):
+        """Count one chunk of documents into the running frequencies"""
+        chunk_terms = Counter()
+        chunk_docs = Counter()
+        analyzer = self.analyzer
+        for document in documents:
+            ngrams = analyzer(document)
+            chunk_terms.update(ngrams)
+            chunk_docs.update(set(ngrams))
+            self.n_documents += 1
+        
+        if self.max_pruned_count:
+            term_counts, errors, error = self.term_counts, self.errors, self.max_pruned_count
+            for term in chunk_terms:
+                if term not in term_counts:
+                    errors[term] = error
+        self.term_counts.update(chunk_terms)
+        self.doc_counts.update(chunk_docs)
+        self.peak_candidates = max(self.peak_candidates, len(self.term_counts))
+        if len(self.term_counts) > self.max_candidates:
+            self._prune()
+        return self
+    
+    def fit(self, chunks):
+        """Count an iterable of document chunks, e.g. a chunked CSV reader's text column"""
+        for documents in chunks:
+            self.partial_fit(documents)
+        return self
+    
+    def _estimates(self, counts):
+        """(term, upper-bound count) pairs"""
+        errors = self.errors
+        return ((term, count + errors.get(term, 0)) for term, count in counts.items())
+    
+    def _prune(self):
+        keep = heapq.nlargest(self.max_candidates // 2, self._estimates(self.term_counts), key=itemgetter(1))
+        floor = keep[-1][1]
+        self.max_pruned_count = max(self.max_pruned_count, floor)
+        self.term_counts = Counter({term: self.term_counts[term] for term, _ in keep})
+        self.doc_counts = Counter({term: self.doc_counts[term] for term, _ in keep})
+        self.errors = {term: self.errors[term] for term, _ in keep if term in self.errors}
+        self.n_prunes += 1
+    
+    def vocabulary(self):
+        """{n-gram: column index} in sklearn's (alphabetical) column order, for TfidfVectorizer(vocabulary=...)"""
+        doc_counts, errors, min_df = self.doc_counts, self.errors, self.min_df
+        eligible = {term: count for term, count in self.term_counts.items()
+                    if doc_counts[term] + errors.get(term, 0) >= min_df}
+        top = heapq.nlargest(self.max_features, self._estimates(eligible), key=itemgetter(1))
+        return {term: index for index, term in enumerate(sorted(term for term, _ in top))}
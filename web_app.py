@@ -1,22 +1,86 @@
 import streamlit as st
+import hashlib
+import io
+import time
 import joblib
+import numpy as np
 import pandas as pd
-from data_preprocessing import DataPreprocessor
+from behavioral_features import BehavioralFeatureExtractor
+from config import Config
+from data_preprocessing import BEHAVIORAL_FEATURE_COLUMNS
+from releases import read_manifest, served_path
 import plotly.graph_objects as go
 
+# Rows scored per step of the batch tab; the progress bar advances once per chunk
+BATCH_CHUNK_SIZE = 1000
+METADATA_COLUMNS = ['user_id', 'product_id', 'rating', 'timestamp', 'account_created', 'verified_purchase']
+
 st.set_page_config(page_title="Fake Review Detector", page_icon="🔍", layout="wide")
 
 @st.cache_resource
 def load_model():
     try:
-        model = joblib.load('models/svm.pkl')
-        preprocessor = joblib.load('models/preprocessor.pkl')
+        # The retrain scheduler publishes into RELEASES_DIR; both files come from one release
+        manifest = read_manifest(Config.RELEASE_MANIFEST_PATH)
+        model = joblib.load(served_path(Config.MODEL_PATH, manifest))
+        preprocessor = joblib.load(served_path(Config.PREPROCESSOR_PATH, manifest))
         return model, preprocessor
     except Exception as e:
         return None, None
 
 model, preprocessor = load_model()
 
+@st.cache_resource
+def load_behavioral_extractor():
+    """Extractor over the behavioral history saved by training; only queried, never updated, from here"""
+    try:
+        return BehavioralFeatureExtractor(store=joblib.load(Config.BEHAVIOR_STORE_PATH))
+    except Exception:
+        return BehavioralFeatureExtractor()
+
+@st.cache_resource(max_entries=2)
+def load_reviews(file_hash, _data):
+    """Uploaded CSV parsed once per file; reruns get the same frame back, so it must not be modified"""
+    return pd.read_csv(io.BytesIO(_data))
+
+def behavioral_rows(df):
+    """Per-review behavioral features computed over the whole upload (user and product aggregates span chunks)"""
+    if not getattr(preprocessor, 'use_behavioral', False):
+        return None
+    metadata = df[[column for column in METADATA_COLUMNS if column in df.columns]].copy()
+    features = BehavioralFeatureExtractor().extract_all_behavioral_features(metadata)
+    return features[BEHAVIORAL_FEATURE_COLUMNS].to_dict('records')
+
+def score_in_chunks(df, progress):
+    """Predictions and fake probabilities for every review, scored BATCH_CHUNK_SIZE rows at a time"""
+    n_rows = len(df)
+    predictions = np.empty(n_rows, dtype=np.int8)
+    fake_probability = np.empty(n_rows, dtype=np.float64)
+    texts = df['review_text'].fillna('').astype(str)
+    behavior = behavioral_rows(df)
+    start_time = time.perf_counter()
+    for start in range(0, n_rows, BATCH_CHUNK_SIZE):
+        end = min(start + BATCH_CHUNK_SIZE, n_rows)
+        X = preprocessor.prepare_texts(texts.iloc[start:end],
+                                       behavioral_features=behavior[start:end] if behavior else None)
+        predictions[start:end] = model.predict(X)
+        fake_probability[start:end] = model.predict_proba(X)[:, 1]
+        
+        elapsed = time.perf_counter() - start_time
+        remaining = elapsed / end * (n_rows - end)
+        progress.progress(end / n_rows, text=f"Scored {end:,}/{n_rows:,} reviews - about {remaining:.0f}s remaining")
+    return predictions, fake_probability
+
+def results_csv(df, predictions, fake_probability):
+    """Upload plus prediction columns as CSV bytes, written a chunk at a time instead of from a full copy"""
+    buffer = io.StringIO()
+    labels = np.where(predictions == 1, 'FAKE', 'REAL')
+    for start in range(0, len(df), BATCH_CHUNK_SIZE):
+        end = start + BATCH_CHUNK_SIZE
+        df.iloc[start:end].assign(prediction=labels[start:end], fake_probability=fake_probability[start:end]) \
+            .to_csv(buffer, index=False, header=start == 0)
+    return buffer.getvalue().encode('utf-8')
+
 st.title("🔍 Fake Product Review Detection System")
 st.markdown("### AI-Powered Review Authenticity Checker")
 
@@ -32,14 +96,32 @@ with tab1:
     review_text = st.text_area("Enter product review:", height=150, 
                                 placeholder="Type or paste a product review here...")
     
+    uses_behavior = getattr(preprocessor, 'use_behavioral', False)
+    if uses_behavior:
+        with st.expander("Reviewer details (optional)"):
+            col1, col2 = st.columns(2)
+            with col1:
+                user_id = st.text_input("User ID")
+                product_id = st.text_input("Product ID")
+                rating = st.selectbox("Rating", [None, 1, 2, 3, 4, 5],
+                                      format_func=lambda r: "Unknown" if r is None else "⭐" * r)
+            with col2:
+                account_created = st.date_input("Account created", value=None)
+                verified_purchase = st.checkbox("Verified purchase")
+    
     col1, col2 = st.columns([1, 4])
     with col1:
         analyze_btn = st.button("🔍 Analyze", type="primary")
     
     if analyze_btn and review_text:
         with st.spinner("Analyzing..."):
-            df = pd.DataFrame({'review_text': [review_text]})
-            X, _ = preprocessor.prepare_data(df, fit=False)
+            behavior = None
+            if uses_behavior:
+                # Same features the API computes for this review, without recording it
+                behavior = [load_behavioral_extractor().extract_for_review(
+                    user_id or None, product_id or None, rating, None, account_created, verified_purchase,
+                    record=False)]
+            X = preprocessor.prepare_texts([review_text], behavioral_features=behavior)
             
             prediction = model.predict(X)[0]
             probability = model.predict_proba(X)[0]
@@ -74,6 +156,10 @@ with tab1:
                        'threshold': {'line': {'color': "red", 'width': 4}, 'thickness': 0.75, 'value': 50}}))
             
             st.plotly_chart(fig, use_container_width=True)
+            
+            if behavior:
+                with st.expander("Behavioral features used"):
+                    st.json(behavior[0])
 
 with tab2:
     st.subheader("Batch Review Analysis")
@@ -81,33 +167,45 @@ with tab2:
     uploaded_file = st.file_uploader("Upload CSV file with reviews", type=['csv'])
     
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
+        data = uploaded_file.getvalue()
+        file_hash = hashlib.sha256(data).hexdigest()
+        df = load_reviews(file_hash, data)
         st.write(f"Loaded {len(df)} reviews")
         
         if 'review_text' not in df.columns:
             st.error("CSV must contain 'review_text' column")
         else:
-            if st.button("Analyze All Reviews"):
-                with st.spinner("Processing..."):
-                    X, _ = preprocessor.prepare_data(df, fit=False)
-                    predictions = model.predict(X)
-                    probabilities = model.predict_proba(X)
-                    
-                    df['prediction'] = ['FAKE' if p == 1 else 'REAL' for p in predictions]
-                    df['fake_probability'] = probabilities[:, 1]
-                    
-                    fake_count = sum(predictions)
-                    real_count = len(predictions) - fake_count
-                    
-                    col1, col2, col3 = st.columns(3)
-                    col1.metric("Total Reviews", len(df))
-                    col2.metric("Fake Reviews", fake_count, delta=f"{fake_count/len(df)*100:.1f}%")
-                    col3.metric("Real Reviews", real_count, delta=f"{real_count/len(df)*100:.1f}%")
-                    
-                    st.dataframe(df[['review_text', 'prediction', 'fake_probability']], use_container_width=True)
-                    
-                    csv = df.to_csv(index=False)
-                    st.download_button("📥 Download Results", csv, "results.csv", "text/csv")
+            # Results of the last scored file survive reruns (widget changes, downloads); only the latest is kept
+            results = st.session_state.get('batch_results')
+            if results is not None and results['file_hash'] != file_hash:
+                results = None
+            
+            if results is None and st.button("Analyze All Reviews"):
+                progress = st.progress(0.0, text="Scoring reviews...")
+                predictions, fake_probability = score_in_chunks(df, progress)
+                progress.empty()
+                results = {'file_hash': file_hash, 'predictions': predictions,
+                           'fake_probability': fake_probability, 'csv': None}
+                st.session_state['batch_results'] = results
+            
+            if results is not None:
+                predictions = results['predictions']
+                fake_count = int(predictions.sum())
+                real_count = len(predictions) - fake_count
+                
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Total Reviews", len(df))
+                col2.metric("Fake Reviews", fake_count, delta=f"{fake_count/len(df)*100:.1f}%")
+                col3.metric("Real Reviews", real_count, delta=f"{real_count/len(df)*100:.1f}%")
+                
+                st.dataframe(pd.DataFrame({'review_text': df['review_text'],
+                                           'prediction': np.where(predictions == 1, 'FAKE', 'REAL'),
+                                           'fake_probability': results['fake_probability']}),
+                             use_container_width=True)
+                
+                if results['csv'] is None:
+                    results['csv'] = results_csv(df, predictions, results['fake_probability'])
+                st.download_button("📥 Download Results", results['csv'], "results.csv", "text/csv")
 
 with tab3:
     st.subheader("About This System")